@@ -3,387 +3,93 @@
 Sistema FONTES v3.0 - Render Deploy
 Versão otimizada para hospedagem no Render.com  
 """
-from flask import Flask, render_template_string, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, url_for
+from jinja2 import FileSystemBytecodeCache
+from middleware import RequestMetrics, ResponseOptimizer
+from static_assets import AssetManifest
 import os
 import secrets
+import sys
+import threading
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from auth.authentication import AuthenticationSystem
+from auth.password_hashing import BUSY_MESSAGE
+from utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY as METRICS
+from utils.rate_limit import (LoginThrottle, NoLoginThrottle, THROTTLED_MESSAGE, rate_limit_db_from_env,
+                              retry_after_header)
+
+# Templates compilados: cache em memória e bytecode em disco entre reinícios
+TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR')
+TEMPLATE_CACHE_SIZE = 100
+LOGIN_PAGE = 'app/login.html'
+DASHBOARD_PAGE = 'app/dashboard.html'
+
+# Banco de usuários do servidor web, separado do banco do desktop e
+# sincronizado com USERS na inicialização do serviço (seed_web_users)
+WEB_DB_ENV = 'FONTES_WEB_DB'
+DEFAULT_WEB_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'web', 'users.db')
+
+# /metrics: com FONTES_METRICS_TOKEN exige "Authorization: Bearer <token>";
+# sem ele, só responde a requisições locais
+METRICS_TOKEN_ENV = 'FONTES_METRICS_TOKEN'
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+# Tentativas de login por IP e usuário, compartilhadas entre os workers
+# quando FONTES_RATE_LIMIT_DB aponta para um arquivo (ver gunicorn.conf.py)
+login_throttle = LoginThrottle(rate_limit_db_from_env())
+
+# Arquivos estáticos com hash (gerados por static_assets.build_assets)
+assets = AssetManifest()
+
+# Cache-Control por endpoint; as demais respostas revalidam pelo ETag
+CACHE_POLICIES = {
+    'login': 'no-cache',
+    'dashboard': 'private, no-cache',
+    'logout': 'no-store',
+    'health': 'no-store',
+    'api_status': 'no-cache',
+    'metrics': 'no-store',
+    'static': assets.cache_policy,
+}
+
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', secrets.token_hex(16))
 
-# Template HTML integrado - Login
-LOGIN_TEMPLATE = '''
-<!DOCTYPE html>
-<html lang="pt-BR">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Login - Sistema FONTES</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
-    <style>
-        body {
-            background: linear-gradient(135deg, #1e3c72 0%, #2a5298 100%);
-            min-height: 100vh;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-family: 'Segoe UI', Arial, sans-serif;
-        }
-        .login-card {
-            background: rgba(255, 255, 255, 0.95);
-            backdrop-filter: blur(10px);
-            border-radius: 20px;
-            padding: 40px;
-            box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-            width: 100%;
-            max-width: 400px;
-        }
-        .logo {
-            font-size: 64px;
-            text-align: center;
-            margin-bottom: 20px;
-        }
-        .system-title {
-            color: #1976D2;
-            font-weight: bold;
-            text-align: center;
-            margin-bottom: 10px;
-        }
-        .subtitle {
-            color: #666;
-            text-align: center;
-            margin-bottom: 30px;
-            font-size: 14px;
-        }
-        .btn-login {
-            background: linear-gradient(45deg, #1976D2, #2196F3);
-            border: none;
-            border-radius: 10px;
-            padding: 12px;
-            width: 100%;
-            color: white;
-            font-weight: bold;
-            font-size: 16px;
-            cursor: pointer;
-            transition: all 0.3s ease;
-        }
-        .btn-login:hover {
-            background: linear-gradient(45deg, #0D47A1, #1976D2);
-            transform: translateY(-2px);
-        }
-        .form-control {
-            border-radius: 10px;
-            border: 2px solid #e0e0e0;
-            padding: 12px 15px;
-            margin-bottom: 15px;
-        }
-        .form-control:focus {
-            border-color: #2196F3;
-            box-shadow: 0 0 0 0.2rem rgba(33, 150, 243, 0.25);
-        }
-        .alert {
-            border-radius: 10px;
-            margin-bottom: 20px;
-        }
-        .support-info {
-            text-align: center;
-            margin-top: 30px;
-            color: #666;
-            font-size: 12px;
-        }
-    </style>
-</head>
-<body>
-    <div class="login-card">
-        <div class="logo">🏛️</div>
-        <h2 class="system-title">FONTES</h2>
-        <p class="subtitle">Sistema INSS v3.0 - Portal Web</p>
-        
-        <div id="alert" class="alert d-none"></div>
-        
-        <form id="loginForm">
-            <div class="mb-3">
-                <label class="form-label">👤 Usuário:</label>
-                <input type="text" class="form-control" id="username" required placeholder="Digite seu usuário">
-            </div>
-            
-            <div class="mb-3">
-                <label class="form-label">🔒 Senha:</label>
-                <input type="password" class="form-control" id="password" required placeholder="Digite sua senha">
-            </div>
-            
-            <button type="submit" class="btn-login">
-                🔓 ENTRAR NO SISTEMA
-            </button>
-        </form>
-        
-        <div class="support-info">
-            💬 Suporte: suporte@fontes.inss.gov.br<br>
-            📞 (11) 99999-9999
-        </div>
-    </div>
-
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js"></script>
-    <script>
-        document.getElementById('loginForm').addEventListener('submit', async (e) => {
-            e.preventDefault();
-            
-            const username = document.getElementById('username').value;
-            const password = document.getElementById('password').value;
-            const alertDiv = document.getElementById('alert');
-            
-            try {
-                const response = await fetch('/login', {
-                    method: 'POST',
-                    headers: {'Content-Type': 'application/json'},
-                    body: JSON.stringify({username, password})
-                });
-                
-                const data = await response.json();
-                
-                if (data.success) {
-                    alertDiv.className = 'alert alert-success';
-                    alertDiv.textContent = data.message;
-                    alertDiv.classList.remove('d-none');
-                    setTimeout(() => window.location.href = '/dashboard', 1500);
-                } else {
-                    alertDiv.className = 'alert alert-danger';
-                    alertDiv.textContent = data.message;
-                    alertDiv.classList.remove('d-none');
-                }
-            } catch (error) {
-                alertDiv.className = 'alert alert-danger';
-                alertDiv.textContent = 'Erro de conexão';
-                alertDiv.classList.remove('d-none');
-            }
-        });
-    </script>
-</body>
-</html>
-'''
-
-# Template HTML integrado - Dashboard
-DASHBOARD_TEMPLATE = '''
-<!DOCTYPE html>
-<html lang="pt-BR">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Dashboard - Sistema FONTES</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
-    <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
-    <style>
-        body {
-            background: linear-gradient(135deg, #1e3c72 0%, #2a5298 100%);
-            min-height: 100vh;
-            color: white;
-            font-family: 'Segoe UI', Arial, sans-serif;
-        }
-        .navbar {
-            background: rgba(0,0,0,0.3) !important;
-            backdrop-filter: blur(10px);
-        }
-        .navbar-brand {
-            font-weight: bold;
-            font-size: 24px;
-        }
-        .service-card {
-            background: rgba(255, 255, 255, 0.1);
-            backdrop-filter: blur(10px);
-            border: none;
-            border-radius: 20px;
-            padding: 30px;
-            text-align: center;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            height: 280px;
-            display: flex;
-            flex-direction: column;
-            justify-content: center;
-        }
-        .service-card:hover {
-            transform: translateY(-10px);
-            background: rgba(255, 255, 255, 0.2);
-            box-shadow: 0 20px 40px rgba(0,0,0,0.3);
-        }
-        .service-icon {
-            font-size: 64px;
-            margin-bottom: 20px;
-        }
-        .service-title {
-            font-size: 20px;
-            font-weight: bold;
-            margin-bottom: 15px;
-            color: #4CAF50;
-        }
-        .service-desc {
-            color: #ccc;
-            font-size: 14px;
-        }
-        .page-title {
-            text-align: center;
-            margin: 40px 0;
-            color: #4CAF50;
-            font-weight: bold;
-        }
-        .footer {
-            text-align: center; 
-            padding: 40px;
-            color: #ccc;
-            font-size: 14px;
-        }
-        .btn-logout {
-            background: #f44336;
-            border: none;
-            border-radius: 10px;
-        }
-        .btn-logout:hover {
-            background: #d32f2f;
-        }
-    </style>
-</head>
-<body>
-    <!-- Navigation -->
-    <nav class="navbar navbar-expand-lg navbar-dark">
-        <div class="container-fluid">
-            <a class="navbar-brand" href="#">
-                🏛️ FONTES <small class="text-muted">v3.0</small>
-            </a>
-            
-            <div class="navbar-nav ms-auto">
-                <div class="nav-item dropdown">
-                    <a class="nav-link dropdown-toggle" href="#" role="button" data-bs-toggle="dropdown">
-                        👤 {{ user_name }}
-                    </a>
-                    <ul class="dropdown-menu">
-                        <li><a class="dropdown-item" href="#" onclick="showProfile()">⚙️ Perfil</a></li>
-                        <li><a class="dropdown-item" href="#" onclick="showSupport()">🆘 Suporte</a></li>
-                        <li><hr class="dropdown-divider"></li>
-                        <li><a class="dropdown-item" href="/logout">🚪 Sair</a></li>
-                    </ul>
-                </div>
-            </div>
-        </div>
-    </nav>
-
-    <!-- Main Content -->
-    <div class="container py-4">
-        <h1 class="page-title">📋 SELECIONE UMA CATEGORIA DE SERVIÇOS</h1>
-        
-        <div class="row g-4">
-            <!-- Aposentadoria -->
-            <div class="col-md-4">
-                <div class="service-card" onclick="openService('aposentadoria', 'Aposentadoria', '👨‍🦳')">
-                    <div class="service-icon">👨‍🦳</div>
-                    <div class="service-title">Aposentadoria</div>
-                    <div class="service-desc">Solicitações e consultas de aposentadoria por idade, tempo de contribuição e invalidez</div>
-                </div>
-            </div>
-            
-            <!-- Maternidade -->
-            <div class="col-md-4">
-                <div class="service-card" onclick="openService('maternidade', 'Maternidade', '🤱')">
-                    <div class="service-icon">🤱</div>
-                    <div class="service-title">Maternidade</div>
-                    <div class="service-desc">Benefícios de maternidade, paternidade e auxílio para gestantes</div>
-                </div>
-            </div>
-            
-            <!-- Arquivos -->
-            <div class="col-md-4">
-                <div class="service-card" onclick="openService('arquivos', 'Arquivos', '📁')">
-                    <div class="service-icon">📁</div>
-                    <div class="service-title">Arquivos</div>
-                    <div class="service-desc">Gestão completa de documentos, upload de arquivos e relatórios</div>
-                </div>
-            </div>
-            
-            <!-- Meu INSS -->
-            <div class="col-md-4">
-                <div class="service-card" onclick="openMeuINSS()">
-                    <div class="service-icon">🏢</div>
-                    <div class="service-title">Meu INSS</div>
-                    <div class="service-desc">Acesso direto ao portal oficial do INSS</div>
-                </div>
-            </div>
-            
-            <!-- Suporte -->
-            <div class="col-md-4">
-                <div class="service-card" onclick="openService('suporte', 'Suporte', '🛠️')">
-                    <div class="service-icon">🛠️</div>
-                    <div class="service-title">Suporte</div>
-                    <div class="service-desc">Atendimento técnico, tutoriais e perguntas frequentes</div>
-                </div>
-            </div>
-            
-            <!-- Solicitar Serviço -->
-            <div class="col-md-4">
-                <div class="service-card" onclick="openService('servicos', 'Solicitar Serviço', '📋')">
-                    <div class="service-icon">📋</div>
-                    <div class="service-title">Solicitar Serviço</div>
-                    <div class="service-desc">Solicitações diversas e acompanhamento de processos</div>
-                </div>
-            </div>
-        </div>
-    </div>
-
-    <!-- Footer -->
-    <div class="footer">
-        © 2025 Sistema FONTES v3.0 - Hospedado no Render.com
-    </div>
-
-    <!-- Modal -->
-    <div class="modal fade" id="serviceModal" tabindex="-1">
-        <div class="modal-dialog modal-lg">
-            <div class="modal-content bg-dark text-white">
-                <div class="modal-header">
-                    <h5 class="modal-title" id="modalTitle"></h5>
-                    <button type="button" class="btn-close btn-close-white" data-bs-dismiss="modal"></button>
-                </div>
-                <div class="modal-body" id="modalBody">
-                    <!-- Content loaded here -->
-                </div>
-            </div>
-        </div>
-    </div>
-
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js"></script>
-    <script>
-        function openService(serviceId, serviceName, icon) {
-            document.getElementById('modalTitle').innerHTML = icon + ' ' + serviceName;
-            document.getElementById('modalBody').innerHTML = `
-                <div class="text-center">
-                    <div style="font-size: 64px; margin-bottom: 20px;">${icon}</div>
-                    <h4>Funcionalidade em Desenvolvimento</h4>
-                    <p>Este serviço será implementado em breve.</p>
-                    <p><strong>Serviço:</strong> ${serviceName}</p>
-                    <div class="mt-4">
-                        <small class="text-muted">
-                            💬 Para mais informações, entre em contato:<br>
-                            📧 suporte@fontes.inss.gov.br<br>
-                            📞 (11) 99999-9999
-                        </small>
-                    </div>
-                </div>
-            `;
-            new bootstrap.Modal(document.getElementById('serviceModal')).show();
-        }
-        
-        function openMeuINSS() {
-            window.open('https://meu.inss.gov.br/', '_blank');
-        }
-        
-        function showProfile() {
-            alert('⚙️ Configurações do perfil\\n\\nFuncionalidade em desenvolvimento');
-        }
-        
-        function showSupport() {
-            alert('🆘 Central de Suporte\\n\\n📞 (11) 99999-9999\\n📧 suporte@fontes.inss.gov.br\\n💬 Chat online em breve');
-        }
-    </script>
-</body>
-</html>
-'''
+if TEMPLATE_CACHE_DIR:
+    os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+# Métricas primeiro: veem todas as requisições e o status final (ex.: 304)
+request_metrics = RequestMetrics(METRICS, app)
+response_optimizer = ResponseOptimizer(app, policies=CACHE_POLICIES)
+
+app.jinja_options = {
+    **app.jinja_options,
+    'bytecode_cache': FileSystemBytecodeCache(TEMPLATE_CACHE_DIR),
+    'cache_size': TEMPLATE_CACHE_SIZE,
+}
+assets.init_app(app)
+
+# Compila na importação, antes da primeira requisição de cada worker
+for _template in (LOGIN_PAGE, DASHBOARD_PAGE):
+    app.jinja_env.get_template(_template)
+
+# Página de login já renderizada (não depende da requisição)
+_login_page = None
+_login_page_lock = threading.Lock()
+
+
+def login_page():
+    """Bytes da página de login, renderizada uma única vez por processo"""
+    global _login_page
+    if app.jinja_env.auto_reload:
+        return render_template(LOGIN_PAGE).encode('utf-8')
+    if _login_page is None:
+        with _login_page_lock:
+            if _login_page is None:
+                _login_page = render_template(LOGIN_PAGE).encode('utf-8')
+    return _login_page
+
 
 # Usuários do sistema
 USERS = {
@@ -404,6 +110,67 @@ USERS = {
     }
 }
 
+# Autenticação do servidor web: PBKDF2, SQLite e cache de sessões do
+# AuthenticationSystem, com as métricas exportadas em /metrics
+_web_auth = None
+_web_auth_lock = threading.Lock()
+
+
+def web_db_path():
+    """Banco de usuários do servidor web (FONTES_WEB_DB ou database/web/users.db)"""
+    return os.environ.get(WEB_DB_ENV) or DEFAULT_WEB_DB
+
+
+def open_web_auth(db_path):
+    """AuthenticationSystem sem threads de fundo e sem limitador próprio (ver login_throttle)"""
+    return AuthenticationSystem(db_path, session_reaper_interval=None, log_retention_days=None,
+                                maintenance_interval=None, throttle=NoLoginThrottle())
+
+
+def seed_web_users(db_path=None):
+    """
+    Criar ou atualizar as contas de USERS no banco web e desativar as demais.
+
+    Chamada uma vez por inicialização do serviço (on_starting do gunicorn ou
+    ``python app.py``), antes dos workers; também remove sessões expiradas.
+    """
+    auth = open_web_auth(db_path or web_db_path())
+    try:
+        for username, user in USERS.items():
+            success, message = auth.upsert_user(username, user['password'], user['name'], role=user['role'])
+            if not success:
+                raise RuntimeError(f"Erro ao configurar o usuário web {username}: {message}")
+        for user in auth.get_users():
+            if user['username'] not in USERS and user['is_active']:
+                auth.update_user_status(user['id'], False)
+        auth.reap_sessions()
+    finally:
+        auth.close()
+
+
+def web_auth():
+    """AuthenticationSystem do servidor web, aberto no primeiro uso de cada worker"""
+    global _web_auth
+    if _web_auth is None:
+        with _web_auth_lock:
+            if _web_auth is None:
+                db_path = web_db_path()
+                if not os.path.exists(db_path):
+                    raise RuntimeError(f"Banco de usuários web não encontrado: {db_path} "
+                                       "(execute seed_web_users na inicialização)")
+                _web_auth = open_web_auth(db_path)
+    return _web_auth
+
+
+def metrics_allowed():
+    """Token configurado confere, ou (sem token) requisição local"""
+    token = os.environ.get(METRICS_TOKEN_ENV)
+    if token:
+        expected = f'Bearer {token}'.encode('utf-8')
+        return secrets.compare_digest(request.headers.get('Authorization', '').encode('utf-8'), expected)
+    return request.remote_addr in LOCAL_ADDRESSES
+
+
 @app.route('/')
 def index():
     """Página inicial"""
@@ -419,22 +186,38 @@ def login():
         username = data.get('username', '').lower().strip()
         password = data.get('password', '').strip()
         
-        if username in USERS and USERS[username]['password'] == password:
-            session['user_id'] = username
-            session['user_name'] = USERS[username]['name'] 
-            session['user_role'] = USERS[username]['role']
+        retry_after = login_throttle.acquire(ip=request.remote_addr, user=username)
+        if retry_after:
+            response = jsonify({
+                'success': False,
+                'message': THROTTLED_MESSAGE.format(seconds=retry_after_header(retry_after))
+            })
+            response.headers['Retry-After'] = retry_after_header(retry_after)
+            return response, 429
+        
+        success, message, context = web_auth().login(username, password, request.remote_addr)
+        if success:
+            session['user_id'] = context.username
+            session['user_name'] = context.full_name
+            session['user_role'] = context.role
+            session['session_token'] = context.session_token
+            login_throttle.reset(user=username)
             
             return jsonify({
                 'success': True,
-                'message': f'Bem-vindo, {USERS[username]["name"]}!'
+                'message': f'Bem-vindo, {context.full_name}!'
             })
+        elif message == BUSY_MESSAGE:
+            response = jsonify({'success': False, 'message': message})
+            response.headers['Retry-After'] = '1'
+            return response, 503
         else:
             return jsonify({
                 'success': False,
                 'message': 'Usuário ou senha inválidos'
             }), 401
     
-    return render_template_string(LOGIN_TEMPLATE)
+    return Response(login_page(), mimetype='text/html')
 
 @app.route('/dashboard')
 def dashboard():
@@ -442,12 +225,17 @@ def dashboard():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    return render_template_string(DASHBOARD_TEMPLATE, 
-                                user_name=session.get('user_name', 'Usuário'))
+    return render_template(DASHBOARD_PAGE,
+                           user_name=session.get('user_name', 'Usuário'))
 
 @app.route('/logout')
 def logout():
     """Logout do sistema"""
+    token = session.get('session_token')
+    if token:
+        context = web_auth().resolve_session(token)
+        if context:
+            web_auth().end_session(context, request.remote_addr)
     session.clear()
     return redirect(url_for('login'))
 
@@ -470,6 +258,14 @@ def api_status():
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/metrics')
+def metrics():
+    """Métricas no formato do Prometheus, somadas entre os workers"""
+    if not metrics_allowed():
+        return Response('Acesso negado\n', status=403, content_type='text/plain; charset=utf-8')
+    return Response(METRICS.render(), content_type=METRICS_CONTENT_TYPE)
+
 if __name__ == '__main__':
+    seed_web_users()
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,24 @@
+"""
+Sistema FONTES v3.0 - Configuração do Gunicorn
+Lida automaticamente pelo gunicorn quando iniciado na raiz do projeto
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from utils.metrics import clear_metrics_dir
+
+# Métricas agregadas entre workers: diretório herdado por todos eles
+os.environ.setdefault('FONTES_METRICS_DIR', os.path.join(tempfile.gettempdir(), 'fontes-metrics'))
+
+# Limitador de login: baldes no mesmo banco SQLite para todos os workers
+os.environ.setdefault('FONTES_RATE_LIMIT_DB', os.path.join(tempfile.gettempdir(), 'fontes-login-throttle.db'))
+
+
+def on_starting(server):
+    """Descartar métricas da execução anterior e sincronizar os usuários web antes de subir os workers"""
+    clear_metrics_dir(os.environ['FONTES_METRICS_DIR'])
+
+    from app import seed_web_users
+    seed_web_users()
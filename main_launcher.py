@@ -28,6 +28,30 @@ def check_dependencies():
     except ImportError as e:
         return False, str(e)
 
+def resume_saved_session(session_file):
+    """Retomar a sessão salva ("lembrar login"), se ainda for válida"""
+    if not os.path.exists(session_file):
+        return False
+    
+    try:
+        from auth.authentication import auth_system
+        
+        with open(session_file, "r") as f:
+            token = f.read().strip()
+        
+        # Tokens assinados são verificados sem consultar o banco
+        if token and auth_system.validate_session(token):
+            return True
+    except Exception as e:
+        print(f"Erro ao retomar sessão: {e}")
+    
+    # Sessão expirada ou revogada: exigir novo login
+    try:
+        os.remove(session_file)
+    except OSError:
+        pass
+    return False
+
 def show_simple_loading():
     """Mostrar splash screen simples"""
     splash = tk.Tk()
@@ -93,10 +117,10 @@ def main():
         
         # Verificar sessão
         session_file = os.path.join(BASE_DIR, "session.dat")
-        has_session = os.path.exists(session_file)
+        has_session = resume_saved_session(session_file)
         
         if has_session:
-            print("🔑 Sessão encontrada, carregando interface principal...")
+            print("🔑 Sessão válida encontrada, carregando interface principal...")
             try:
                 from views.fontes_interface import FontesMainWindow
                 app = FontesMainWindow()
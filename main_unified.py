@@ -85,7 +85,8 @@ def run_console_mode():
             print("\n📋 Opções disponíveis:")
             print("1. Testar login")
             print("2. Listar usuários")
-            print("3. Sair")
+            print("3. Importar usuários (CSV/JSONL)")
+            print("4. Sair")
             
             choice = input("\n👉 Escolha uma opção: ").strip()
             
@@ -106,6 +107,19 @@ def run_console_mode():
                 print("💡 Use o painel administrativo na interface gráfica")
             
             elif choice == "3":
+                path = input("Arquivo: ").strip()
+                report = auth_system.create_users_bulk(
+                    path,
+                    progress=lambda r: print(f"   ... {r['created']} criados, {r['failed']} com erro"))
+                
+                print(f"✅ {report['created']} usuários criados em {report['elapsed_ms'] / 1000:.1f} s")
+                for error in report['errors'][:20]:
+                    line = f"linha {error['line']}" if error['line'] else "arquivo"
+                    print(f"❌ {line}: {error['username'] or '-'} - {error['error']}")
+                if len(report['errors']) > 20:
+                    print(f"   ... e mais {len(report['errors']) - 20} erros")
+            
+            elif choice == "4":
                 print("👋 Saindo...")
                 break
             
@@ -118,6 +132,24 @@ def run_console_mode():
     
     return True
 
+def run_kdf_calibration(target_ms: float) -> bool:
+    """Calibrar o custo do PBKDF2 para este hardware"""
+    try:
+        from auth.password_hashing import calibrate_iterations, save_kdf_params
+        from auth.authentication import KDF_PARAMS_FILE
+        
+        print(f"⏱️  Calibrando PBKDF2 para ~{target_ms:.0f} ms por verificação...")
+        iterations = calibrate_iterations(target_ms)
+        params_path = BASE_DIR / "database" / KDF_PARAMS_FILE
+        save_kdf_params(str(params_path), iterations, target_ms)
+        
+        print(f"✅ {iterations} iterações salvas em {params_path}")
+        print("💡 Senhas existentes serão atualizadas no próximo login de cada usuário")
+        return True
+    except Exception as e:
+        print(f"❌ Erro na calibração: {e}")
+        return False
+
 def main():
     """Função principal com detecção automática de modo"""
     print("🏛️ Sistema FONTES v3.0 - Iniciando...")
@@ -130,8 +162,19 @@ def main():
         default='auto',
         help='Modo de execução (padrão: auto)'
     )
+    parser.add_argument(
+        '--calibrate-kdf',
+        type=float,
+        nargs='?',
+        const=250,
+        metavar='MS',
+        help='Calibrar o custo do hash de senhas para a latência alvo (padrão: 250 ms) e sair'
+    )
     
     args = parser.parse_args()
+    
+    if args.calibrate_kdf is not None:
+        sys.exit(0 if run_kdf_calibration(args.calibrate_kdf) else 1)
     mode = args.mode
     
     # Detecção automática do melhor modo
@@ -0,0 +1,252 @@
+"""
+Sistema FONTES v3.0 - Middleware HTTP
+Compressão (gzip e zstd, quando disponível), ETag forte, respostas 304,
+Cache-Control por rota e métricas de requisições para a aplicação Flask
+"""
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, request
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+# Corpos menores que isso não compensam a compressão
+MIN_COMPRESS_SIZE = 512
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+# Resultados comprimidos guardados por (ETag, codificação)
+COMPRESSED_CACHE_SIZE = 256
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+)
+# Políticas de cache que não permitem reaproveitar o corpo entre usuários
+UNCACHEABLE_DIRECTIVES = ('private', 'no-store')
+
+
+def _encode_gzip(data):
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _encode_zstd(data):
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+
+ENCODERS = {'gzip': _encode_gzip}
+if ZSTD_AVAILABLE:
+    ENCODERS['zstd'] = _encode_zstd
+# Ordem de preferência quando o cliente aceita as duas com o mesmo peso
+ENCODING_PREFERENCE = ('zstd', 'gzip')
+
+
+class ResponseOptimizer:
+    """Pós-processa as respostas: ETag, 304, Cache-Control e compressão
+
+    Cada política é o texto do Cache-Control ou uma função sem argumentos
+    que o devolve para a requisição atual.
+    """
+
+    def __init__(self, app=None, policies=None, default_policy='no-cache',
+                 min_size=MIN_COMPRESS_SIZE, cache_size=COMPRESSED_CACHE_SIZE):
+        self.policies = dict(policies or {})
+        self.default_policy = default_policy
+        self.min_size = min_size
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'compressed': 0, 'cache_hits': 0, 'not_modified': 0,
+                       'bytes_in': 0, 'bytes_out': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Registrar o pós-processamento na aplicação"""
+        app.after_request(self.process)
+        app.extensions['response_optimizer'] = self
+
+    def process(self, response):
+        """Aplicar política de cache, ETag, 304 e compressão a uma resposta"""
+        self._apply_policy(response)
+
+        if (request.method not in ('GET', 'HEAD') or response.status_code != 200
+                or 'Content-Encoding' in response.headers):
+            return response
+        if response.direct_passthrough:
+            return self._process_file(response)
+        if response.is_streamed:
+            return response
+
+        data = response.get_data()
+        etag, weak = response.get_etag()
+        if etag is None or weak:
+            etag = hashlib.blake2b(data, digest_size=16).hexdigest()
+
+        encoding = self._choose_encoding(response, len(data))
+        if self._is_compressible(response):
+            response.vary.add('Accept-Encoding')
+        response.set_etag(f"{etag}-{encoding}" if encoding else etag)
+
+        if self._not_modified(response):
+            return response
+
+        if encoding:
+            self._set_compressed(response, self._compress(
+                etag, encoding, lambda: data, len(data), self._is_shareable(response)), encoding)
+        return response
+
+    def _process_file(self, response):
+        """Arquivos do send_file: o ETag e o 304 já vêm prontos
+
+        O arquivo só é lido quando a versão comprimida (chaveada pelo ETag
+        do arquivo) ainda não está no cache; nos demais casos segue sem ser
+        carregado em memória.
+        """
+        etag, weak = response.get_etag()
+        encoding = self._choose_encoding(response, response.content_length or 0)
+        if etag is None or weak or encoding is None:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        response.set_etag(f"{etag}-{encoding}")
+        if self._not_modified(response):
+            return response
+
+        def read_file():
+            response.direct_passthrough = False
+            return response.get_data()
+
+        compressed = self._compress(etag, encoding, read_file, response.content_length,
+                                    self._is_shareable(response))
+        if response.direct_passthrough:
+            response.close()  # Arquivo não foi lido: veio do cache
+            response.direct_passthrough = False
+        self._set_compressed(response, compressed, encoding)
+        return response
+
+    def _not_modified(self, response):
+        response.make_conditional(request)
+        if response.status_code != 304:
+            return False
+        with self._lock:
+            self._stats['not_modified'] += 1
+        return True
+
+    @staticmethod
+    def _set_compressed(response, compressed, encoding):
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        response.headers.pop('Accept-Ranges', None)
+
+    def stats(self):
+        """Contadores de compressão e de respostas 304"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['cached_entries'] = len(self._cache)
+        stats['encodings'] = list(ENCODERS)
+        stats['ratio'] = round(stats['bytes_out'] / stats['bytes_in'], 3) if stats['bytes_in'] else None
+        return stats
+
+    def _apply_policy(self, response):
+        if 'Cache-Control' in response.headers and request.endpoint != 'static':
+            return
+        policy = self.policies.get(request.endpoint, self.default_policy)
+        if callable(policy):
+            policy = policy()
+        if policy:
+            response.headers['Cache-Control'] = policy
+
+    def _is_compressible(self, response):
+        return response.mimetype.startswith(COMPRESSIBLE_TYPES)
+
+    @staticmethod
+    def _is_shareable(response):
+        cache_control = response.headers.get('Cache-Control', '')
+        return not any(directive in cache_control for directive in UNCACHEABLE_DIRECTIVES)
+
+    def _choose_encoding(self, response, size):
+        if size < self.min_size or not self._is_compressible(response):
+            return None
+        accepted = request.accept_encodings
+        best, best_quality = None, 0
+        for encoding in ENCODING_PREFERENCE:
+            quality = accepted[encoding]
+            if encoding in ENCODERS and quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def _compress(self, etag, encoding, load, size, shareable):
+        """Comprimir, reaproveitando o resultado de corpos já vistos
+
+        ``load`` devolve o corpo e só é chamado quando não há resultado no cache.
+        """
+        key = (etag, encoding)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._stats['cache_hits'] += 1
+                self._stats['bytes_in'] += size
+                self._stats['bytes_out'] += len(cached)
+                return cached
+
+        data = load()
+        compressed = ENCODERS[encoding](data)
+        with self._lock:
+            self._stats['compressed'] += 1
+            self._stats['bytes_in'] += len(data)
+            self._stats['bytes_out'] += len(compressed)
+            if shareable:
+                self._cache[key] = compressed
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return compressed
+
+
+class RequestMetrics:
+    """Contagem, latência e requisições em andamento por rota, método e status"""
+
+    def __init__(self, registry, app=None):
+        self.requests = registry.counter(
+            'fontes_http_requests_total', 'Requisições HTTP atendidas',
+            ('route', 'method', 'status'))
+        self.latency = registry.histogram(
+            'fontes_http_request_duration_seconds', 'Duração das requisições HTTP',
+            ('route', 'method', 'status'))
+        self.in_flight = registry.gauge(
+            'fontes_http_requests_in_flight', 'Requisições HTTP em andamento')
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Registrar os ganchos (antes dos demais before_request)"""
+        app.before_request(self._start)
+        app.after_request(self._record)
+        app.teardown_request(self._finish)
+
+    def _start(self):
+        g._metrics_started = time.perf_counter()
+        self.in_flight.inc()
+
+    def _record(self, response):
+        started = g.get('_metrics_started')
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            labels = (route, request.method, str(response.status_code))
+            self.requests.inc(*labels)
+            self.latency.observe(time.perf_counter() - started, *labels)
+        return response
+
+    def _finish(self, exc):
+        if g.pop('_metrics_started', None) is not None:
+            self.in_flight.dec()
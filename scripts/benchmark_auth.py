@@ -0,0 +1,113 @@
+"""
+Sistema FONTES v3.0 - Benchmark de Autenticação
+Mede logins por segundo do AuthenticationSystem num banco temporário
+
+O PBKDF2 roda na própria thread com custo mínimo (--iterations) para que o
+resultado reflita o caminho no banco de dados (consultas, transações e
+logs), e não o hash. O limitador de tentativas fica desligado: os milhares
+de logins do mesmo usuário e IP seriam recusados antes da verificação.
+
+Com --profile, a instrumentação SQL fica ligada durante o benchmark e o
+relatório (tempo por operação e por statement) é gravado em JSON.
+
+Uso: python scripts/benchmark_auth.py [--logins N] [--threads 1 4] [--iterations N] [--profile ARQUIVO]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_DIR, 'src'))
+
+
+def create_auth(db_path, iterations, profile_sql=False):
+    """AuthenticationSystem do benchmark: PBKDF2 inline e sem limitador de tentativas"""
+    from auth.authentication import AuthenticationSystem
+    from auth.password_hashing import PasswordHasher
+    from utils.rate_limit import NoLoginThrottle
+
+    return AuthenticationSystem(db_path,
+                                hasher=PasswordHasher(executor='inline'),
+                                kdf_iterations=iterations,
+                                profile_sql=profile_sql,
+                                throttle=NoLoginThrottle())
+
+
+def run_logins(auth, username, password, total, threads):
+    """
+    Executa ``total`` logins divididos entre ``threads`` threads.
+
+    Returns:
+        tuple: (logins/s, logins bem-sucedidos)
+    """
+    per_thread = total // threads
+    succeeded = []
+
+    def worker():
+        for _ in range(per_thread):
+            if auth.authenticate(username, password, '127.0.0.1')[0]:
+                succeeded.append(1)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    # Logs ainda na fila fazem parte do custo
+    auth.audit_writer.flush()
+    elapsed = time.perf_counter() - started
+
+    return per_thread * threads / elapsed, len(succeeded)
+
+
+def main():
+    """Função principal do benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark de logins do Sistema FONTES")
+    parser.add_argument('--logins', type=int, default=2000, help='Logins por cenário (padrão: 2000)')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4], help='Threads por cenário (padrão: 1 4)')
+    parser.add_argument('--iterations', type=int, default=1, help='Iterações do PBKDF2 (padrão: 1)')
+    parser.add_argument('--profile', metavar='ARQUIVO', help='Gravar o relatório da instrumentação SQL em JSON')
+    args = parser.parse_args()
+    if args.profile:
+        args.profile = os.path.abspath(args.profile)
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        auth = create_auth(os.path.join(temp_dir, 'bench.db'), args.iterations, bool(args.profile))
+        auth.create_user('bench', 'senha123', 'Usuário Benchmark')
+
+        print("🏁 Benchmark de autenticação")
+        print(f"   {args.logins} logins por cenário, PBKDF2 com {args.iterations} iterações")
+        print("=" * 50)
+        for threads in args.threads:
+            success_rate, succeeded = run_logins(auth, 'bench', 'senha123', args.logins, threads)
+            failed_rate, _ = run_logins(auth, 'bench', 'errada', args.logins, threads)
+            if succeeded != args.logins // threads * threads:
+                print(f"⚠️  Apenas {succeeded} logins válidos foram aceitos")
+            print(f"🔓 Sucesso  ({threads} thread{'s' if threads > 1 else ''}): {success_rate:8.0f} logins/s")
+            print(f"🚫 Falha    ({threads} thread{'s' if threads > 1 else ''}): {failed_rate:8.0f} logins/s")
+
+        if args.profile:
+            report = auth.sql_profile_report()
+            with open(args.profile, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            print("=" * 50)
+            print(f"📈 Instrumentação SQL gravada em {args.profile}")
+            for op in report['operations']:
+                print(f"   {op['name']:<20} {op['count']:>7} chamadas  {op['total_ms']:>9.1f} ms "
+                      f"(banco {op['db_ms']:.1f} ms)")
+
+        auth.close()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
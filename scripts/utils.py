@@ -172,6 +172,7 @@ def optimize_static_files():
         total_size = 0
         
         for root, dirs, files in os.walk(static_dir):
+            dirs[:] = [d for d in dirs if d != 'dist']  # saída do build
             for file in files:
                 file_path = os.path.join(root, file)
                 file_count += 1
@@ -180,7 +181,14 @@ def optimize_static_files():
         print(f"📊 Encontrados {file_count} arquivos estáticos")
         print(f"📏 Tamanho total: {total_size / 1024:.2f} KB")
         
-        # TODO: Implementar otimizações reais (minificação, compressão, etc.)
+        # Minificação, nomes com hash, .gz e manifesto
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from static_assets import build_assets
+        
+        for item in build_assets(os.path.abspath(static_dir)):
+            print(f"  📦 {item['asset']} -> {item['file']}: "
+                  f"{item['original_bytes'] / 1024:.1f} KB -> {item['minified_bytes'] / 1024:.1f} KB "
+                  f"(gzip {item['gzip_bytes'] / 1024:.1f} KB)")
         
         print("✅ Arquivos estáticos otimizados!")
         return True
@@ -1,17 +1,36 @@
 """
 Módulo de Autenticação - Sistema FONTES
 Sistema completo de login, sessões e controle de usuários
+
+Os nomes exportados são carregados no primeiro acesso: importar um
+submódulo (ex.: auth.authentication) não carrega a interface gráfica nem
+cria a instância global ``auth_system``.
 """
 
-from .authentication import auth_system, AuthenticationSystem
-from .login_clean import show_login_window, LoginWindow
-from .admin_panel import show_admin_panel, AdminPanel
+from importlib import import_module
+
+_EXPORTS = {
+    'auth_system': '.authentication',
+    'AuthenticationSystem': '.authentication',
+    'AuthContext': '.auth_context',
+    'show_login_window': '.login_clean',
+    'LoginWindow': '.login_clean',
+    'show_admin_panel': '.admin_panel',
+    'AdminPanel': '.admin_panel',
+}
 
 __all__ = [
     'auth_system',
     'AuthenticationSystem', 
+    'AuthContext',
     'show_login_window',
     'LoginWindow',
     'show_admin_panel',
     'AdminPanel'
 ]
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(_EXPORTS[name], __name__), name)
@@ -18,6 +18,32 @@ if src_dir not in sys.path:
 
 from auth.authentication import auth_system
 
+LOGS_PAGE_SIZE = 200  # Eventos por página na aba de logs
+AUTO_REFRESH_MS = 5000  # Intervalo da verificação de alterações no banco
+PERFORMANCE_TAB = "📈 Performance"
+MAINTENANCE_TAB = "🧰 Manutenção"
+REPORT_TEXT_COLUMNS = ("Operação", "SQL", "Tarefa", "Status", "Última execução", "Próxima", "Início", "Detalhes")
+
+# Nomes das tarefas de manutenção na interface
+MAINTENANCE_TASK_LABELS = {
+    'optimize': "PRAGMA optimize",
+    'vacuum': "Vacuum",
+    'backup': "Backup automático",
+    'analyze': "ANALYZE",
+    'integrity_check': "Verificação de integridade",
+}
+
+def format_bytes(value: Optional[int]) -> str:
+    """Formatar tamanho em bytes (KB/MB/GB); negativos indicam crescimento"""
+    if value is None:
+        return "-"
+    size = float(value)
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
 class AdminPanel(ctk.CTkToplevel):
     """Painel de administração do sistema"""
     
@@ -74,6 +100,8 @@ class AdminPanel(ctk.CTkToplevel):
         # Criar abas
         self.create_users_tab()
         self.create_logs_tab()
+        self.create_performance_tab()
+        self.create_maintenance_tab()
         self.create_settings_tab()
     
     def create_header(self):
@@ -117,6 +145,13 @@ class AdminPanel(ctk.CTkToplevel):
                                     command=self.show_add_user_dialog)
         add_user_btn.pack(side="left", padx=(0, 10))
         
+        # Botão para importar usuários em lote
+        import_users_btn = ctk.CTkButton(controls_frame,
+                                        text="📥 Importar",
+                                        font=ctk.CTkFont(size=14),
+                                        command=self.import_users)
+        import_users_btn.pack(side="left", padx=(0, 10))
+        
         # Botão para atualizar lista
         refresh_btn = ctk.CTkButton(controls_frame,
                                    text="🔄 Atualizar",
@@ -208,6 +243,16 @@ class AdminPanel(ctk.CTkToplevel):
                                          command=self.filter_logs)
         self.log_filter.pack(side="left")
         
+        # Próxima página (paginação por cursor no backend)
+        self.logs_cursor = None
+        self.logs_paged = False
+        self.load_more_logs_btn = ctk.CTkButton(controls_frame,
+                                               text="⬇️ Carregar Mais",
+                                               font=ctk.CTkFont(size=14),
+                                               state="disabled",
+                                               command=lambda: self.load_logs(append=True))
+        self.load_more_logs_btn.pack(side="left", padx=(10, 0))
+        
         # Frame para tabela de logs
         logs_table_frame = ctk.CTkFrame(self.logs_tab)
         logs_table_frame.pack(fill="both", expand=True)
@@ -242,6 +287,127 @@ class AdminPanel(ctk.CTkToplevel):
         logs_v_scrollbar.pack(side="right", fill="y", pady=10)
         logs_h_scrollbar.pack(side="bottom", fill="x", padx=(10, 20))
     
+    def create_performance_tab(self):
+        """Criar aba de instrumentação SQL (tempo por operação e por statement)"""
+        self.performance_tab = self.notebook.add(PERFORMANCE_TAB)
+        
+        # Frame de controles
+        controls_frame = ctk.CTkFrame(self.performance_tab, fg_color="transparent")
+        controls_frame.pack(fill="x", pady=(0, 10))
+        
+        self.profiling_var = ctk.BooleanVar(value=auth_system.profiler is not None)
+        profiling_switch = ctk.CTkSwitch(controls_frame,
+                                         text="Instrumentação SQL",
+                                         variable=self.profiling_var,
+                                         command=self.toggle_profiling)
+        profiling_switch.pack(side="left", padx=(0, 10))
+        
+        refresh_btn = ctk.CTkButton(controls_frame,
+                                    text="🔄 Atualizar",
+                                    font=ctk.CTkFont(size=14),
+                                    command=self.load_performance)
+        refresh_btn.pack(side="left", padx=(0, 10))
+        
+        reset_btn = ctk.CTkButton(controls_frame,
+                                  text="🗑️ Zerar",
+                                  font=ctk.CTkFont(size=14),
+                                  fg_color="gray",
+                                  command=self.reset_profiling)
+        reset_btn.pack(side="left", padx=(0, 10))
+        
+        export_btn = ctk.CTkButton(controls_frame,
+                                   text="💾 Exportar JSON",
+                                   font=ctk.CTkFont(size=14),
+                                   command=self.export_performance)
+        export_btn.pack(side="left")
+        
+        self.performance_status = ctk.CTkLabel(controls_frame, text="",
+                                               text_color=("gray60", "gray40"))
+        self.performance_status.pack(side="right")
+        
+        # Operações de alto nível (authenticate, validate_session, get_*_logs...)
+        self.operations_tree = self._create_report_tree(
+            self.performance_tab, [("Operação", 160), ("Chamadas", 80), ("Total ms", 90), ("Média ms", 80),
+             ("p95 ms", 80), ("Banco ms", 90), ("Statements", 90)], height=6)
+        
+        # Statements por tempo total
+        self.statements_tree = self._create_report_tree(
+            self.performance_tab, [("SQL", 420), ("Execuções", 80), ("Total ms", 90), ("Média ms", 80),
+             ("p95 ms", 80), ("Passos VM", 90), ("Triggers", 70)], height=8)
+        self.statements_tree.bind("<<TreeviewSelect>>", self.show_statement_plan)
+        
+        # Plano da execução mais lenta do statement selecionado
+        self.plan_text = ctk.CTkTextbox(self.performance_tab, height=110,
+                                        font=ctk.CTkFont(family="Courier", size=12))
+        self.plan_text.pack(fill="x", pady=(5, 0))
+        self.performance_report = None
+    
+    def _create_report_tree(self, parent, columns, height):
+        """Criar uma tabela das abas de performance e manutenção"""
+        frame = ctk.CTkFrame(parent)
+        frame.pack(fill="both", expand=True, pady=(0, 5))
+        
+        tree = ttk.Treeview(frame, columns=[col for col, _ in columns], show="headings", height=height)
+        for col, width in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=width, anchor="w" if col in REPORT_TEXT_COLUMNS else "e")
+        
+        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side="left", fill="both", expand=True, padx=(10, 0), pady=5)
+        scrollbar.pack(side="right", fill="y", pady=5)
+        return tree
+    
+    def create_maintenance_tab(self):
+        """Criar aba de manutenção do banco (tarefas agendadas e histórico)"""
+        self.maintenance_tab = self.notebook.add(MAINTENANCE_TAB)
+        
+        # Frame de controles
+        controls_frame = ctk.CTkFrame(self.maintenance_tab, fg_color="transparent")
+        controls_frame.pack(fill="x", pady=(0, 10))
+        
+        refresh_btn = ctk.CTkButton(controls_frame,
+                                    text="🔄 Atualizar",
+                                    font=ctk.CTkFont(size=14),
+                                    command=self.load_maintenance)
+        refresh_btn.pack(side="left", padx=(0, 10))
+        
+        run_due_btn = ctk.CTkButton(controls_frame,
+                                    text="▶️ Executar pendentes",
+                                    font=ctk.CTkFont(size=14),
+                                    command=lambda: self.run_maintenance(None))
+        run_due_btn.pack(side="left", padx=(0, 10))
+        
+        self.maintenance_task_var = ctk.StringVar(value=MAINTENANCE_TASK_LABELS['optimize'])
+        task_menu = ctk.CTkOptionMenu(controls_frame,
+                                      values=list(MAINTENANCE_TASK_LABELS.values()),
+                                      variable=self.maintenance_task_var)
+        task_menu.pack(side="left", padx=(0, 5))
+        
+        run_task_btn = ctk.CTkButton(controls_frame,
+                                     text="Executar tarefa",
+                                     font=ctk.CTkFont(size=14),
+                                     fg_color="gray",
+                                     command=self.run_selected_maintenance)
+        run_task_btn.pack(side="left")
+        
+        # Tamanho do banco, páginas livres e janela de manutenção
+        self.maintenance_status = ctk.CTkLabel(self.maintenance_tab, text="", anchor="w",
+                                               text_color=("gray60", "gray40"))
+        self.maintenance_status.pack(fill="x", padx=10, pady=(0, 5))
+        
+        # Situação de cada tarefa
+        self.maintenance_tasks_tree = self._create_report_tree(
+            self.maintenance_tab,
+            [("Tarefa", 200), ("Intervalo", 80), ("Última execução", 150), ("Status", 100),
+             ("Duração ms", 90), ("Recuperado", 100), ("Próxima", 150)], height=5)
+        
+        # Histórico de execuções
+        self.maintenance_history_tree = self._create_report_tree(
+            self.maintenance_tab,
+            [("Início", 150), ("Tarefa", 180), ("Status", 100), ("Duração ms", 90),
+             ("Antes", 90), ("Depois", 90), ("Detalhes", 260)], height=10)
+    
     def create_settings_tab(self):
         """Criar aba de configurações"""
         # Adicionar aba
@@ -320,6 +486,210 @@ class AdminPanel(ctk.CTkToplevel):
         """Carregar dados iniciais"""
         self.load_users()
         self.load_logs()
+        
+        # Estado atual do banco; a partir daqui só o que mudar é recarregado
+        _, self.change_token = auth_system.changed_tables()
+        self.after(AUTO_REFRESH_MS, self.auto_refresh)
+    
+    def auto_refresh(self):
+        """Verificação periódica de alterações (custa um PRAGMA quando nada mudou)"""
+        if not self.winfo_exists():
+            return
+        self.refresh_changed()
+        if auth_system.profiler is not None and self.notebook.get() == PERFORMANCE_TAB:
+            self.load_performance()
+        if self.notebook.get() == MAINTENANCE_TAB:
+            self.load_maintenance()
+        self.after(AUTO_REFRESH_MS, self.auto_refresh)
+    
+    def refresh_changed(self):
+        """Recarregar apenas as tabelas alteradas desde a última verificação"""
+        try:
+            changed, self.change_token = auth_system.changed_tables(self.change_token)
+        except Exception as e:
+            print(f"Erro ao verificar alterações: {e}")
+            return
+        
+        if 'users' in changed:
+            self.load_users()
+        if changed & {'users', 'access_logs'}:
+            self.load_statistics()
+        # Não descartar as páginas que o usuário já carregou
+        if 'access_logs' in changed and not self.logs_paged:
+            self.load_logs()
+    
+    def toggle_profiling(self):
+        """Ligar/desligar a instrumentação SQL"""
+        if self.profiling_var.get():
+            auth_system.enable_sql_profiling()
+        else:
+            auth_system.disable_sql_profiling()
+        self.load_performance()
+    
+    def reset_profiling(self):
+        """Descartar as medições acumuladas"""
+        if auth_system.sql_profiler is not None:
+            auth_system.sql_profiler.reset()
+        self.load_performance()
+    
+    def load_performance(self):
+        """Carregar o relatório da instrumentação SQL"""
+        def load():
+            try:
+                report = auth_system.sql_profile_report()
+                self.after(0, lambda: self.update_performance(report))
+            except Exception as e:
+                message = f"Erro ao carregar performance: {e}"
+                self.after(0, lambda: messagebox.showerror("Erro", message))
+        
+        thread = threading.Thread(target=load, daemon=True)
+        thread.start()
+    
+    def update_performance(self, report: Optional[Dict]):
+        """Atualizar as tabelas da aba de performance"""
+        self.performance_report = report
+        for tree in (self.operations_tree, self.statements_tree):
+            for item in tree.get_children():
+                tree.delete(item)
+        self.plan_text.delete("1.0", "end")
+        
+        if report is None:
+            self.performance_status.configure(text="Instrumentação desligada")
+            return
+        
+        state = "ligada" if auth_system.profiler is not None else "pausada"
+        self.performance_status.configure(
+            text=f"Instrumentação {state} - {report['elapsed_s']:.0f} s desde {report['started_at'][11:19]}")
+        
+        for op in report['operations']:
+            self.operations_tree.insert("", "end", values=(
+                op['name'], op['count'], f"{op['total_ms']:.1f}", f"{op['mean_ms']:.2f}",
+                f"{op['p95_ms']:.2f}", f"{op['db_ms']:.1f}", op['statements']))
+        
+        for index, stmt in enumerate(report['statements']):
+            self.statements_tree.insert("", "end", iid=str(index), values=(
+                stmt['sql'], stmt['count'], f"{stmt['total_ms']:.1f}", f"{stmt['mean_ms']:.3f}",
+                f"{stmt['p95_ms']:.2f}", stmt['vm_steps'], stmt['sqlite_statements'] - stmt['count']))
+    
+    def show_statement_plan(self, event=None):
+        """Mostrar o plano da execução mais lenta do statement selecionado"""
+        selection = self.statements_tree.selection()
+        if not selection or not self.performance_report:
+            return
+        sql = self.performance_report['statements'][int(selection[0])]['sql']
+        
+        lines = [sql, ""]
+        slow = next((item for item in self.performance_report['slowest'] if item['sql'] == sql), None)
+        if slow is None:
+            lines.append("Nenhuma execução entre as mais lentas")
+        else:
+            lines.append(f"Mais lenta: {slow['elapsed_ms']:.2f} ms em {slow['operation'] or '-'} "
+                         f"({slow['thread']}, {slow['at']})")
+            lines.extend(f"  {row}" for row in (slow['plan'] or ["(sem plano)"]))
+        
+        self.plan_text.delete("1.0", "end")
+        self.plan_text.insert("1.0", "\n".join(lines))
+    
+    def export_performance(self):
+        """Salvar o relatório da instrumentação em JSON"""
+        if auth_system.sql_profiler is None:
+            messagebox.showinfo("Performance", "Ligue a instrumentação SQL antes de exportar")
+            return
+        
+        path = filedialog.asksaveasfilename(
+            title="Exportar Relatório de Performance",
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(auth_system.sql_profiler.to_json())
+            messagebox.showinfo("Performance", f"Relatório salvo em:\n{path}")
+        except OSError as e:
+            messagebox.showerror("Erro", f"Erro ao salvar relatório: {e}")
+    
+    def load_maintenance(self):
+        """Carregar estado e histórico da manutenção do banco"""
+        def load():
+            try:
+                status = auth_system.maintenance.status()
+                history = auth_system.maintenance.history()
+                self.after(0, lambda: self.update_maintenance(status, history))
+            except Exception as e:
+                message = f"Erro ao carregar manutenção: {e}"
+                self.after(0, lambda: messagebox.showerror("Erro", message))
+        
+        thread = threading.Thread(target=load, daemon=True)
+        thread.start()
+    
+    def update_maintenance(self, status: Dict, history: List[Dict]):
+        """Atualizar as tabelas da aba de manutenção"""
+        for tree in (self.maintenance_tasks_tree, self.maintenance_history_tree):
+            for item in tree.get_children():
+                tree.delete(item)
+        
+        settings = status['settings']
+        state = "em execução" if status['running'] else (
+            "dentro da janela" if status['in_window'] else "fora da janela")
+        self.maintenance_status.configure(
+            text=f"Banco: {format_bytes(status['db_bytes'])} | WAL: {format_bytes(status['wal_bytes'])} | "
+                 f"Livre: {format_bytes(status['free_bytes'])} ({status['free_pages']} páginas) | "
+                 f"auto_vacuum {status['auto_vacuum']} | Janela {settings['window_start']:02d}h-"
+                 f"{settings['window_end']:02d}h, {settings['time_budget_s']} s por execução ({state})")
+        
+        for task in status['tasks']:
+            run = task['last_run'] or {}
+            label = MAINTENANCE_TASK_LABELS.get(task['task'], task['task'])
+            self.maintenance_tasks_tree.insert("", "end", values=(
+                label if task['enabled'] else f"{label} (desativada)",
+                f"{task['interval_s'] // 3600} h",
+                run.get('started_at', "Nunca"),
+                run.get('status', "-"),
+                f"{run['elapsed_ms']:.0f}" if run else "-",
+                format_bytes(run['bytes_reclaimed']) if run else "-",
+                task['next_due'] or "Pendente"))
+        
+        for run in history:
+            details = run['details']
+            self.maintenance_history_tree.insert("", "end", values=(
+                run['started_at'],
+                MAINTENANCE_TASK_LABELS.get(run['task'], run['task']),
+                run['status'],
+                f"{run['elapsed_ms']:.0f}",
+                format_bytes(run['bytes_before']),
+                format_bytes(run['bytes_after']),
+                ", ".join(f"{key}: {value}" for key, value in details.items())))
+    
+    def run_selected_maintenance(self):
+        """Executar a tarefa escolhida no menu"""
+        label = self.maintenance_task_var.get()
+        task = next(name for name, text in MAINTENANCE_TASK_LABELS.items() if text == label)
+        self.run_maintenance([task])
+    
+    def run_maintenance(self, tasks: Optional[List[str]]):
+        """Executar tarefas de manutenção em segundo plano (None = todas as pendentes)"""
+        def run():
+            try:
+                if tasks is None:
+                    result = auth_system.maintenance.run_due(force=True)
+                else:
+                    result = auth_system.maintenance.run(tasks)
+                self.after(0, lambda: self.maintenance_finished(result))
+            except Exception as e:
+                message = f"Erro na manutenção: {e}"
+                self.after(0, lambda: messagebox.showerror("Erro", message))
+        
+        self.maintenance_status.configure(text="Executando manutenção...")
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+    
+    def maintenance_finished(self, result: Dict):
+        """Mostrar o resultado de uma execução manual"""
+        if not result['ran']:
+            messagebox.showinfo("Manutenção", "Nenhuma tarefa pendente")
+        self.load_maintenance()
     
     def load_users(self):
         """Carregar lista de usuários"""
@@ -328,7 +698,8 @@ class AdminPanel(ctk.CTkToplevel):
                 users = auth_system.get_users()
                 self.after(0, lambda: self.update_users_table(users))
             except Exception as e:
-                self.after(0, lambda: messagebox.showerror("Erro", f"Erro ao carregar usuários: {e}"))
+                message = f"Erro ao carregar usuários: {e}"
+                self.after(0, lambda: messagebox.showerror("Erro", message))
         
         thread = threading.Thread(target=load, daemon=True)
         thread.start()
@@ -359,23 +730,33 @@ class AdminPanel(ctk.CTkToplevel):
                 last_login
             ))
     
-    def load_logs(self):
-        """Carregar logs de acesso"""
+    def load_logs(self, append: bool = False):
+        """Carregar logs de acesso (uma página, com o filtro selecionado)"""
+        selected = self.log_filter_var.get()
+        action = None if selected == "Todos" else selected
+        cursor = self.logs_cursor if append else None
+        
         def load():
             try:
-                logs = auth_system.get_access_logs(200)
-                self.after(0, lambda: self.update_logs_table(logs))
+                page = auth_system.query_access_logs(action=action, cursor=cursor, page_size=LOGS_PAGE_SIZE)
+                self.after(0, lambda: self.update_logs_table(page['logs'], page['next_cursor'], append))
             except Exception as e:
-                self.after(0, lambda: messagebox.showerror("Erro", f"Erro ao carregar logs: {e}"))
+                message = f"Erro ao carregar logs: {e}"
+                self.after(0, lambda: messagebox.showerror("Erro", message))
         
         thread = threading.Thread(target=load, daemon=True)
         thread.start()
     
-    def update_logs_table(self, logs: List[Dict]):
+    def update_logs_table(self, logs: List[Dict], next_cursor=None, append: bool = False):
         """Atualizar tabela de logs"""
-        # Limpar tabela
-        for item in self.logs_tree.get_children():
-            self.logs_tree.delete(item)
+        # Limpar tabela (exceto ao acrescentar a próxima página)
+        if not append:
+            for item in self.logs_tree.get_children():
+                self.logs_tree.delete(item)
+        
+        self.logs_cursor = next_cursor
+        self.logs_paged = append
+        self.load_more_logs_btn.configure(state="normal" if next_cursor else "disabled")
         
         # Adicionar logs
         for log in logs:
@@ -392,9 +773,8 @@ class AdminPanel(ctk.CTkToplevel):
             ))
     
     def filter_logs(self, selected_filter):
-        """Filtrar logs por ação"""
-        self.load_logs()  # Por simplicidade, recarregar todos os logs
-        # TODO: Implementar filtro real no backend
+        """Filtrar logs por ação (filtro aplicado no banco)"""
+        self.load_logs()
     
     def show_user_context_menu(self, event):
         """Mostrar menu de contexto para usuários"""
@@ -426,6 +806,38 @@ class AdminPanel(ctk.CTkToplevel):
             thread = threading.Thread(target=create, daemon=True)
             thread.start()
     
+    def import_users(self):
+        """Importar usuários de um arquivo CSV ou JSONL"""
+        path = filedialog.askopenfilename(
+            title="Importar Usuários",
+            filetypes=[("CSV / JSONL", "*.csv *.jsonl *.ndjson"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        
+        def run():
+            report = auth_system.create_users_bulk(path)
+            self.after(0, lambda: self.handle_import_result(report))
+        
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+    
+    def handle_import_result(self, report: Dict):
+        """Mostrar o relatório da importação"""
+        lines = [f"{report['created']} usuários criados, {report['failed']} com erro "
+                 f"({report['elapsed_ms'] / 1000:.1f} s)"]
+        for error in report['errors'][:15]:
+            line = f"Linha {error['line']}" if error['line'] else "Arquivo"
+            lines.append(f"{line}: {error['username'] or '-'} - {error['error']}")
+        if len(report['errors']) > 15:
+            lines.append(f"... e mais {len(report['errors']) - 15} erros")
+        
+        if report['errors']:
+            messagebox.showwarning("Importação", "\n".join(lines))
+        else:
+            messagebox.showinfo("Importação", lines[0])
+        self.refresh_changed()
+    
     def edit_user(self, event=None):
         """Editar usuário selecionado"""
         user_id = self.get_selected_user_id()
@@ -563,7 +975,7 @@ class AdminPanel(ctk.CTkToplevel):
         """Tratar resultado de operação com usuário"""
         if success:
             messagebox.showinfo("Sucesso", message)
-            self.load_users()
+            self.refresh_changed()
         else:
             messagebox.showerror("Erro", message)
     
@@ -571,26 +983,16 @@ class AdminPanel(ctk.CTkToplevel):
         """Carregar estatísticas do sistema"""
         def load():
             try:
-                users = auth_system.get_users()
-                logs = auth_system.get_access_logs(50)
-                
-                # Calcular estatísticas
-                total_users = len(users)
-                active_users = len([u for u in users if u['is_active']])
-                admin_users = len([u for u in users if u['role'] == 'admin'])
-                recent_logins = len([l for l in logs if l['action'] == 'LOGIN_SUCCESS'])
-                
-                stats = {
-                    'total_users': total_users,
-                    'active_users': active_users,
-                    'admin_users': admin_users,
-                    'recent_logins': recent_logins
-                }
+                # Contadores mantidos pelo banco, custo constante
+                stats = auth_system.get_statistics()
                 
                 self.after(0, lambda: self.update_statistics(stats))
                 
             except Exception as e:
                 print(f"Erro ao carregar estatísticas: {e}")
+        
+        thread = threading.Thread(target=load, daemon=True)
+        thread.start()
     
     def update_statistics(self, stats: Dict):
         """Atualizar estatísticas na interface"""
@@ -603,7 +1005,10 @@ class AdminPanel(ctk.CTkToplevel):
             ("👥 Total de Usuários", stats['total_users']),
             ("✅ Usuários Ativos", stats['active_users']),
             ("👑 Administradores", stats['admin_users']),
-            ("🔑 Logins Recentes", stats['recent_logins'])
+            ("🔑 Logins (24h)", stats['logins_24h']),
+            ("🚫 Falhas (24h)", stats['failed_logins_24h']),
+            ("📅 Logins (7 dias)", stats['logins_7d']),
+            ("📆 Logins (30 dias)", stats['logins_30d'])
         ]
         
         for i, (label, value) in enumerate(stats_data):
@@ -629,7 +1034,6 @@ class AdminPanel(ctk.CTkToplevel):
         """Fazer backup do banco de dados"""
         try:
             from tkinter import filedialog
-            import shutil
             import datetime
             
             # Solicitar local para salvar backup
@@ -644,9 +1048,8 @@ class AdminPanel(ctk.CTkToplevel):
             )
             
             if backup_path:
-                # Copiar banco de dados
-                db_path = os.path.join("database", "users.db")
-                shutil.copy2(db_path, backup_path)
+                # API de backup do SQLite: inclui o conteúdo ainda no WAL
+                auth_system.maintenance.backup(backup_path)
                 
                 messagebox.showinfo("Sucesso", f"Backup salvo com sucesso em:\n{backup_path}")
                 
@@ -1051,7 +1454,7 @@ class UserLogsWindow(ctk.CTkToplevel):
     
     def create_user_stats(self):
         """Criar estatísticas do usuário"""
-        stats_frame = ctk.CTkFrame(self, height=80)
+        stats_frame = ctk.CTkFrame(self, height=140)
         stats_frame.pack(fill="x", padx=20, pady=(0, 20))
         stats_frame.pack_propagate(False)
         
@@ -1073,6 +1476,25 @@ class UserLogsWindow(ctk.CTkToplevel):
             value_widget = ctk.CTkLabel(stat_frame, text=value, font=ctk.CTkFont(size=11))
             value_widget.pack()
         
+        # Contadores de eventos (preenchidos por load_user_logs)
+        summary_data = [
+            ('total_events', "📈 Eventos"),
+            ('successful_logins', "✅ Logins"),
+            ('failed_logins', "❌ Falhas"),
+            ('logouts', "🚪 Logouts")
+        ]
+        
+        for i, (key, label) in enumerate(summary_data):
+            stat_frame = ctk.CTkFrame(stats_frame, fg_color="transparent")
+            stat_frame.grid(row=1, column=i, padx=10, pady=(0, 10), sticky="ew")
+            
+            label_widget = ctk.CTkLabel(stat_frame, text=label, font=ctk.CTkFont(size=12, weight="bold"))
+            label_widget.pack()
+            
+            value_widget = ctk.CTkLabel(stat_frame, text="-", font=ctk.CTkFont(size=11))
+            value_widget.pack()
+            self.stats_labels[key] = value_widget
+        
         # Configurar grid
         for i in range(4):
             stats_frame.grid_columnconfigure(i, weight=1)
@@ -1083,13 +1505,22 @@ class UserLogsWindow(ctk.CTkToplevel):
             try:
                 # Buscar logs específicos do usuário
                 logs = auth_system.get_user_logs(self.user_data['id'])
+                # Contadores calculados no banco, não sobre os eventos carregados
+                summary = auth_system.get_user_log_summary(self.user_data['id'])
                 self.after(0, lambda: self.update_logs_table(logs))
+                self.after(0, lambda: self.update_user_summary(summary))
             except Exception as e:
-                self.after(0, lambda: messagebox.showerror("Erro", f"Erro ao carregar logs: {e}"))
+                message = f"Erro ao carregar logs: {e}"
+                self.after(0, lambda: messagebox.showerror("Erro", message))
         
         thread = threading.Thread(target=load, daemon=True)
         thread.start()
     
+    def update_user_summary(self, summary):
+        """Atualizar contadores de eventos do usuário"""
+        for key, label in self.stats_labels.items():
+            label.configure(text=str(summary.get(key, 0)))
+    
     def update_logs_table(self, logs):
         """Atualizar tabela de logs"""
         # Limpar tabela
@@ -1270,12 +1701,31 @@ class SystemSettingsDialog(ctk.CTkToplevel):
                                      text="Backup automático diário",
                                      variable=self.auto_backup_var)
         backup_check.pack(side="left")
+        
+        # Janela de manutenção do banco (hora local)
+        window_frame = ctk.CTkFrame(system_frame, fg_color="transparent")
+        window_frame.pack(fill="x", padx=15, pady=(0, 15))
+        
+        window_label = ctk.CTkLabel(window_frame, text="Janela de manutenção (hora inicial/final):")
+        window_label.pack(side="left")
+        
+        self.window_end_var = ctk.StringVar(value="5")
+        window_end_entry = ctk.CTkEntry(window_frame, textvariable=self.window_end_var, width=50)
+        window_end_entry.pack(side="right")
+        
+        self.window_start_var = ctk.StringVar(value="2")
+        window_start_entry = ctk.CTkEntry(window_frame, textvariable=self.window_start_var, width=50)
+        window_start_entry.pack(side="right", padx=(0, 5))
     
     def load_current_settings(self):
         """Carregar configurações atuais"""
         try:
             # Carregar da configuração atual do sistema
             self.session_duration_var.set(str(auth_system.session_duration))
+            maintenance = auth_system.maintenance.settings
+            self.auto_backup_var.set(maintenance['auto_backup'])
+            self.window_start_var.set(str(maintenance['window_start']))
+            self.window_end_var.set(str(maintenance['window_end']))
             # Outras configurações podem ser carregadas de um arquivo de config
         except Exception as e:
             print(f"Erro ao carregar configurações: {e}")
@@ -1287,6 +1737,8 @@ class SystemSettingsDialog(ctk.CTkToplevel):
             session_duration = int(self.session_duration_var.get())
             max_attempts = int(self.max_attempts_var.get())
             lockout_time = int(self.lockout_time_var.get())
+            window_start = int(self.window_start_var.get())
+            window_end = int(self.window_end_var.get())
             
             if session_duration < 1 or session_duration > 365:
                 messagebox.showerror("Erro", "Duração da sessão deve estar entre 1 e 365 dias")
@@ -1300,8 +1752,15 @@ class SystemSettingsDialog(ctk.CTkToplevel):
                 messagebox.showerror("Erro", "Tempo de bloqueio deve estar entre 1 e 1440 minutos")
                 return
             
+            if not (0 <= window_start <= 23 and 0 <= window_end <= 23):
+                messagebox.showerror("Erro", "A janela de manutenção deve usar horas entre 0 e 23")
+                return
+            
             # Aplicar configurações
             auth_system.session_duration = session_duration
+            auth_system.maintenance.update_settings(auto_backup=self.auto_backup_var.get(),
+                                                    window_start=window_start,
+                                                    window_end=window_end)
             
             # Salvar em arquivo de configuração (implementar posteriormente)
             settings = {
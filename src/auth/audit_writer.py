@@ -0,0 +1,302 @@
+"""
+Gravador Assíncrono de Auditoria - Sistema FONTES
+Gravação em lote (group commit) dos logs de acesso
+
+Os eventos de auditoria (LOGIN_SUCCESS, LOGIN_FAILED, LOGOUT...) são
+colocados em uma fila limitada e gravados por uma thread em segundo plano,
+várias linhas por transação. Assim o login não espera pelo fsync do log.
+
+- Lote gravado a cada ``flush_interval_ms`` ou ``batch_size`` linhas
+- Política de fila cheia: 'block', 'drop' ou 'sync'
+- Esvaziamento garantido no encerramento do processo (atexit)
+- Contadores de profundidade da fila e latência de gravação
+
+Autor: Sistema FONTES
+Data: 2025
+"""
+
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+import logging
+from typing import Dict, List, Optional, Sequence
+
+from .connection_manager import ConnectionManager
+
+# Valores padrão da fila de auditoria
+DEFAULT_AUDIT_QUEUE_SIZE = 10000
+DEFAULT_AUDIT_BATCH_SIZE = 200
+DEFAULT_AUDIT_FLUSH_INTERVAL_MS = 250
+DEFAULT_AUDIT_BLOCK_TIMEOUT = 0.05  # segundos aguardando vaga na política 'block'
+
+OVERFLOW_POLICIES = ('block', 'drop', 'sync')
+
+_STOP = object()
+
+
+class AuditLogWriter:
+    """
+    Gravador de auditoria com fila limitada e commit em grupo.
+
+    Políticas quando a fila está cheia:
+    - 'block': aguarda até ``block_timeout`` segundos por uma vaga e descarta
+      o evento se ela não surgir (a latência do login fica limitada)
+    - 'drop': descarta o evento imediatamente
+    - 'sync': grava o evento na thread chamadora (não perde eventos, mas
+      devolve o custo de I/O ao chamador)
+    """
+
+    def __init__(self, connections: ConnectionManager, insert_sql: str,
+                 max_queue_size: int = DEFAULT_AUDIT_QUEUE_SIZE,
+                 batch_size: int = DEFAULT_AUDIT_BATCH_SIZE,
+                 flush_interval_ms: int = DEFAULT_AUDIT_FLUSH_INTERVAL_MS,
+                 overflow_policy: str = 'block',
+                 block_timeout: float = DEFAULT_AUDIT_BLOCK_TIMEOUT) -> None:
+        """
+        Inicializar gravador de auditoria.
+
+        Args:
+            connections (ConnectionManager): Gerenciador de conexões do banco
+            insert_sql (str): INSERT parametrizado usado para cada linha
+            max_queue_size (int): Capacidade máxima da fila
+            batch_size (int): Máximo de linhas por transação
+            flush_interval_ms (int): Tempo máximo que uma linha espera na fila
+            overflow_policy (str): 'block', 'drop' ou 'sync'
+            block_timeout (float): Espera máxima por vaga na política 'block'
+        """
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Política de fila inválida: {overflow_policy}")
+
+        self.connections = connections
+        self.insert_sql = insert_sql
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._pid = os.getpid()
+        self._closed = False
+        self._atexit_registered = False
+
+        self._stats = {
+            'submitted': 0,
+            'written': 0,
+            'dropped': 0,
+            'written_sync': 0,
+            'failed': 0,
+            'batches': 0,
+            'max_queue_depth': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0,
+        }
+
+    def submit(self, row: Sequence) -> bool:
+        """
+        Enfileirar uma linha de auditoria.
+
+        Args:
+            row (Sequence): Parâmetros do INSERT
+
+        Returns:
+            bool: False se o evento foi descartado
+        """
+        if self._closed:
+            return self._write_sync(row)
+
+        self._ensure_running()
+        self._increment('submitted')
+
+        try:
+            if self.overflow_policy == 'block':
+                self._queue.put(row, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            if self.overflow_policy == 'sync':
+                return self._write_sync(row)
+            self._increment('dropped')
+            logging.warning("Fila de auditoria cheia, evento descartado")
+            return False
+
+        depth = self._queue.qsize()
+        if depth > self._stats['max_queue_depth']:
+            self._stats['max_queue_depth'] = depth
+        return True
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """
+        Aguardar a gravação de todos os eventos enfileirados até agora.
+
+        Args:
+            timeout (float, optional): Tempo máximo de espera em segundos
+
+        Returns:
+            bool: True se a fila foi gravada dentro do prazo
+        """
+        if self._thread is None or not self._thread.is_alive() or os.getpid() != self._pid:
+            return True
+
+        marker = threading.Event()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """
+        Gravar os eventos pendentes e encerrar a thread de gravação.
+
+        Args:
+            timeout (float, optional): Tempo máximo de espera em segundos
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+
+        if thread is not None and thread.is_alive() and os.getpid() == self._pid:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+            if thread.is_alive():
+                logging.error("Gravador de auditoria não encerrou dentro do prazo")
+
+    def stats(self) -> Dict:
+        """
+        Obter contadores do gravador.
+
+        Returns:
+            Dict: Contadores de eventos, profundidade da fila e latência
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['avg_flush_ms'] = (stats['total_flush_ms'] / stats['batches']) if stats['batches'] else 0.0
+        stats['overflow_policy'] = self.overflow_policy
+        return stats
+
+    def _ensure_running(self) -> None:
+        """Iniciar a thread de gravação (também após um fork)"""
+        pid = os.getpid()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and pid == self._pid:
+            return
+
+        with self._lock:
+            if pid != self._pid:
+                # Eventos herdados pertencem ao processo pai, que os gravará
+                self._queue = queue.Queue(maxsize=self.max_queue_size)
+                self._pid = pid
+                self._thread = None
+
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+                self._thread.start()
+
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+
+    def _run(self) -> None:
+        """Laço da thread de gravação"""
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _STOP:
+                    return
+
+                batch: List[Sequence] = []
+                markers: List[threading.Event] = []
+                stop = self._collect(item, batch, markers)
+
+                deadline = time.monotonic() + self.flush_interval
+                while not stop and not markers and len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    stop = self._collect(item, batch, markers)
+
+                if batch:
+                    self._write_batch(batch)
+                for marker in markers:
+                    marker.set()
+                if stop:
+                    return
+        finally:
+            self._drain()
+            self.connections.close()
+
+    def _collect(self, item, batch: List[Sequence], markers: List[threading.Event]) -> bool:
+        """Separar linhas, marcadores de flush e o sinal de parada"""
+        if item is _STOP:
+            return True
+        if isinstance(item, threading.Event):
+            markers.append(item)
+        else:
+            batch.append(item)
+        return False
+
+    def _drain(self) -> None:
+        """Gravar o que restou na fila ao encerrar"""
+        batch: List[Sequence] = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is not _STOP:
+                batch.append(item)
+        if batch:
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: List[Sequence]) -> None:
+        """Gravar um lote em uma única transação"""
+        started = time.perf_counter()
+        try:
+            with self.connections.connect() as conn:
+                conn.executemany(self.insert_sql, batch)
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao gravar lote de auditoria ({len(batch)} eventos): {e}")
+            self._increment('failed', len(batch))
+            return
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._stats['written'] += len(batch)
+            self._stats['batches'] += 1
+            self._stats['last_flush_ms'] = elapsed_ms
+            self._stats['total_flush_ms'] += elapsed_ms
+            if elapsed_ms > self._stats['max_flush_ms']:
+                self._stats['max_flush_ms'] = elapsed_ms
+
+    def _write_sync(self, row: Sequence) -> bool:
+        """Gravar uma linha na thread chamadora"""
+        try:
+            with self.connections.connect() as conn:
+                conn.execute(self.insert_sql, row)
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao registrar log: {e}")
+            self._increment('failed')
+            return False
+        self._increment('written_sync')
+        return True
+
+    def _increment(self, name: str, amount: int = 1) -> None:
+        """Incrementar um contador"""
+        with self._lock:
+            self._stats[name] += amount
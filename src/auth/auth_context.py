@@ -0,0 +1,60 @@
+"""
+Contexto de Autenticação - Sistema FONTES
+Resultado imutável de um login ou de uma validação de sessão
+
+Cada chamada de ``AuthenticationSystem.login`` ou ``resolve_session``
+devolve o seu próprio ``AuthContext``, em vez de alterar atributos
+compartilhados. Assim, várias threads (servidor web com gthread/waitress,
+threads de fundo da interface) podem autenticar ao mesmo tempo com a mesma
+instância do sistema.
+
+Autor: Sistema FONTES
+Data: 2025
+"""
+
+import datetime
+from typing import Dict, NamedTuple, Optional
+
+
+class AuthContext(NamedTuple):
+    """Usuário autenticado e a sessão que o identifica"""
+    user_id: int
+    username: str
+    full_name: str
+    email: Optional[str]
+    role: str
+    session_token: str
+    expires_at: datetime.datetime
+
+    @classmethod
+    def from_user(cls, user: Dict, session_token: str,
+                  expires_at: datetime.datetime) -> 'AuthContext':
+        """
+        Criar contexto a partir do dicionário de usuário.
+
+        Args:
+            user (Dict): Dados do usuário ('id', 'username', 'full_name', 'email', 'role')
+            session_token (str): Token da sessão
+            expires_at (datetime): Expiração da sessão
+
+        Returns:
+            AuthContext: Contexto imutável
+        """
+        return cls(user['id'], user['username'], user['full_name'], user['email'],
+                   user['role'], session_token, expires_at)
+
+    @property
+    def is_admin(self) -> bool:
+        """Verificar se o usuário é administrador"""
+        return self.role == 'admin'
+
+    @property
+    def user(self) -> Dict:
+        """Dados do usuário no formato de dicionário (cópia nova a cada acesso)"""
+        return {
+            'id': self.user_id,
+            'username': self.username,
+            'full_name': self.full_name,
+            'email': self.email,
+            'role': self.role
+        }
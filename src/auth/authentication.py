@@ -19,15 +19,80 @@ import os
 import datetime
 import uuid
 import base64
-from typing import Optional, Dict, List, Tuple, Union
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Optional, Dict, List, Set, Tuple, Union
 from pathlib import Path
 import logging
 
+from .connection_manager import ConnectionManager
+from .audit_writer import AuditLogWriter
+from .session_cache import SessionCache
+from .shared_cache import create_shared_cache
+from .scheduler import PeriodicTask
+from .log_archive import AccessLogArchive
+from .maintenance import DatabaseMaintenance, create_maintenance_schema
+from .bulk_import import iter_user_rows
+from .change_tracker import ChangeTracker, ChangeToken
+from .sql_profiler import SqlProfiler, SQL_PROFILE_ENV, profiled
+from .log_schema import (ActionCatalog, create_log_schema, migrate_access_logs, pack_ip, unpack_ip,
+                         to_epoch, format_epoch, SCHEMA_VERSION, ACTION_LOGIN_SUCCESS,
+                         ACTION_LOGIN_FAILED, ACTION_LOGOUT)
+from .auth_context import AuthContext
+from .signed_tokens import (TokenSigner, RevocationList, SIGNED_TOKEN_PREFIX,
+                            load_or_create_secret)
+from .password_hashing import (PasswordHasher, HashingBusyError, BUSY_MESSAGE, HASH_ALGORITHM,
+                               encode_password_hash, decode_password_hash, digests_match,
+                               load_kdf_params)
+from utils.rate_limit import LoginThrottle, THROTTLED_MESSAGE, rate_limit_db_from_env, retry_after_header
+
 # Constantes do sistema
 DEFAULT_SESSION_DURATION = 30  # dias
 MAX_LOGIN_ATTEMPTS = 999  # Desabilitado - número muito alto para não bloquear
 LOCKOUT_DURATION = 0  # Desabilitado
-PBKDF2_ITERATIONS = 100000
+PBKDF2_ITERATIONS = 100000  # Padrão quando o nó não foi calibrado
+KDF_PARAMS_FILE = "kdf_params.json"  # Gerado por: main_unified.py --calibrate-kdf
+LOGIN_THROTTLE_FILE = "login_throttle.db"  # relativo ao diretório do banco (ver utils.rate_limit)
+
+# Limpeza da tabela de sessões
+SESSION_REAPER_INTERVAL = 3600  # segundos entre execuções
+SESSION_REAPER_BATCH_SIZE = 500  # linhas removidas por transação
+INCREMENTAL_VACUUM_PAGES = 1000  # páginas livres devolvidas por execução
+
+# Tokens de sessão assinados (opcionais)
+SESSION_SECRET_FILE = "session_secret.key"  # relativo ao diretório do banco
+SIGNED_TOKENS_ENV = 'FONTES_SIGNED_TOKENS'  # "1" liga os tokens assinados na instância global
+REVOCATION_SYNC_INTERVAL = 5  # segundos entre sincronizações da lista de revogação
+
+# Retenção dos logs de acesso (eventos antigos vão para arquivos mensais)
+LOG_RETENTION_DAYS = 180
+LOG_ARCHIVE_INTERVAL = 24 * 3600  # segundos entre execuções
+LOG_ARCHIVE_DIR = "archive"  # relativo ao diretório do banco
+
+# Manutenção do banco (ANALYZE, optimize, vacuum, integridade, backup)
+MAINTENANCE_CHECK_INTERVAL = 900  # segundos entre verificações de tarefas pendentes
+MAINTENANCE_SETTINGS_FILE = "maintenance.json"  # relativo ao diretório do banco
+BACKUP_DIR = "backups"  # relativo ao diretório do banco
+
+# Cache compartilhado entre processos (ver shared_cache)
+STATS_SNAPSHOT_TTL = 30  # segundos; a chave inclui as versões das tabelas
+LOGIN_FAILURE_WINDOW = 900  # segundos da janela dos contadores de falhas de login
+
+# UPDATE ... RETURNING no caminho de login
+SQLITE_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Importação de usuários em lote
+BULK_CHUNK_SIZE = 500  # usuários inseridos por transação
+
+ACCESS_LOG_INSERT_SQL = '''
+    INSERT INTO access_logs (ts, action_id, success, user_id, username, ip, details)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Colunas lidas pelas consultas de logs (ver _log_row)
+LOG_SELECT_COLUMNS = 'id, ts, username, action_id, success, details, ip'
 
 
 class AuthenticationSystem:
@@ -41,27 +106,208 @@ class AuthenticationSystem:
     - Controle de tentativas de login
     """
     
-    def __init__(self, db_path: str = "database/users.db") -> None:
+    def __init__(self, db_path: str = "database/users.db",
+                 pragmas: Optional[Dict[str, Union[int, str]]] = None,
+                 hasher: Optional[PasswordHasher] = None,
+                 kdf_iterations: Optional[int] = None,
+                 session_reaper_interval: Optional[float] = SESSION_REAPER_INTERVAL,
+                 log_retention_days: Optional[int] = LOG_RETENTION_DAYS,
+                 maintenance_interval: Optional[float] = MAINTENANCE_CHECK_INTERVAL,
+                 signed_tokens: bool = False,
+                 profile_sql: bool = False,
+                 cache_url: Optional[str] = None,
+                 throttle: Optional[LoginThrottle] = None) -> None:
         """
         Inicializar sistema de autenticação.
         
         Args:
             db_path (str): Caminho para o arquivo do banco de dados
+            pragmas (dict, optional): PRAGMAs SQLite (busy_timeout, cache_size,
+                mmap_size, synchronous...) que substituem os valores padrão
+            hasher (PasswordHasher, optional): Serviço de hash de senhas
+                (padrão: pool de threads com um worker por núcleo)
+            kdf_iterations (int, optional): Custo do PBKDF2 para novos hashes
+                (padrão: valor calibrado em kdf_params.json ou PBKDF2_ITERATIONS)
+            session_reaper_interval (float, optional): Intervalo em segundos da
+                limpeza de sessões expiradas (None ou 0 desativa)
+            log_retention_days (int, optional): Dias de logs mantidos na tabela
+                principal antes do arquivamento diário (None desativa)
+            maintenance_interval (float, optional): Intervalo em segundos da
+                verificação de tarefas de manutenção pendentes (None ou 0 desativa
+                o agendamento; ver DatabaseMaintenance)
+            signed_tokens (bool): Emitir tokens de sessão assinados (HMAC),
+                validados sem consulta ao banco
+            profile_sql (bool): Ativar a instrumentação SQL desde o início
+                (também ativada por FONTES_SQL_PROFILE=1)
+            cache_url (str, optional): Servidor de cache compartilhado
+                (redis://host:porta/db; padrão: FONTES_CACHE_URL; vazio usa
+                apenas cache local ao processo)
+            throttle (LoginThrottle, optional): Limitador de tentativas de login
+                (padrão: banco em FONTES_RATE_LIMIT_DB ou login_throttle.db ao
+                lado do banco de usuários)
         """
         self.db_path = db_path
         self.session_duration = DEFAULT_SESSION_DURATION
-        self.current_user: Optional[Dict] = None
-        self.session_token: Optional[str] = None
-        self.session_expiry: Optional[datetime.datetime] = None
+        
+        # Sessão da interface desktop (authenticate/validate_session/logout).
+        # Código concorrente deve usar login/resolve_session/end_session, que
+        # devolvem um AuthContext por chamada e não alteram este atributo.
+        self.context: Optional[AuthContext] = None
         
         # Criar diretório do banco se não existir
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        
+        # Conexões persistentes por thread (WAL + cache de statements)
+        self.db = ConnectionManager(db_path, pragmas=pragmas)
+        
+        # Instrumentação SQL (desligada por padrão; ver enable_sql_profiling)
+        self.sql_profiler: Optional[SqlProfiler] = None
+        if profile_sql or os.environ.get(SQL_PROFILE_ENV) == '1':
+            self.enable_sql_profiling()
+        
+        # Logs de acesso gravados em lote por uma thread em segundo plano
+        self.audit_writer = AuditLogWriter(self.db, ACCESS_LOG_INSERT_SQL)
+        
+        # PBKDF2 executado em pool com limite de concorrência
+        self.hasher = hasher or PasswordHasher()
+        
+        # Custo do KDF deste nó; hashes com outro custo são refeitos no login
+        if kdf_iterations is None:
+            kdf_params = load_kdf_params(str(Path(db_path).with_name(KDF_PARAMS_FILE)))
+            kdf_iterations = int(kdf_params.get('iterations', PBKDF2_ITERATIONS))
+        self.kdf_iterations = kdf_iterations
+        
+        # Estado compartilhado entre workers/nós (Redis), com reserva local
+        self.cache = create_shared_cache(cache_url)
+        
+        # Sessões já validadas (evita a consulta sessions⋈users a cada validação)
+        self.session_cache = SessionCache(shared=self.cache)
+        
+        # Tentativas de login por IP e usuário, limitadas antes do PBKDF2
+        self.throttle = throttle or LoginThrottle(
+            rate_limit_db_from_env() or str(Path(db_path).with_name(LOGIN_THROTTLE_FILE)))
+        
+        # Versões por tabela para recarregar telas apenas quando algo mudou
+        self.changes = ChangeTracker(self.db)
+        
+        # Nomes das ações de log (a tabela guarda apenas o id)
+        self.actions = ActionCatalog(self.db)
+        
         self._create_tables()
+        self.actions.load()
         self._create_default_admin()
+        
+        # Remoção periódica de sessões expiradas/encerradas
+        self.session_reaper: Optional[PeriodicTask] = None
+        if session_reaper_interval:
+            self.session_reaper = PeriodicTask("session-reaper", self.reap_sessions,
+                                               session_reaper_interval)
+            self.session_reaper.start()
+        
+        # Arquivamento diário dos logs de acesso antigos
+        self.log_archive = AccessLogArchive(str(Path(db_path).parent / LOG_ARCHIVE_DIR))
+        self.log_archive.migrate(self.actions.id_for)
+        self.log_retention_days = log_retention_days
+        self.log_archiver: Optional[PeriodicTask] = None
+        if log_retention_days is not None:
+            self.log_archiver = PeriodicTask("access-log-archiver", self.archive_access_logs,
+                                             LOG_ARCHIVE_INTERVAL, initial_delay=60)
+            self.log_archiver.start()
+        
+        # Manutenção do banco fora do horário de uso
+        db_dir = Path(db_path).parent
+        self.maintenance = DatabaseMaintenance(db_path, self.db, str(db_dir / MAINTENANCE_SETTINGS_FILE),
+                                               str(db_dir / BACKUP_DIR),
+                                               busy_timeout_ms=int(self.db.pragmas['busy_timeout']))
+        self.maintenance_scheduler: Optional[PeriodicTask] = None
+        if maintenance_interval:
+            self.maintenance_scheduler = PeriodicTask("db-maintenance", self.maintenance.run_due,
+                                                      maintenance_interval)
+            self.maintenance_scheduler.start()
+        
+        # Tokens assinados e lista de revogação sincronizada com a tabela sessions
+        self.signer: Optional[TokenSigner] = None
+        self.revocations = RevocationList()
+        self.revocation_sync: Optional[PeriodicTask] = None
+        if signed_tokens:
+            self.signer = TokenSigner(load_or_create_secret(str(Path(db_path).with_name(SESSION_SECRET_FILE))))
+            self.sync_revocations()
+            self.revocation_sync = PeriodicTask("revocation-sync", self.sync_revocations,
+                                                REVOCATION_SYNC_INTERVAL)
+            self.revocation_sync.start()
+    
+    def close(self) -> None:
+        """Gravar logs pendentes e fechar todas as conexões com o banco de dados"""
+        for task in (self.session_reaper, self.log_archiver, self.maintenance_scheduler,
+                     self.revocation_sync):
+            if task:
+                task.stop()
+        self.audit_writer.close()
+        self.hasher.shutdown()
+        self.cache.close()
+        self.throttle.close()
+        self.db.close_all()
+    
+    @property
+    def current_user(self) -> Optional[Dict]:
+        """Usuário da sessão desktop atual"""
+        context = self.context
+        return context.user if context else None
+    
+    @property
+    def session_token(self) -> Optional[str]:
+        """Token da sessão desktop atual"""
+        context = self.context
+        return context.session_token if context else None
+    
+    @property
+    def session_expiry(self) -> Optional[datetime.datetime]:
+        """Expiração da sessão desktop atual"""
+        context = self.context
+        return context.expires_at if context else None
+    
+    @property
+    def profiler(self) -> Optional[SqlProfiler]:
+        """Instrumentação SQL ativa (None quando desligada)"""
+        return self.db.profiler
+    
+    def enable_sql_profiling(self) -> SqlProfiler:
+        """
+        Ligar a instrumentação SQL em todas as conexões.
+        
+        Religar depois de desligar continua acumulando sobre os dados
+        anteriores (use ``sql_profiler.reset()`` para recomeçar).
+        
+        Returns:
+            SqlProfiler: Coletor ativo
+        """
+        if self.sql_profiler is None:
+            self.sql_profiler = SqlProfiler(self.db_path)
+        self.db.profiler = self.sql_profiler
+        return self.sql_profiler
+    
+    def disable_sql_profiling(self) -> None:
+        """Desligar a instrumentação SQL (os dados coletados são mantidos)"""
+        self.db.profiler = None
+    
+    def sql_profile_report(self, explain: bool = True) -> Optional[Dict]:
+        """
+        Obter o relatório da instrumentação SQL.
+        
+        Args:
+            explain (bool): Incluir o plano das execuções mais lentas
+            
+        Returns:
+            Optional[Dict]: Relatório (ver SqlProfiler.report), ou None se
+            a instrumentação nunca foi ligada
+        """
+        if self.sql_profiler is None:
+            return None
+        return self.sql_profiler.report(explain=explain)
     
     def _create_tables(self) -> None:
         """Criar tabelas do banco de dados"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.db.connect() as conn:
             cursor = conn.cursor()
             
             # Tabela de usuários
@@ -88,7 +334,7 @@ class AuthenticationSystem:
                     user_id INTEGER,
                     session_token TEXT UNIQUE NOT NULL,
                     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    expires_at DATETIME NOT NULL,
+                    expires_at INTEGER NOT NULL,
                     is_active BOOLEAN DEFAULT 1,
                     ip_address TEXT,
                     user_agent TEXT,
@@ -96,31 +342,142 @@ class AuthenticationSystem:
                 )
             ''')
             
-            # Tabela de logs de acesso
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS access_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    username TEXT,
-                    action TEXT NOT NULL,
-                    ip_address TEXT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    success BOOLEAN DEFAULT 1,
-                    details TEXT,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-            ''')
+            # Bancos criados por versões anteriores: converter antes de criar
+            # índices e triggers sobre as colunas novas
+            self._migrate_schema(conn)
             
             # Índices para melhor performance
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_role ON users(role, is_active)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_created ON users(created_at)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_token ON sessions(session_token)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON access_logs(timestamp)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_username ON access_logs(username)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_inactive ON sessions(id) WHERE is_active = 0')
+            # Encerrar as sessões de um usuário (desativação, remoção, troca de função)
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions(user_id)')
+            
+            # Tabela de logs de acesso (schema compacto) e seus índices
+            create_log_schema(cursor)
+            
+            self._create_statistics_tables(cursor)
+            self.changes.create_schema(cursor)
+            create_maintenance_schema(cursor)
+            cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
             
             conn.commit()
             logging.info("Tabelas do banco de dados criadas/verificadas com sucesso")
     
+    def _migrate_schema(self, conn: sqlite3.Connection) -> None:
+        """
+        Converter um banco de versões anteriores para o schema compacto.
+        
+        access_logs passa a usar datas inteiras, ações numeradas e IPs
+        compactados (ver log_schema), copiada em lotes curtos para não
+        bloquear outros processos; sessions.expires_at passa a guardar
+        segundos desde a época. login_counts_hourly é recriada com horas
+        inteiras e preenchida de novo. A versão fica em PRAGMA user_version.
+        """
+        if conn.execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_VERSION:
+            return
+        
+        result = migrate_access_logs(conn)
+        with conn:
+            # Expirações gravadas em ISO, no horário local
+            conn.execute('''
+                UPDATE sessions SET expires_at = CAST(strftime('%s', expires_at, 'utc') AS INTEGER)
+                WHERE typeof(expires_at) = 'text'
+            ''')
+        conn.execute('DROP TRIGGER IF EXISTS trg_logs_login_counts')
+        conn.execute('DROP TABLE IF EXISTS login_counts_hourly')
+        
+        # Devolver as páginas da tabela antiga (bancos com auto_vacuum INCREMENTAL)
+        if result['rows_migrated'] and conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+            conn.executescript('PRAGMA incremental_vacuum')
+    
+    def _create_statistics_tables(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Criar contadores de estatísticas mantidos por triggers.
+        
+        stats_counters guarda os totais de usuários e login_counts_hourly os
+        logins por hora (horas desde a época). Os triggers mantêm os valores em qualquer
+        escrita, inclusive as feitas por scripts externos. Na primeira criação
+        os contadores são preenchidos a partir das tabelas existentes.
+        """
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                       "AND name IN ('stats_counters', 'login_counts_hourly')")
+        existing = {row[0] for row in cursor.fetchall()}
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stats_counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS login_counts_hourly (
+                hour INTEGER PRIMARY KEY,
+                success INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_users_stats_insert AFTER INSERT ON users
+            BEGIN
+                UPDATE stats_counters SET value = value + 1 WHERE name = 'total_users';
+                UPDATE stats_counters SET value = value + 1 WHERE name = 'active_users' AND NEW.is_active;
+                UPDATE stats_counters SET value = value + 1 WHERE name = 'admin_users' AND NEW.role = 'admin';
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_users_stats_delete AFTER DELETE ON users
+            BEGIN
+                UPDATE stats_counters SET value = value - 1 WHERE name = 'total_users';
+                UPDATE stats_counters SET value = value - 1 WHERE name = 'active_users' AND OLD.is_active;
+                UPDATE stats_counters SET value = value - 1 WHERE name = 'admin_users' AND OLD.role = 'admin';
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_users_stats_update AFTER UPDATE OF is_active, role ON users
+            BEGIN
+                UPDATE stats_counters
+                SET value = value + (NEW.is_active != 0) - (OLD.is_active != 0)
+                WHERE name = 'active_users';
+                UPDATE stats_counters
+                SET value = value + (NEW.role = 'admin') - (OLD.role = 'admin')
+                WHERE name = 'admin_users';
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_logs_login_counts AFTER INSERT ON access_logs
+            WHEN NEW.action_id IN ({ACTION_LOGIN_SUCCESS}, {ACTION_LOGIN_FAILED})
+            BEGIN
+                INSERT INTO login_counts_hourly (hour, success, failed)
+                VALUES (NEW.ts / 3600,
+                        NEW.action_id = {ACTION_LOGIN_SUCCESS}, NEW.action_id = {ACTION_LOGIN_FAILED})
+                ON CONFLICT (hour) DO UPDATE SET
+                    success = success + excluded.success,
+                    failed = failed + excluded.failed;
+            END
+        ''')
+        
+        if 'stats_counters' not in existing:
+            cursor.execute('''
+                INSERT INTO stats_counters (name, value)
+                SELECT 'total_users', COUNT(*) FROM users
+                UNION ALL SELECT 'active_users', COUNT(*) FROM users WHERE is_active
+                UNION ALL SELECT 'admin_users', COUNT(*) FROM users WHERE role = 'admin'
+            ''')
+        if 'login_counts_hourly' not in existing:
+            cursor.execute(f'''
+                INSERT INTO login_counts_hourly (hour, success, failed)
+                SELECT ts / 3600,
+                       SUM(action_id = {ACTION_LOGIN_SUCCESS}), SUM(action_id = {ACTION_LOGIN_FAILED})
+                FROM access_logs
+                WHERE action_id IN ({ACTION_LOGIN_SUCCESS}, {ACTION_LOGIN_FAILED})
+                GROUP BY ts / 3600
+            ''')
+    
     def _create_default_admin(self) -> None:
         """
         Criar usuário administrador padrão.
@@ -129,7 +486,7 @@ class AuthenticationSystem:
         usuário administrador no sistema.
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.db.connect() as conn:
                 cursor = conn.cursor()
                 
                 # Verificar se já existe um admin
@@ -159,16 +516,20 @@ class AuthenticationSystem:
             password (str): Senha em texto plano
             
         Returns:
-            str: Hash da senha codificado em base64
+            str: Hash no formato pbkdf2_sha256$iterações$salt$hash
+            
+        Raises:
+            HashingBusyError: Se o pool de hash estiver saturado
         """
         salt = os.urandom(32)
-        pwdhash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, PBKDF2_ITERATIONS)
-        return base64.b64encode(salt + pwdhash).decode('utf-8')
+        pwdhash = self.hasher.derive(password, salt, self.kdf_iterations)
+        return encode_password_hash(self.kdf_iterations, salt, pwdhash)
     
     def _verify_password(self, stored_password: str, provided_password: str) -> bool:
         """
         Verificar se a senha fornecida corresponde ao hash armazenado.
-        Suporta tanto formato base64 quanto formato salt:hash
+        Suporta o formato atual (algoritmo$iterações$salt$hash) e os formatos
+        antigos base64 e salt:hash
         
         Args:
             stored_password (str): Hash da senha armazenado
@@ -176,30 +537,46 @@ class AuthenticationSystem:
             
         Returns:
             bool: True se a senha estiver correta
+            
+        Raises:
+            HashingBusyError: Se o pool de hash estiver saturado
         """
         try:
-            # Verificar se é formato salt:hash (novo formato do reset_account.py)
-            if ':' in stored_password:
-                salt_hex, hash_hex = stored_password.split(':', 1)
-                salt = bytes.fromhex(salt_hex)
-                stored_hash = bytes.fromhex(hash_hex)
-                pwdhash = hashlib.pbkdf2_hmac('sha256', provided_password.encode('utf-8'), salt, PBKDF2_ITERATIONS)
-                return pwdhash.hex() == hash_hex
-            else:
-                # Formato base64 (formato original)
-                stored_data = base64.b64decode(stored_password.encode('utf-8'))
-                salt = stored_data[:32]
-                stored_hash = stored_data[32:]
-                pwdhash = hashlib.pbkdf2_hmac('sha256', provided_password.encode('utf-8'), salt, PBKDF2_ITERATIONS)
-                return pwdhash == stored_hash
+            stored = decode_password_hash(stored_password)
+            if stored.algorithm != HASH_ALGORITHM:
+                logging.error(f"Algoritmo de hash não suportado: {stored.algorithm}")
+                return False
+            
+            pwdhash = self.hasher.derive(provided_password, stored.salt, stored.iterations)
+            return digests_match(stored.digest, pwdhash)
             
+        except HashingBusyError:
+            raise
         except Exception as e:
             logging.error(f"Erro na verificação de senha: {e}")
             return False
     
+    def _needs_rehash(self, stored_password: str) -> bool:
+        """
+        Verificar se o hash armazenado difere dos parâmetros atuais do KDF.
+        
+        Args:
+            stored_password (str): Hash da senha armazenado
+            
+        Returns:
+            bool: True se o hash deve ser refeito com o custo atual
+        """
+        try:
+            stored = decode_password_hash(stored_password)
+        except ValueError:
+            return True
+        return (stored.legacy or stored.algorithm != HASH_ALGORITHM
+                or stored.iterations != self.kdf_iterations)
+    
+    @profiled('authenticate')
     def authenticate(self, username: str, password: str, ip_address: Optional[str] = None) -> Tuple[bool, str, Optional[Dict]]:
         """
-        Autenticar usuário no sistema.
+        Autenticar usuário e torná-lo o usuário atual da interface desktop.
         
         Args:
             username (str): Nome de usuário
@@ -209,102 +586,240 @@ class AuthenticationSystem:
         Returns:
             Tuple[bool, str, Optional[Dict]]: (sucesso, mensagem, dados_usuario)
         """
+        success, message, context = self.login(username, password, ip_address)
+        if context is None:
+            return success, message, None
+        
+        self.context = context
+        return success, message, context.user
+    
+    @profiled('login')
+    def login(self, username: str, password: str,
+              ip_address: Optional[str] = None) -> Tuple[bool, str, Optional[AuthContext]]:
+        """
+        Autenticar usuário e criar uma sessão, sem alterar o estado da instância.
+        
+        Seguro para chamadas simultâneas de várias threads. Tentativas acima
+        do limite por IP/usuário (ver utils.rate_limit) são recusadas sem
+        consultar o banco nem calcular o PBKDF2.
+        
+        Args:
+            username (str): Nome de usuário
+            password (str): Senha fornecida
+            ip_address (str, optional): Endereço IP do usuário
+            
+        Returns:
+            Tuple[bool, str, Optional[AuthContext]]: (sucesso, mensagem, contexto)
+        """
+        retry_after = self.throttle.acquire(ip=ip_address, user=username)
+        if retry_after:
+            return False, THROTTLED_MESSAGE.format(seconds=retry_after_header(retry_after)), None
+        
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Buscar usuário
-                cursor.execute('''
-                    SELECT id, username, password_hash, full_name, email, role, is_active, 
-                           login_attempts, locked_until
-                    FROM users WHERE username = ?
-                ''', (username,))
-                
-                user = cursor.fetchone()
-                
-                if not user:
-                    self._log_access(None, username, "LOGIN_FAILED", ip_address, False, "Usuário não encontrado")
-                    return False, "Usuário ou senha incorretos", None
-                
-                user_id, db_username, password_hash, full_name, email, role, is_active, login_attempts, locked_until = user
-                
-                # Verificar se conta está ativa
-                if not is_active:
-                    self._log_access(user_id, username, "LOGIN_BLOCKED", ip_address, False, "Conta desativada")
-                    return False, "Conta desativada", None
-
-                # Verificar senha
-                if not self._verify_password(password_hash, password):
-                    # Incrementar tentativas de login (apenas para log)
-                    new_attempts = login_attempts + 1
-                    cursor.execute('''
-                        UPDATE users SET login_attempts = ? WHERE id = ?
-                    ''', (new_attempts, user_id))
-                    
-                    conn.commit()
-                    self._log_access(user_id, username, "LOGIN_FAILED", ip_address, False, f"Senha incorreta - Tentativa {new_attempts}")
-                    return False, "Usuário ou senha incorretos", None                # Login bem-sucedido - resetar tentativas
-                cursor.execute('''
+            conn = self.db.connect()
+            
+            # Buscar usuário (fora de transação: o PBKDF2 a seguir não deve segurar locks)
+            user = conn.execute('''
+                SELECT id, password_hash, is_active FROM users WHERE username = ?
+            ''', (username,)).fetchone()
+            
+            if not user:
+                self._log_access(None, username, "LOGIN_FAILED", ip_address, False, "Usuário não encontrado")
+                self._count_login_failure(username, ip_address)
+                return False, "Usuário ou senha incorretos", None
+            
+            user_id, password_hash, is_active = user
+            
+            # Verificar se conta está ativa
+            if not is_active:
+                self._log_access(user_id, username, "LOGIN_BLOCKED", ip_address, False, "Conta desativada")
+                return False, "Conta desativada", None
+            
+            # Verificar senha
+            if not self._verify_password(password_hash, password):
+                # Incrementar tentativas de login (apenas para log), numa única instrução
+                with conn:
+                    row = self._update_user_returning(conn, '''
+                        UPDATE users SET login_attempts = login_attempts + 1 WHERE id = ?
+                    ''', (user_id,), 'login_attempts', user_id)
+                attempts = row[0] if row else '?'
+                self._log_access(user_id, username, "LOGIN_FAILED", ip_address, False, f"Senha incorreta - Tentativa {attempts}")
+                self._count_login_failure(username, ip_address)
+                return False, "Usuário ou senha incorretos", None
+            
+            # Refazer o hash se o custo do KDF mudou (aproveita a senha
+            # em texto plano disponível apenas neste momento)
+            if self._needs_rehash(password_hash):
+                try:
+                    password_hash = self._hash_password(password)
+                except HashingBusyError:
+                    pass  # Tentar novamente no próximo login
+            
+            # Resolução de segundos, a mesma dos tokens assinados
+            expires_at = (datetime.datetime.now().replace(microsecond=0)
+                          + datetime.timedelta(days=self.session_duration))
+            
+            # Login bem-sucedido: resetar tentativas e criar a sessão numa única
+            # transação. O UPDATE devolve os dados do perfil e só afeta contas
+            # ainda ativas (a conta pode ter sido desativada durante o PBKDF2).
+            with conn:
+                profile = self._update_user_returning(conn, '''
                     UPDATE users 
-                    SET login_attempts = 0, locked_until = NULL, last_login = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                ''', (user_id,))
-                
-                # Criar sessão
-                session_token = str(uuid.uuid4())
-                expires_at = datetime.datetime.now() + datetime.timedelta(days=self.session_duration)
-                
-                cursor.execute('''
-                    INSERT INTO sessions (user_id, session_token, expires_at, ip_address)
-                    VALUES (?, ?, ?, ?)
-                ''', (user_id, session_token, expires_at.isoformat(), ip_address))
-                
-                conn.commit()
-                
-                # Definir sessão atual
-                self.current_user = {
-                    'id': user_id,
-                    'username': db_username,
-                    'full_name': full_name,
-                    'email': email,
-                    'role': role
-                }
-                self.session_token = session_token
-                self.session_expiry = expires_at
-                
-                self._log_access(user_id, username, "LOGIN_SUCCESS", ip_address, True, "Login realizado com sucesso")
-                return True, "Login realizado com sucesso", self.current_user
-                
+                    SET login_attempts = 0, locked_until = NULL, last_login = CURRENT_TIMESTAMP,
+                        password_hash = ?
+                    WHERE id = ? AND is_active = 1
+                ''', (password_hash, user_id), 'username, full_name, email, role', user_id)
+                
+                if profile:
+                    session_token = self._new_session_token(user_id, profile, expires_at)
+                    conn.execute('''
+                        INSERT INTO sessions (user_id, session_token, expires_at, ip_address)
+                        VALUES (?, ?, ?, ?)
+                    ''', (user_id, session_token, int(expires_at.timestamp()), ip_address))
+            
+            if not profile:
+                self._log_access(user_id, username, "LOGIN_BLOCKED", ip_address, False, "Conta desativada")
+                return False, "Conta desativada", None
+            
+            db_username, full_name, email, role = profile
+            context = AuthContext(user_id, db_username, full_name, email, role, session_token, expires_at)
+            self.session_cache.put(session_token, context.user, expires_at)
+            
+            # Log entregue à thread de auditoria, fora da transação do login
+            self._log_access(user_id, username, "LOGIN_SUCCESS", ip_address, True, "Login realizado com sucesso")
+            self.cache.delete(f"login_failures:user:{username}")
+            self.throttle.reset(user=username)
+            return True, "Login realizado com sucesso", context
+                
+        except HashingBusyError:
+            return False, BUSY_MESSAGE, None
         except Exception as e:
             logging.error(f"Erro na autenticação: {e}")
             return False, "Erro interno do sistema", None
     
+    def _count_login_failure(self, username: str, ip_address: Optional[str]) -> None:
+        """Incrementar os contadores de falhas (por usuário e por IP) no cache compartilhado"""
+        self.cache.incr(f"login_failures:user:{username}", LOGIN_FAILURE_WINDOW)
+        if ip_address:
+            self.cache.incr(f"login_failures:ip:{ip_address}", LOGIN_FAILURE_WINDOW)
+    
+    def recent_login_failures(self, username: Optional[str] = None,
+                              ip_address: Optional[str] = None) -> Dict:
+        """
+        Obter falhas de login recentes, somadas em todos os processos que
+        usam o mesmo cache compartilhado.
+        
+        Os contadores valem por LOGIN_FAILURE_WINDOW segundos a partir da
+        primeira falha; o do usuário é zerado no login bem-sucedido.
+        
+        Args:
+            username (str, optional): Nome de usuário
+            ip_address (str, optional): Endereço IP
+            
+        Returns:
+            Dict: 'username' e 'ip' com o número de falhas na janela
+        """
+        return {
+            'username': (self.cache.get(f"login_failures:user:{username}") or 0) if username else 0,
+            'ip': (self.cache.get(f"login_failures:ip:{ip_address}") or 0) if ip_address else 0,
+        }
+    
+    def _new_session_token(self, user_id: int, profile: tuple, expires_at: datetime.datetime) -> str:
+        """Gerar token de sessão: assinado (se habilitado) ou uuid4"""
+        if self.signer is None:
+            return str(uuid.uuid4())
+        username, full_name, email, role = profile
+        return self.signer.issue({'id': user_id, 'username': username, 'full_name': full_name,
+                                  'email': email, 'role': role}, expires_at)
+    
+    @staticmethod
+    def _update_user_returning(conn: sqlite3.Connection, sql: str, params: tuple,
+                               columns: str, user_id: int) -> Optional[tuple]:
+        """
+        Executar um UPDATE em users e devolver colunas da linha alterada.
+        
+        Usa RETURNING (SQLite 3.35+); em versões anteriores, relê a linha.
+        
+        Returns:
+            Optional[tuple]: Colunas pedidas, ou None se nenhuma linha foi alterada
+        """
+        if SQLITE_HAS_RETURNING:
+            return conn.execute(f'{sql.rstrip()} RETURNING {columns}', params).fetchone()
+        if conn.execute(sql, params).rowcount == 0:
+            return None
+        return conn.execute(f'SELECT {columns} FROM users WHERE id = ?', (user_id,)).fetchone()
+    
+    @profiled('logout')
     def logout(self, ip_address: Optional[str] = None):
-        """Fazer logout do usuário"""
-        if self.session_token:
-            try:
-                with sqlite3.connect(self.db_path) as conn:
-                    cursor = conn.cursor()
-                    cursor.execute('''
-                        UPDATE sessions SET is_active = 0 WHERE session_token = ?
-                    ''', (self.session_token,))
-                    conn.commit()
-                
-                if self.current_user:
-                    self._log_access(self.current_user['id'], self.current_user['username'], 
-                                   "LOGOUT", ip_address or "unknown", True, "Logout realizado")
-                
-            except Exception as e:
-                logging.error(f"Erro no logout: {e}")
+        """Fazer logout do usuário atual da interface desktop"""
+        context, self.context = self.context, None
+        if context:
+            self.end_session(context, ip_address)
+    
+    @profiled('end_session')
+    def end_session(self, context: AuthContext, ip_address: Optional[str] = None) -> None:
+        """
+        Encerrar uma sessão.
         
-        self.current_user = None
-        self.session_token = None
-        self.session_expiry = None
+        Args:
+            context (AuthContext): Contexto devolvido por login/resolve_session
+            ip_address (str, optional): Endereço IP do usuário
+        """
+        self.session_cache.invalidate(context.session_token)
+        try:
+            with self.db.connect() as conn:
+                conn.execute('''
+                    UPDATE sessions SET is_active = 0 WHERE session_token = ?
+                ''', (context.session_token,))
+            
+            if self.signer:
+                claims = self.signer.decode(context.session_token)
+                if claims:
+                    self.revocations.add(claims)
+            
+            self._log_access(context.user_id, context.username, 
+                           "LOGOUT", ip_address or "unknown", True, "Logout realizado")
+            
+        except Exception as e:
+            logging.error(f"Erro no logout: {e}")
     
+    @profiled('validate_session')
     def validate_session(self, session_token: str) -> bool:
-        """Validar sessão ativa"""
+        """Validar sessão e torná-la a sessão atual da interface desktop"""
+        context = self.resolve_session(session_token)
+        if context is None:
+            return False
+        
+        self.context = context
+        return True
+    
+    @profiled('resolve_session')
+    def resolve_session(self, session_token: str) -> Optional[AuthContext]:
+        """
+        Validar uma sessão, sem alterar o estado da instância.
+        
+        Seguro para chamadas simultâneas de várias threads.
+        
+        Args:
+            session_token (str): Token da sessão
+            
+        Returns:
+            Optional[AuthContext]: Contexto da sessão, ou None se inválida
+        """
+        # Token assinado: verificado sem consultar o banco
+        if self.signer and session_token.startswith(SIGNED_TOKEN_PREFIX):
+            claims = self.signer.verify(session_token)
+            if claims is None or claims.jti in self.revocations:
+                return None
+            return AuthContext(claims.user_id, claims.username, claims.full_name, claims.email,
+                               claims.role, session_token, claims.expires_at)
+        
+        cached = self.session_cache.get(session_token)
+        if cached is not None and datetime.datetime.now() <= cached['expires_at']:
+            return AuthContext.from_user(cached['user'], session_token, cached['expires_at'])
+        
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.db.connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT s.user_id, s.expires_at, u.username, u.full_name, u.email, u.role, u.is_active
@@ -315,85 +830,179 @@ class AuthenticationSystem:
                 
                 result = cursor.fetchone()
                 if not result:
-                    return False
+                    return None
                 
                 user_id, expires_at, username, full_name, email, role, is_active = result
                 
                 # Verificar se sessão expirou
-                expiry_time = datetime.datetime.fromisoformat(expires_at)
+                expiry_time = datetime.datetime.fromtimestamp(expires_at)
                 if datetime.datetime.now() > expiry_time:
                     cursor.execute('UPDATE sessions SET is_active = 0 WHERE session_token = ?', 
                                  (session_token,))
                     conn.commit()
-                    return False
+                    return None
                 
                 # Verificar se usuário ainda está ativo
                 if not is_active:
                     cursor.execute('UPDATE sessions SET is_active = 0 WHERE session_token = ?', 
                                  (session_token,))
                     conn.commit()
-                    return False
-                
-                # Atualizar sessão atual
-                self.current_user = {
-                    'id': user_id,
-                    'username': username,
-                    'full_name': full_name,
-                    'email': email,
-                    'role': role
-                }
-                self.session_token = session_token
-                self.session_expiry = expiry_time
+                    return None
                 
-                return True
+                context = AuthContext(user_id, username, full_name, email, role, session_token, expiry_time)
+                self.session_cache.put(session_token, context.user, expiry_time)
+                return context
                 
         except Exception as e:
             logging.error(f"Erro na validação de sessão: {e}")
-            return False
+            return None
+    
+    def sync_revocations(self) -> Dict:
+        """
+        Recarregar a lista de revogação a partir da tabela sessions.
+        
+        Lê as sessões assinadas encerradas e ainda não expiradas; outros
+        processos percebem uma revogação em até REVOCATION_SYNC_INTERVAL
+        segundos (o próprio processo, imediatamente).
+        
+        Returns:
+            Dict: Sessões revogadas em memória e tempo gasto (ms)
+        """
+        if self.signer is None:
+            return {'revoked': 0, 'elapsed_ms': 0.0}
+        
+        started = time.perf_counter()
+        rows = self.db.connect().execute('''
+            SELECT session_token FROM sessions
+            WHERE is_active = 0 AND expires_at > ? AND session_token LIKE ?
+        ''', (int(time.time()), SIGNED_TOKEN_PREFIX + '%'))
+        
+        revoked = []
+        for (token,) in rows:
+            claims = self.signer.decode(token)
+            if claims:
+                revoked.append(claims)
+        self.revocations.replace(revoked)
+        
+        return {'revoked': len(self.revocations), 'elapsed_ms': (time.perf_counter() - started) * 1000}
+    
+    def reap_sessions(self, batch_size: int = SESSION_REAPER_BATCH_SIZE,
+                      vacuum_pages: int = INCREMENTAL_VACUUM_PAGES) -> Dict:
+        """
+        Remover sessões expiradas e encerradas e devolver o espaço liberado.
+        
+        As remoções são feitas em lotes de ``batch_size`` linhas, cada lote em
+        sua própria transação, para não bloquear logins concorrentes.
+        
+        Args:
+            batch_size (int): Linhas removidas por transação
+            vacuum_pages (int): Máximo de páginas livres devolvidas ao sistema
+            
+        Returns:
+            Dict: Sessões removidas, páginas devolvidas e tempo gasto (ms)
+        """
+        started = time.perf_counter()
+        now = int(time.time())
+        conn = self.db.connect()
+        
+        # Sessões expiradas (idx_sessions_expires)
+        expired = self._delete_in_batches(conn, '''
+            DELETE FROM sessions WHERE id IN (
+                SELECT id FROM sessions WHERE expires_at < ? LIMIT ?
+            )
+        ''', (now,), batch_size)
+        
+        # Sessões encerradas por logout/desativação (idx_sessions_inactive).
+        # Sessões assinadas encerradas ficam até expirar: são a fonte da
+        # lista de revogação.
+        inactive = self._delete_in_batches(conn, '''
+            DELETE FROM sessions WHERE id IN (
+                SELECT id FROM sessions WHERE is_active = 0 AND session_token NOT LIKE ? LIMIT ?
+            )
+        ''', (SIGNED_TOKEN_PREFIX + '%',), batch_size)
+        
+        # Devolver páginas livres (apenas em bancos com auto_vacuum INCREMENTAL)
+        pages_reclaimed = 0
+        if vacuum_pages and conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+            free_before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            conn.executescript(f'PRAGMA incremental_vacuum({int(vacuum_pages)})')
+            pages_reclaimed = free_before - conn.execute('PRAGMA freelist_count').fetchone()[0]
+        
+        result = {
+            'expired_deleted': expired,
+            'inactive_deleted': inactive,
+            'pages_reclaimed': pages_reclaimed,
+            'elapsed_ms': (time.perf_counter() - started) * 1000,
+        }
+        if expired or inactive or pages_reclaimed:
+            logging.info(f"Limpeza de sessões: {expired} expiradas, {inactive} encerradas, "
+                         f"{pages_reclaimed} páginas devolvidas em {result['elapsed_ms']:.1f} ms")
+        return result
+    
+    def _delete_in_batches(self, conn: sqlite3.Connection, sql: str, params: tuple,
+                           batch_size: int) -> int:
+        """Executar um DELETE limitado repetidamente até não restarem linhas"""
+        total = 0
+        while True:
+            with conn:
+                deleted = conn.execute(sql, params + (batch_size,)).rowcount
+            total += deleted
+            if deleted < batch_size:
+                return total
     
     def _log_access(self, user_id: Optional[int], username: str, action: str, 
                    ip_address: Optional[str], success: bool, details: str):
-        """Registrar log de acesso"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO access_logs (user_id, username, action, ip_address, success, details)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (user_id, username, action, ip_address or "unknown", success, details))
-                conn.commit()
-        except Exception as e:
-            logging.error(f"Erro ao registrar log: {e}")
+        """
+        Registrar log de acesso.
+        
+        O evento é enfileirado para gravação em lote; o horário é capturado
+        aqui para refletir o momento do evento e não o da gravação.
+        """
+        self.audit_writer.submit((int(time.time()), self.actions.id_for(action), success,
+                                  user_id, username, pack_ip(ip_address), details))
     
+    @profiled('update_user')
     def update_user(self, user_id, username, full_name, email=None, role="user"):
         """Atualizar dados de um usuário existente"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Verificar se o novo username já existe (se diferente do atual)
-            cursor.execute('SELECT id, username FROM users WHERE id = ?', (user_id,))
-            current_user = cursor.fetchone()
-            
-            if not current_user:
-                return False, "Usuário não encontrado"
-            
-            current_username = current_user[1]
-            
-            # Se o username mudou, verificar se já existe
-            if username != current_username:
-                cursor.execute('SELECT id FROM users WHERE username = ? AND id != ?', (username, user_id))
-                if cursor.fetchone():
-                    return False, "Este nome de usuário já está em uso"
-            
-            # Atualizar dados
-            cursor.execute('''
-                UPDATE users 
-                SET username = ?, full_name = ?, email = ?, role = ?
-                WHERE id = ?
-            ''', (username, full_name, email, role, user_id))
+            with self.db.connect() as conn:
+                cursor = conn.cursor()
+                
+                # Verificar se o novo username já existe (se diferente do atual)
+                cursor.execute('SELECT id, username, full_name, email, role FROM users WHERE id = ?', (user_id,))
+                current_user = cursor.fetchone()
+                
+                if not current_user:
+                    return False, "Usuário não encontrado"
+                
+                current_username = current_user[1]
+                
+                # Se o username mudou, verificar se já existe
+                if username != current_username:
+                    cursor.execute('SELECT id FROM users WHERE username = ? AND id != ?', (username, user_id))
+                    if cursor.fetchone():
+                        return False, "Este nome de usuário já está em uso"
+                
+                # Atualizar dados
+                cursor.execute('''
+                    UPDATE users 
+                    SET username = ?, full_name = ?, email = ?, role = ?
+                    WHERE id = ?
+                ''', (username, full_name, email, role, user_id))
+                
+                # Tokens assinados carregam o perfil: revogá-los se ele mudou
+                profile_changed = (username, full_name, email, role) != tuple(current_user[1:])
+                if profile_changed:
+                    cursor.execute('''
+                        UPDATE sessions SET is_active = 0
+                        WHERE user_id = ? AND is_active = 1 AND session_token LIKE ?
+                    ''', (user_id, SIGNED_TOKEN_PREFIX + '%'))
+                
+                conn.commit()
             
-            conn.commit()
+            self.session_cache.invalidate_user(user_id)
+            if profile_changed:
+                self.sync_revocations()
             
             # Log da alteração
             self._log_access(user_id, username, 'USER_UPDATED', 'system', True, f"Dados do usuário atualizados")
@@ -403,10 +1012,11 @@ class AuthenticationSystem:
         except Exception as e:
             return False, f"Erro ao atualizar usuário: {str(e)}"
     
+    @profiled('delete_user')
     def delete_user(self, user_id: int) -> Tuple[bool, str]:
         """Deletar um usuário"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.db.connect() as conn:
                 cursor = conn.cursor()
                 
                 # Verificar se usuário existe
@@ -428,13 +1038,16 @@ class AuthenticationSystem:
                 if user_role == 'admin' and admin_count <= 1:
                     return False, "Não é possível remover o último administrador do sistema"
                 
-                # Remover sessões ativas do usuário
-                cursor.execute('DELETE FROM sessions WHERE user_id = ?', (user_id,))
+                # Encerrar sessões do usuário (removidas pela limpeza de sessões;
+                # as assinadas ficam até expirar, para continuarem revogadas)
+                cursor.execute('UPDATE sessions SET is_active = 0 WHERE user_id = ?', (user_id,))
                 
                 # Remover usuário (logs são mantidos para auditoria)
                 cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
                 
                 conn.commit()
+                self.session_cache.invalidate_user(user_id)
+                self.sync_revocations()
                 
                 # Log da remoção
                 self._log_access(None, username, 'USER_DELETED', 'system', True, f"Usuário {username} removido do sistema")
@@ -444,11 +1057,12 @@ class AuthenticationSystem:
         except Exception as e:
             return False, f"Erro ao remover usuário: {str(e)}"
     
+    @profiled('create_user')
     def create_user(self, username: str, password: str, full_name: str, 
                    email: Optional[str] = None, role: str = 'user') -> Tuple[bool, str]:
         """Criar novo usuário"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.db.connect() as conn:
                 cursor = conn.cursor()
                 
                 # Verificar se usuário já existe
@@ -467,14 +1081,229 @@ class AuthenticationSystem:
                 logging.info(f"Usuário {username} criado com sucesso")
                 return True, "Usuário criado com sucesso"
                 
+        except HashingBusyError:
+            return False, BUSY_MESSAGE
         except Exception as e:
             logging.error(f"Erro ao criar usuário: {e}")
             return False, f"Erro ao criar usuário: {e}"
     
+    @profiled('upsert_user')
+    def upsert_user(self, username: str, password: str, full_name: str,
+                    email: Optional[str] = None, role: str = 'user') -> Tuple[bool, str]:
+        """
+        Criar o usuário ou alinhar uma conta existente aos dados informados.
+    
+        Usado para contas declaradas em configuração. Perfil, status e senha
+        só são gravados se diferentes: a senha é comparada com o hash
+        armazenado, e as sessões abertas só são encerradas se ela mudou.
+    
+        Returns:
+            Tuple[bool, str]: (sucesso, mensagem)
+        """
+        try:
+            row = self.db.connect().execute('''
+                SELECT id, password_hash, full_name, email, role, is_active FROM users WHERE username = ?
+            ''', (username,)).fetchone()
+            if row is None:
+                return self.create_user(username, password, full_name, email, role)
+    
+            user_id, password_hash, *profile, is_active = row
+            results = []
+            if tuple(profile) != (full_name, email, role):
+                results.append(self.update_user(user_id, username, full_name, email, role))
+            if not is_active:
+                results.append(self.update_user_status(user_id, True))
+            if not self._verify_password(password_hash, password):
+                results.append(self.change_password(user_id, password))
+    
+            for success, message in results:
+                if not success:
+                    return False, message
+            return True, "Usuário atualizado com sucesso" if results else "Usuário já atualizado"
+    
+        except HashingBusyError:
+            return False, BUSY_MESSAGE
+        except Exception as e:
+            logging.error(f"Erro ao sincronizar usuário: {e}")
+            return False, f"Erro ao sincronizar usuário: {e}"
+    
+    @profiled('create_users_bulk')
+    def create_users_bulk(self, path: str, fmt: Optional[str] = None,
+                          chunk_size: int = BULK_CHUNK_SIZE,
+                          progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Criar usuários a partir de um arquivo CSV ou JSONL.
+        
+        O arquivo é lido em blocos de ``chunk_size`` linhas. Em cada bloco, os
+        nomes já existentes são verificados numa única consulta, as senhas são
+        derivadas em paralelo (até ``hasher.max_workers`` ao mesmo tempo) e os
+        usuários são inseridos numa única transação. Linhas inválidas ou
+        duplicadas são registradas no relatório sem interromper a importação.
+        
+        Args:
+            path (str): Caminho do arquivo (.csv, .jsonl ou .ndjson)
+            fmt (str, optional): 'csv' ou 'jsonl' (padrão: pelo sufixo)
+            chunk_size (int): Usuários por transação
+            progress (Callable, optional): Chamada com o relatório parcial após cada bloco
+            
+        Returns:
+            Dict: created, failed, errors (linha, usuário, erro) e elapsed_ms
+        """
+        started = time.perf_counter()
+        report = {'created': 0, 'failed': 0, 'errors': [], 'elapsed_ms': 0.0}
+        seen = set()
+        
+        def fail(row, error):
+            report['failed'] += 1
+            report['errors'].append({'line': row.line, 'username': row.username, 'error': error})
+        
+        def hash_row(row):
+            try:
+                return self._hash_password(row.password)
+            except HashingBusyError:
+                return None
+        
+        try:
+            rows = iter_user_rows(path, fmt)
+            with ThreadPoolExecutor(max_workers=self.hasher.max_workers,
+                                    thread_name_prefix="bulk-hash") as pool:
+                while True:
+                    chunk = list(islice(rows, chunk_size))
+                    if not chunk:
+                        break
+                    
+                    # Validação e duplicados dentro do próprio arquivo
+                    pending = []
+                    for row in chunk:
+                        if row.error:
+                            fail(row, row.error)
+                        elif row.username in seen:
+                            fail(row, "Nome de usuário repetido no arquivo")
+                        else:
+                            seen.add(row.username)
+                            pending.append(row)
+                    
+                    # Nomes já cadastrados, numa única consulta por bloco
+                    if pending:
+                        placeholders = ','.join('?' * len(pending))
+                        existing = {r[0] for r in self.db.connect().execute(
+                            f'SELECT username FROM users WHERE username IN ({placeholders})',
+                            [row.username for row in pending])}
+                        for row in [row for row in pending if row.username in existing]:
+                            fail(row, "Nome de usuário já existe")
+                        pending = [row for row in pending if row.username not in existing]
+                    
+                    hashes = list(pool.map(hash_row, pending))
+                    
+                    with self.db.connect() as conn:
+                        for row, password_hash in zip(pending, hashes):
+                            if password_hash is None:
+                                fail(row, BUSY_MESSAGE)
+                                continue
+                            try:
+                                conn.execute('''
+                                    INSERT INTO users (username, password_hash, full_name, email, role)
+                                    VALUES (?, ?, ?, ?, ?)
+                                ''', (row.username, password_hash, row.full_name, row.email, row.role))
+                                report['created'] += 1
+                            except sqlite3.IntegrityError:
+                                fail(row, "Nome de usuário já existe")
+                    
+                    if progress:
+                        progress(dict(report, elapsed_ms=(time.perf_counter() - started) * 1000))
+                        
+        except Exception as e:
+            logging.error(f"Erro na importação de usuários: {e}")
+            report['errors'].append({'line': None, 'username': None, 'error': str(e)})
+        
+        report['elapsed_ms'] = (time.perf_counter() - started) * 1000
+        logging.info(f"Importação de usuários: {report['created']} criados, "
+                     f"{report['failed']} com erro em {report['elapsed_ms']:.0f} ms")
+        return report
+    
+    @profiled('get_statistics')
+    def get_statistics(self, flush_pending: bool = False) -> Dict:
+        """
+        Obter estatísticas de usuários e logins.
+        
+        Lê apenas os contadores mantidos por triggers (stats_counters e até
+        30 dias de login_counts_hourly), então o custo não depende do tamanho
+        das tabelas de usuários e logs. As janelas de tempo têm resolução de
+        uma hora. Eventos ainda na fila de auditoria (até
+        ``flush_interval_ms`` do AuditLogWriter) só entram com ``flush_pending``.
+        
+        O resultado é guardado no cache compartilhado sob uma chave com a
+        hora atual e as versões de users e access_logs: qualquer escrita
+        nessas tabelas gera uma chave nova, e os demais processos reutilizam
+        o cálculo enquanto nada muda.
+        
+        Args:
+            flush_pending (bool): Gravar antes os eventos ainda na fila de auditoria
+            
+        Returns:
+            Dict: total_users, active_users, admin_users e logins/falhas em
+            24 horas, 7 dias e 30 dias
+        """
+        stats = {'total_users': 0, 'active_users': 0, 'admin_users': 0,
+                 'logins_24h': 0, 'failed_logins_24h': 0, 'logins_7d': 0, 'logins_30d': 0}
+        try:
+            if flush_pending:
+                self.audit_writer.flush(timeout=1.0)
+            
+            now_hour = int(time.time()) // 3600
+            versions = self.changes.table_versions()
+            snapshot_key = f"stats:{now_hour}:{versions.get('users')}:{versions.get('access_logs')}"
+            snapshot = self.cache.get(snapshot_key)
+            if snapshot is not None:
+                return snapshot
+            
+            hour_24h, hour_7d, hour_30d = (now_hour - hours for hours in (24, 7 * 24, 30 * 24))
+            
+            conn = self.db.connect()
+            for name, value in conn.execute('SELECT name, value FROM stats_counters'):
+                stats[name] = value
+            
+            row = conn.execute('''
+                SELECT SUM(CASE WHEN hour >= ? THEN success END),
+                       SUM(CASE WHEN hour >= ? THEN failed END),
+                       SUM(CASE WHEN hour >= ? THEN success END),
+                       SUM(success)
+                FROM login_counts_hourly
+                WHERE hour >= ?
+            ''', (hour_24h, hour_24h, hour_7d, hour_30d)).fetchone()
+            
+            stats.update({
+                'logins_24h': row[0] or 0,
+                'failed_logins_24h': row[1] or 0,
+                'logins_7d': row[2] or 0,
+                'logins_30d': row[3] or 0
+            })
+            self.cache.set(snapshot_key, stats, STATS_SNAPSHOT_TTL)
+            
+        except Exception as e:
+            logging.error(f"Erro ao obter estatísticas: {e}")
+        return stats
+    
+    def changed_tables(self, since: Optional[ChangeToken] = None) -> Tuple[Set[str], ChangeToken]:
+        """
+        Verificar quais tabelas (users, sessions, access_logs) mudaram.
+        
+        Sem escritas no banco desde a verificação anterior, custa apenas um
+        PRAGMA data_version, o que permite verificações frequentes.
+        
+        Args:
+            since (ChangeToken, optional): Token devolvido pela chamada anterior
+            
+        Returns:
+            Tuple[Set[str], ChangeToken]: Tabelas alteradas e o token para a próxima chamada
+        """
+        return self.changes.changed_tables(since)
+    
+    @profiled('get_users')
     def get_users(self) -> List[Dict]:
         """Obter lista de usuários"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.db.connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT id, username, full_name, email, role, is_active, 
@@ -501,80 +1330,115 @@ class AuthenticationSystem:
             logging.error(f"Erro ao obter usuários: {e}")
             return []
     
-    def get_user_logs(self, user_id):
-        """Obter logs específicos de um usuário"""
+    @profiled('get_user_logs')
+    def get_user_logs(self, user_id, limit=1000, include_archived: bool = False,
+                      flush_pending: bool = False):
+        """
+        Obter logs específicos de um usuário.
+        
+        A busca usa o user_id (índice idx_logs_user_ts), então eventos gravados
+        antes de uma troca de nome de usuário também são incluídos.
+        
+        Args:
+            user_id (int): ID do usuário
+            limit (int): Número máximo de eventos
+            include_archived (bool): Incluir eventos já movidos para os arquivos mensais
+            flush_pending (bool): Gravar antes os eventos ainda na fila de auditoria
+        """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Buscar usuário para obter o username
-                cursor.execute('SELECT username FROM users WHERE id = ?', (user_id,))
-                user_row = cursor.fetchone()
-                
-                if not user_row:
-                    return []
-                
-                username = user_row[0]
-                
-                # Buscar logs do usuário
-                cursor.execute('''
-                    SELECT timestamp, action, success, details, ip_address
-                    FROM access_logs 
-                    WHERE username = ? 
-                    ORDER BY timestamp DESC
-                    LIMIT 1000
-                ''', (username,))
-                
-                logs = []
-                for row in cursor.fetchall():
-                    logs.append({
-                        'timestamp': row[0],
-                        'action': row[1],
-                        'success': row[2],
-                        'details': row[3],
-                        'ip_address': row[4]
-                    })
-                
-                return logs
+            if flush_pending:
+                self.audit_writer.flush(timeout=1.0)
+            
+            rows = self._fetch_logs(f'''
+                SELECT {LOG_SELECT_COLUMNS}
+                FROM access_logs 
+                WHERE user_id = ? 
+                ORDER BY ts DESC
+                LIMIT ?
+            ''', (user_id,), limit, include_archived)
+            
+            return [self._log_row(row) for row in rows]
                 
         except Exception as e:
             logging.error(f"Erro ao obter logs do usuário: {e}")
             return []
     
-    def get_all_logs(self, limit=1000):
-        """Obter todos os logs do sistema"""
+    @profiled('get_user_log_summary')
+    def get_user_log_summary(self, user_id: int, flush_pending: bool = False) -> Dict:
+        """
+        Obter contadores de eventos de um usuário.
+        
+        Calculado no banco sobre o índice idx_logs_user_ts (que cobre ação e
+        sucesso), sem carregar os eventos.
+        
+        Args:
+            user_id (int): ID do usuário
+            flush_pending (bool): Gravar antes os eventos ainda na fila de auditoria
+            
+        Returns:
+            Dict: total_events, successful_logins, failed_logins, logouts, last_event
+        """
+        summary = {'total_events': 0, 'successful_logins': 0, 'failed_logins': 0,
+                   'logouts': 0, 'last_event': None}
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute('''
-                    SELECT timestamp, username, action, success, details, ip_address
-                    FROM access_logs 
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                ''', (limit,))
-                
-                logs = []
-                for row in cursor.fetchall():
-                    logs.append({
-                        'timestamp': row[0],
-                        'username': row[1],
-                        'action': row[2],
-                        'success': row[3],
-                        'details': row[4],
-                        'ip_address': row[5]
-                    })
+            if flush_pending:
+                self.audit_writer.flush(timeout=1.0)
+            
+            row = self.db.connect().execute(f'''
+                SELECT COUNT(*),
+                       SUM(action_id = {ACTION_LOGIN_SUCCESS}),
+                       SUM(action_id = {ACTION_LOGIN_FAILED}),
+                       SUM(action_id = {ACTION_LOGOUT}),
+                       MAX(ts)
+                FROM access_logs
+                WHERE user_id = ?
+            ''', (user_id,)).fetchone()
+            
+            summary.update({
+                'total_events': row[0],
+                'successful_logins': row[1] or 0,
+                'failed_logins': row[2] or 0,
+                'logouts': row[3] or 0,
+                'last_event': format_epoch(row[4])
+            })
                 
-                return logs
+        except Exception as e:
+            logging.error(f"Erro ao obter resumo de logs do usuário: {e}")
+        return summary
+    
+    @profiled('get_all_logs')
+    def get_all_logs(self, limit=1000, include_archived: bool = False,
+                     flush_pending: bool = False):
+        """
+        Obter todos os logs do sistema.
+        
+        Args:
+            limit (int): Número máximo de eventos
+            include_archived (bool): Incluir eventos já movidos para os arquivos mensais
+            flush_pending (bool): Gravar antes os eventos ainda na fila de auditoria
+        """
+        try:
+            if flush_pending:
+                self.audit_writer.flush(timeout=1.0)
+            
+            rows = self._fetch_logs(f'''
+                SELECT {LOG_SELECT_COLUMNS}
+                FROM access_logs 
+                ORDER BY ts DESC
+                LIMIT ?
+            ''', (), limit, include_archived)
+            
+            return [self._log_row(row) for row in rows]
                 
         except Exception as e:
             logging.error(f"Erro ao obter logs: {e}")
             return []
     
+    @profiled('update_user_status')
     def update_user_status(self, user_id: int, is_active: bool) -> Tuple[bool, str]:
         """Ativar/desativar usuário"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.db.connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE users SET is_active = ? WHERE id = ?
@@ -590,6 +1454,9 @@ class AuthenticationSystem:
                     ''', (user_id,))
                 
                 conn.commit()
+                self.session_cache.invalidate_user(user_id)
+                if not is_active:
+                    self.sync_revocations()
                 status = "ativado" if is_active else "desativado"
                 return True, f"Usuário {status} com sucesso"
                 
@@ -597,10 +1464,11 @@ class AuthenticationSystem:
             logging.error(f"Erro ao atualizar status do usuário: {e}")
             return False, f"Erro ao atualizar usuário: {e}"
     
+    @profiled('change_password')
     def change_password(self, user_id: int, new_password: str) -> Tuple[bool, str]:
-        """Alterar senha do usuário"""
+        """Alterar senha do usuário e encerrar as sessões abertas com a senha anterior"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.db.connect() as conn:
                 cursor = conn.cursor()
                 
                 password_hash = self._hash_password(new_password)
@@ -612,41 +1480,195 @@ class AuthenticationSystem:
                 if cursor.rowcount == 0:
                     return False, "Usuário não encontrado"
                 
+                cursor.execute('''
+                    UPDATE sessions SET is_active = 0 WHERE user_id = ? AND is_active = 1
+                ''', (user_id,))
+                
                 conn.commit()
+                self.session_cache.invalidate_user(user_id)
+                self.sync_revocations()
                 return True, "Senha alterada com sucesso"
                 
+        except HashingBusyError:
+            return False, BUSY_MESSAGE
         except Exception as e:
             logging.error(f"Erro ao alterar senha: {e}")
             return False, f"Erro ao alterar senha: {e}"
     
-    def get_access_logs(self, limit: int = 100) -> List[Dict]:
-        """Obter logs de acesso"""
+    @profiled('get_access_logs')
+    def get_access_logs(self, limit: int = 100, include_archived: bool = False,
+                        flush_pending: bool = False) -> List[Dict]:
+        """
+        Obter logs de acesso.
+        
+        Args:
+            limit (int): Número máximo de eventos
+            include_archived (bool): Incluir eventos já movidos para os arquivos mensais
+            flush_pending (bool): Gravar antes os eventos ainda na fila de auditoria
+        """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT username, action, timestamp, success, details, ip_address
-                    FROM access_logs 
-                    ORDER BY timestamp DESC 
-                    LIMIT ?
-                ''', (limit,))
-                
-                logs = []
-                for row in cursor.fetchall():
-                    logs.append({
-                        'username': row[0],
-                        'action': row[1],
-                        'timestamp': row[2],
-                        'success': row[3],
-                        'details': row[4],
-                        'ip_address': row[5]
-                    })
-                
-                return logs
+            if flush_pending:
+                self.audit_writer.flush(timeout=1.0)
+            
+            rows = self._fetch_logs(f'''
+                SELECT {LOG_SELECT_COLUMNS}
+                FROM access_logs 
+                ORDER BY ts DESC 
+                LIMIT ?
+            ''', (), limit, include_archived)
+            
+            return [self._log_row(row) for row in rows]
                 
         except Exception as e:
             logging.error(f"Erro ao obter logs: {e}")
             return []
+    
+    @profiled('query_access_logs')
+    def query_access_logs(self, action: Optional[str] = None, success: Optional[bool] = None,
+                          username: Optional[str] = None,
+                          start: Optional[Union[str, datetime.datetime]] = None,
+                          end: Optional[Union[str, datetime.datetime]] = None,
+                          cursor: Optional[Tuple[int, int]] = None, page_size: int = 100,
+                          include_archived: bool = False, flush_pending: bool = False) -> Dict:
+        """
+        Consultar logs de acesso com filtros e paginação por cursor.
+        
+        A paginação usa o par (ts, id) da última linha da página
+        anterior, então o custo de cada página não depende de quantas
+        páginas já foram lidas.
+        
+        Args:
+            action (str, optional): Filtrar por ação (ex.: LOGIN_FAILED)
+            success (bool, optional): Filtrar por sucesso/falha
+            username (str, optional): Filtrar por nome de usuário
+            start (str | datetime, optional): Início do período (inclusive, UTC)
+            end (str | datetime, optional): Fim do período (exclusivo, UTC)
+            cursor (tuple, optional): next_cursor retornado pela página anterior
+            page_size (int): Eventos por página
+            include_archived (bool): Continuar nos arquivos mensais ao fim da tabela
+            flush_pending (bool): Gravar antes os eventos ainda na fila de auditoria
+            
+        Returns:
+            Dict: {'logs': [...], 'next_cursor': (ts, id) ou None}
+        """
+        action_id = None
+        if action is not None:
+            action_id = self.actions.get_id(action)
+            if action_id is None:
+                return {'logs': [], 'next_cursor': None}
+        
+        conditions = []
+        params: list = []
+        for column, value in (('action_id', action_id), ('success', success), ('username', username)):
+            if value is not None:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        if start is not None:
+            conditions.append('ts >= ?')
+            params.append(to_epoch(start))
+        if end is not None:
+            conditions.append('ts < ?')
+            params.append(to_epoch(end))
+        if cursor is not None:
+            conditions.append('(ts, id) < (?, ?)')
+            params.extend(cursor)
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        try:
+            if flush_pending:
+                self.audit_writer.flush(timeout=1.0)
+            
+            rows = self._fetch_logs(f'''
+                SELECT {LOG_SELECT_COLUMNS}
+                FROM access_logs
+                {where}
+                ORDER BY ts DESC, id DESC
+                LIMIT ?
+            ''', tuple(params), page_size + 1, include_archived)
+            
+        except Exception as e:
+            logging.error(f"Erro ao consultar logs: {e}")
+            return {'logs': [], 'next_cursor': None}
+        
+        page = rows[:page_size]
+        logs = [self._log_row(row) for row in page]
+        
+        next_cursor = None
+        if len(rows) > page_size and page:
+            next_cursor = (page[-1][1], page[-1][0])
+        
+        return {'logs': logs, 'next_cursor': next_cursor}
+    
+    def _log_row(self, row: tuple) -> Dict:
+        """Converter uma linha (LOG_SELECT_COLUMNS) para o formato de log das telas"""
+        log_id, ts, username, action_id, success, details, ip = row
+        return {
+            'id': log_id,
+            'timestamp': format_epoch(ts),
+            'username': username,
+            'action': self.actions.name_for(action_id),
+            'success': success,
+            'details': details,
+            'ip_address': unpack_ip(ip)
+        }
+    
+    def _fetch_logs(self, sql: str, params: tuple, limit: int, include_archived: bool) -> List[tuple]:
+        """
+        Consultar a tabela access_logs e, se pedido, completar com os arquivos.
+        
+        Os arquivos só contêm eventos anteriores aos da tabela principal, então
+        a ordem decrescente por data é preservada ao concatenar os resultados.
+        
+        Args:
+            sql (str): Consulta ordenada do mais recente ao mais antigo, terminada em LIMIT ?
+            params (tuple): Parâmetros da consulta, sem o limite
+            limit (int): Número máximo de linhas
+            include_archived (bool): Consultar também os arquivos mensais
+        """
+        rows = self.db.connect().execute(sql, params + (limit,)).fetchall()
+        if include_archived and len(rows) < limit:
+            rows.extend(self.log_archive.query(sql, params, limit - len(rows)))
+        return rows
+    
+    def archive_access_logs(self, retention_days: Optional[int] = None) -> Dict:
+        """
+        Mover logs mais antigos que o período de retenção para os arquivos mensais.
+        
+        Args:
+            retention_days (int, optional): Dias mantidos na tabela principal
+                (padrão: self.log_retention_days; None ou 0 não arquiva nada)
+            
+        Returns:
+            Dict: Eventos arquivados, meses afetados e tempo gasto (ms)
+        """
+        days = self.log_retention_days if retention_days is None else retention_days
+        if not days or days <= 0:
+            return {'rows_archived': 0, 'months': [], 'elapsed_ms': 0.0}
+        cutoff = int(time.time()) - days * 24 * 3600
+        
+        self.audit_writer.flush(timeout=5.0)
+        conn = self.db.connect()
+        result = self.log_archive.archive(conn, cutoff)
+        
+        # Contadores por hora além da retenção não são mais usados
+        with conn:
+            conn.execute('DELETE FROM login_counts_hourly WHERE hour < ?', (cutoff // 3600,))
+        return result
+
+# Instância global do sistema de autenticação, criada no primeiro acesso a
+# ``auth_system`` (importar o módulo não abre o banco nem inicia threads).
+# Tokens assinados só com FONTES_SIGNED_TOKENS=1.
+_auth_system: Optional[AuthenticationSystem] = None
+_auth_system_lock = threading.Lock()
+
 
-# Instância global do sistema de autenticação
-auth_system = AuthenticationSystem()
+def __getattr__(name: str):
+    global _auth_system
+    if name != 'auth_system':
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if _auth_system is None:
+        with _auth_system_lock:
+            if _auth_system is None:
+                _auth_system = AuthenticationSystem(
+                    signed_tokens=os.environ.get(SIGNED_TOKENS_ENV) == '1')
+    return _auth_system
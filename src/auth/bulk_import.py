@@ -0,0 +1,117 @@
+"""
+Importação de Usuários em Lote - Sistema FONTES
+Leitura incremental de planilhas CSV e arquivos JSONL
+
+Os arquivos são lidos linha a linha, sem carregar tudo em memória. Cada
+linha produz um ``UserRow`` com o número da linha de origem (para o
+relatório de erros) e os campos já normalizados.
+
+Colunas aceitas: username, password, full_name, email (opcional) e
+role (opcional, 'user' ou 'admin').
+
+Autor: Sistema FONTES
+Data: 2025
+"""
+
+import csv
+import json
+from pathlib import Path
+from typing import Dict, Iterator, NamedTuple, Optional
+
+BULK_FORMATS = ('csv', 'jsonl')
+USER_ROLES = ('user', 'admin')
+REQUIRED_FIELDS = ('username', 'password', 'full_name')
+
+
+class UserRow(NamedTuple):
+    """Linha de usuário lida do arquivo de importação"""
+    line: int
+    username: str
+    password: str
+    full_name: str
+    email: Optional[str]
+    role: str
+    error: Optional[str]
+
+
+def detect_format(path: str) -> str:
+    """
+    Detectar o formato pelo sufixo do arquivo.
+
+    Args:
+        path (str): Caminho do arquivo
+
+    Returns:
+        str: 'csv' ou 'jsonl'
+
+    Raises:
+        ValueError: Se o sufixo não for reconhecido
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix == '.csv':
+        return 'csv'
+    if suffix in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    raise ValueError(f"Formato de arquivo não suportado: {suffix or path}")
+
+
+def iter_user_rows(path: str, fmt: Optional[str] = None) -> Iterator[UserRow]:
+    """
+    Ler usuários de um arquivo CSV ou JSONL, uma linha por vez.
+
+    Linhas inválidas não interrompem a leitura: são devolvidas com
+    ``error`` preenchido.
+
+    Args:
+        path (str): Caminho do arquivo
+        fmt (str, optional): 'csv' ou 'jsonl' (padrão: pelo sufixo)
+
+    Yields:
+        UserRow: Usuário lido, com a linha de origem
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in BULK_FORMATS:
+        raise ValueError(f"Formato de arquivo não suportado: {fmt}")
+
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield _make_row(reader.line_num, record)
+        else:
+            for line_num, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield _error_row(line_num, '', f"JSON inválido: {e}")
+                    continue
+                if not isinstance(record, dict):
+                    yield _error_row(line_num, '', "Linha deve ser um objeto JSON")
+                    continue
+                yield _make_row(line_num, record)
+
+
+def _make_row(line: int, record: Dict) -> UserRow:
+    """Normalizar e validar um registro"""
+    values = {key: str(record.get(key) or '').strip() for key in REQUIRED_FIELDS + ('email', 'role')}
+    # Espaços podem fazer parte da senha
+    values['password'] = str(record.get('password') or '')
+
+    missing = [key for key in REQUIRED_FIELDS if not values[key]]
+    role = values['role'].lower() or 'user'
+    if missing:
+        error = f"Campos obrigatórios ausentes: {', '.join(missing)}"
+    elif role not in USER_ROLES:
+        error = f"Função inválida: {values['role']}"
+    else:
+        error = None
+
+    return UserRow(line, values['username'], values['password'], values['full_name'],
+                   values['email'] or None, role, error)
+
+
+def _error_row(line: int, username: str, error: str) -> UserRow:
+    """Criar linha que só carrega um erro de leitura"""
+    return UserRow(line, username, '', '', None, 'user', error)
@@ -0,0 +1,123 @@
+"""
+Detecção de Alterações - Sistema FONTES
+Verificação barata de mudanças nas tabelas do sistema de autenticação
+
+Combina dois mecanismos do SQLite:
+- ``PRAGMA data_version`` muda quando outra conexão (de qualquer thread ou
+  processo) confirma uma escrita; ``total_changes`` cobre as escritas da
+  própria conexão. Se nenhum dos dois mudou, nada mudou — sem ler tabelas.
+- ``table_versions`` guarda um contador por tabela, incrementado por
+  triggers, para dizer *qual* tabela mudou.
+
+Uso típico (um painel que recarrega só o que mudou)::
+
+    changed, token = tracker.changed_tables(token)
+    if 'users' in changed:
+        recarregar_usuarios()
+
+Autor: Sistema FONTES
+Data: 2025
+"""
+
+import sqlite3
+from typing import Dict, NamedTuple, Optional, Set, Tuple
+
+from .connection_manager import ConnectionManager
+
+TRACKED_TABLES = ('users', 'sessions', 'access_logs')
+
+
+class ChangeToken(NamedTuple):
+    """Estado observado numa verificação, passado para a próxima"""
+    connection_id: int
+    data_version: int
+    total_changes: int
+    tables: Dict[str, int]
+
+
+class ChangeTracker:
+    """Detecção de alterações por data_version e versões por tabela"""
+
+    def __init__(self, connections: ConnectionManager, tables: Tuple[str, ...] = TRACKED_TABLES) -> None:
+        """
+        Inicializar detector de alterações.
+
+        Args:
+            connections (ConnectionManager): Conexões com o banco
+            tables (tuple): Tabelas acompanhadas
+        """
+        self.connections = connections
+        self.tables = tables
+
+    def create_schema(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Criar a tabela de versões e os triggers de cada tabela acompanhada.
+
+        Args:
+            cursor (sqlite3.Cursor): Cursor dentro da transação de criação do schema
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS table_versions (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        ''')
+        for table in self.tables:
+            cursor.execute('INSERT OR IGNORE INTO table_versions (name, version) VALUES (?, 0)', (table,))
+            for operation in ('INSERT', 'UPDATE', 'DELETE'):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{operation.lower()}
+                    AFTER {operation} ON {table}
+                    BEGIN
+                        UPDATE table_versions SET version = version + 1 WHERE name = '{table}';
+                    END
+                ''')
+
+    def data_version(self) -> int:
+        """
+        Obter o PRAGMA data_version da conexão da thread atual.
+
+        Returns:
+            int: Valor que muda quando outra conexão confirma uma escrita
+        """
+        return self.connections.connect().execute('PRAGMA data_version').fetchone()[0]
+
+    def table_versions(self) -> Dict[str, int]:
+        """
+        Obter a versão atual de cada tabela acompanhada.
+
+        Returns:
+            Dict[str, int]: Versão por tabela
+        """
+        conn = self.connections.connect()
+        return {name: version for name, version in conn.execute('SELECT name, version FROM table_versions')
+                if name in self.tables}
+
+    def changed_tables(self, since: Optional[ChangeToken] = None) -> Tuple[Set[str], ChangeToken]:
+        """
+        Verificar quais tabelas mudaram desde a verificação anterior.
+
+        Quando nenhuma conexão escreveu no banco, a verificação custa apenas
+        um PRAGMA. O token só é comparável na mesma thread; em outra thread
+        as versões das tabelas são relidas.
+
+        Args:
+            since (ChangeToken, optional): Token da verificação anterior
+                (None considera todas as tabelas alteradas)
+
+        Returns:
+            Tuple[Set[str], ChangeToken]: Tabelas alteradas e o novo token
+        """
+        conn = self.connections.connect()
+        data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        total_changes = conn.total_changes
+
+        if (since is not None and since.connection_id == id(conn)
+                and since.data_version == data_version and since.total_changes == total_changes):
+            return set(), since
+
+        tables = self.table_versions()
+        token = ChangeToken(id(conn), data_version, total_changes, tables)
+        if since is None:
+            return set(self.tables), token
+        return {name for name, version in tables.items() if since.tables.get(name) != version}, token
@@ -0,0 +1,179 @@
+"""
+Gerenciador de Conexões SQLite - Sistema FONTES
+Conexões persistentes por thread para o sistema de autenticação
+
+Este módulo mantém uma conexão SQLite por thread, evitando abrir e fechar
+o banco a cada operação. Características:
+- Uma conexão por thread (sqlite3 não compartilha conexões entre threads),
+  fechada quando uma nova é aberta depois que a thread dona terminou
+- Detecção de fork (workers do gunicorn não herdam conexões do processo pai)
+- Journal em modo WAL e PRAGMAs configuráveis
+- auto_vacuum INCREMENTAL em bancos novos (permite devolver páginas livres)
+- Cache de statements preparados por conexão
+- Instrumentação SQL opcional (``profiler``, ver sql_profiler)
+
+Autor: Sistema FONTES
+Data: 2025
+"""
+
+import os
+import sqlite3
+import threading
+import logging
+from typing import Dict, List, Optional, Union
+
+from .sql_profiler import ProfiledConnection, SqlProfiler
+
+# PRAGMAs aplicados em toda nova conexão
+DEFAULT_PRAGMAS: Dict[str, Union[int, str]] = {
+    'busy_timeout': 5000,        # ms aguardando locks antes de SQLITE_BUSY
+    'cache_size': -8000,         # negativo = KiB (~8 MB por conexão)
+    'mmap_size': 64 * 1024 * 1024,
+    'synchronous': 'NORMAL',     # seguro em WAL, evita fsync a cada commit
+    'temp_store': 'MEMORY',
+}
+DEFAULT_JOURNAL_MODE = 'WAL'
+DEFAULT_AUTO_VACUUM = 'INCREMENTAL'  # Só tem efeito em bancos ainda vazios
+DEFAULT_CACHED_STATEMENTS = 128
+
+
+class ConnectionManager:
+    """
+    Gerenciador de conexões SQLite por thread.
+
+    Cada thread recebe sua própria conexão, criada sob demanda e reutilizada
+    nas chamadas seguintes. Após um fork, as conexões herdadas são
+    descartadas e o processo filho abre as suas.
+
+    O objeto retornado por ``connect()`` pode ser usado como gerenciador de
+    contexto (``with manager.connect() as conn``): o bloco faz commit ao
+    terminar e rollback em caso de exceção, mas a conexão permanece aberta.
+    """
+
+    def __init__(self, db_path: str, pragmas: Optional[Dict[str, Union[int, str]]] = None,
+                 journal_mode: str = DEFAULT_JOURNAL_MODE,
+                 cached_statements: int = DEFAULT_CACHED_STATEMENTS,
+                 auto_vacuum: Optional[str] = DEFAULT_AUTO_VACUUM) -> None:
+        """
+        Inicializar gerenciador de conexões.
+
+        Args:
+            db_path (str): Caminho para o arquivo do banco de dados
+            pragmas (dict, optional): PRAGMAs que substituem os valores padrão
+            journal_mode (str): Modo de journal (padrão WAL)
+            cached_statements (int): Statements preparados mantidos por conexão
+            auto_vacuum (str, optional): Modo de auto_vacuum para bancos novos
+        """
+        self.db_path = db_path
+        self.pragmas = dict(DEFAULT_PRAGMAS)
+        if pragmas:
+            self.pragmas.update(pragmas)
+        self.journal_mode = journal_mode
+        self.cached_statements = cached_statements
+        self.auto_vacuum = auto_vacuum
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self._owners: Dict[int, threading.Thread] = {}  # id(conn) -> thread dona
+        self._pid = os.getpid()
+
+        # Instrumentação SQL: lida por todas as conexões a cada execução
+        self.profiler: Optional[SqlProfiler] = None
+
+    def connect(self) -> sqlite3.Connection:
+        """
+        Obter a conexão da thread atual, criando-a se necessário.
+
+        Returns:
+            sqlite3.Connection: Conexão exclusiva da thread atual
+        """
+        self._check_fork()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open_connection()
+            self._local.conn = conn
+        return conn
+
+    def _open_connection(self) -> sqlite3.Connection:
+        """Abrir e configurar uma nova conexão"""
+        # check_same_thread=False apenas para permitir close_all() no encerramento;
+        # cada conexão continua sendo usada somente pela thread que a criou.
+        conn = sqlite3.connect(self.db_path,
+                               timeout=self.pragmas.get('busy_timeout', 5000) / 1000,
+                               cached_statements=self.cached_statements,
+                               check_same_thread=False,
+                               factory=ProfiledConnection)
+        conn.profiler_source = self
+
+        # auto_vacuum precisa ser definido antes do WAL e de qualquer tabela;
+        # em bancos já existentes o comando é ignorado pelo SQLite
+        if self.auto_vacuum:
+            conn.execute(f'PRAGMA auto_vacuum = {self.auto_vacuum}')
+        if self.journal_mode:
+            conn.execute(f'PRAGMA journal_mode = {self.journal_mode}')
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+
+        with self._lock:
+            self._connections.append(conn)
+            self._owners[id(conn)] = threading.current_thread()
+        self._close_orphans()
+        return conn
+
+    def _close_orphans(self) -> None:
+        """Fechar conexões de threads que já terminaram"""
+        with self._lock:
+            orphans = [conn for conn in self._connections
+                       if not self._owners[id(conn)].is_alive()]
+            for conn in orphans:
+                self._connections.remove(conn)
+                del self._owners[id(conn)]
+
+        for conn in orphans:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logging.error(f"Erro ao fechar conexão: {e}")
+
+    def _check_fork(self) -> None:
+        """Descartar conexões herdadas do processo pai após um fork"""
+        pid = os.getpid()
+        if pid == self._pid:
+            return
+
+        with self._lock:
+            if pid != self._pid:
+                # Não fechar: as conexões pertencem ao processo pai
+                self._connections = []
+                self._owners = {}
+                self._local = threading.local()
+                self._pid = pid
+                logging.debug("Fork detectado, conexões SQLite herdadas descartadas")
+
+    def close(self) -> None:
+        """Fechar a conexão da thread atual"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+
+        self._local.conn = None
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+                del self._owners[id(conn)]
+        conn.close()
+
+    def close_all(self) -> None:
+        """Fechar todas as conexões abertas por este processo"""
+        with self._lock:
+            connections = self._connections
+            self._connections = []
+            self._owners = {}
+            self._local = threading.local()
+
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logging.error(f"Erro ao fechar conexão: {e}")
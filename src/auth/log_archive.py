@@ -0,0 +1,232 @@
+"""
+Arquivo de Logs de Acesso - Sistema FONTES
+Retenção e arquivamento mensal da tabela access_logs
+
+Eventos mais antigos que o período de retenção são movidos em lote para
+bancos SQLite mensais (``access_logs_AAAA_MM.db``), mantendo a tabela
+principal pequena. Os arquivos mensais têm a mesma tabela ``access_logs``
+(schema compacto, ver ``log_schema``) e podem ser consultados com o mesmo
+SQL usado na tabela principal; os ids de ação são os do banco principal.
+
+Autor: Sistema FONTES
+Data: 2025
+"""
+
+import calendar
+import re
+import sqlite3
+import time
+import logging
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+from .log_schema import ACCESS_LOGS_TABLE_SQL, ACCESS_LOG_COLUMNS, migrate_access_logs
+
+ARCHIVE_FILE_PATTERN = re.compile(r'^access_logs_(\d{4})_(\d{2})\.db$')
+DEFAULT_ARCHIVE_BATCH_SIZE = 5000
+
+ARCHIVE_INDEX_SQL = (
+    'CREATE INDEX IF NOT EXISTS {schema}.idx_logs_ts ON access_logs(ts)',
+    'CREATE INDEX IF NOT EXISTS {schema}.idx_logs_user_ts ON access_logs(user_id, ts, action_id, success)',
+)
+
+
+class AccessLogArchive:
+    """Arquivos mensais de logs de acesso"""
+
+    def __init__(self, archive_dir: str) -> None:
+        """
+        Inicializar arquivo de logs.
+
+        Args:
+            archive_dir (str): Diretório dos bancos mensais
+        """
+        self.archive_dir = Path(archive_dir)
+
+    def path_for(self, month: str) -> Path:
+        """
+        Obter o caminho do arquivo de um mês.
+
+        Args:
+            month (str): Mês no formato 'AAAA-MM'
+
+        Returns:
+            Path: Caminho do banco mensal
+        """
+        return self.archive_dir / f"access_logs_{month.replace('-', '_')}.db"
+
+    def months(self) -> List[str]:
+        """
+        Listar meses arquivados, do mais recente para o mais antigo.
+
+        Returns:
+            List[str]: Meses no formato 'AAAA-MM'
+        """
+        if not self.archive_dir.is_dir():
+            return []
+
+        months = []
+        for path in self.archive_dir.iterdir():
+            match = ARCHIVE_FILE_PATTERN.match(path.name)
+            if match:
+                months.append(f"{match.group(1)}-{match.group(2)}")
+        return sorted(months, reverse=True)
+
+    def archive(self, conn: sqlite3.Connection, cutoff: int,
+                batch_size: int = DEFAULT_ARCHIVE_BATCH_SIZE) -> Dict:
+        """
+        Mover eventos anteriores a ``cutoff`` para os arquivos mensais.
+
+        Cada lote é copiado e removido na mesma transação. A cópia usa
+        INSERT OR IGNORE pelo id original, então uma execução interrompida
+        pode ser repetida sem duplicar eventos.
+
+        Args:
+            conn (sqlite3.Connection): Conexão com o banco principal
+            cutoff (int): Data/hora limite (segundos desde a época, UTC)
+            batch_size (int): Eventos movidos por transação
+
+        Returns:
+            Dict: Eventos arquivados, meses afetados e tempo gasto (ms)
+        """
+        started = time.perf_counter()
+        months = self._months_before(conn, cutoff)
+
+        total = 0
+        if months:
+            self.archive_dir.mkdir(parents=True, exist_ok=True)
+            conn.execute('CREATE TEMP TABLE IF NOT EXISTS archive_batch (id INTEGER PRIMARY KEY)')
+
+        for month in months:
+            month_start = self._month_epoch(month)
+            upper = min(cutoff, self._month_epoch(self._next_month(month)))
+
+            conn.execute('ATTACH DATABASE ? AS archive', (str(self.path_for(month)),))
+            try:
+                with conn:
+                    conn.execute(ACCESS_LOGS_TABLE_SQL.format(schema='archive', autoincrement=''))
+                    for index_sql in ARCHIVE_INDEX_SQL:
+                        conn.execute(index_sql.format(schema='archive'))
+
+                while True:
+                    with conn:
+                        conn.execute('DELETE FROM temp.archive_batch')
+                        moved = conn.execute('''
+                            INSERT INTO temp.archive_batch (id)
+                            SELECT id FROM main.access_logs
+                            WHERE ts >= ? AND ts < ?
+                            LIMIT ?
+                        ''', (month_start, upper, batch_size)).rowcount
+                        conn.execute(f'''
+                            INSERT OR IGNORE INTO archive.access_logs ({ACCESS_LOG_COLUMNS})
+                            SELECT {ACCESS_LOG_COLUMNS} FROM main.access_logs
+                            WHERE id IN (SELECT id FROM temp.archive_batch)
+                        ''')
+                        conn.execute('DELETE FROM main.access_logs WHERE id IN (SELECT id FROM temp.archive_batch)')
+                    total += moved
+                    if moved < batch_size:
+                        break
+            finally:
+                conn.execute('DETACH DATABASE archive')
+
+        result = {
+            'rows_archived': total,
+            'months': months,
+            'elapsed_ms': (time.perf_counter() - started) * 1000,
+        }
+        if total:
+            logging.info(f"Arquivamento de logs: {total} eventos movidos para {', '.join(months)} "
+                         f"em {result['elapsed_ms']:.1f} ms")
+        return result
+
+    def migrate(self, action_ids: Callable[[str], int]) -> Dict:
+        """
+        Converter arquivos mensais do formato antigo para o schema compacto.
+
+        Args:
+            action_ids (Callable): Id de cada nome de ação no banco principal
+                (registrando ações novas), para que os arquivos usem os mesmos ids
+
+        Returns:
+            Dict: Arquivos e eventos migrados
+        """
+        files = rows = 0
+        for month in self.months():
+            conn = sqlite3.connect(str(self.path_for(month)))
+            try:
+                columns = {row[1] for row in conn.execute('PRAGMA table_info(access_logs)')}
+                actions = {}
+                if 'timestamp' in columns:
+                    actions = {name: action_ids(name) for (name,) in
+                               conn.execute('SELECT DISTINCT action FROM access_logs')}
+                migrated = migrate_access_logs(conn, autoincrement=False, actions=actions)['rows_migrated']
+                if not migrated:
+                    continue
+                for index_sql in ARCHIVE_INDEX_SQL:
+                    conn.execute(index_sql.format(schema='main'))
+                conn.execute('VACUUM')
+                rows += migrated
+                files += 1
+            finally:
+                conn.close()
+        return {'files_migrated': files, 'rows_migrated': rows}
+
+    def query(self, sql: str, params: Sequence, limit: int) -> List[tuple]:
+        """
+        Executar uma consulta nos arquivos, do mês mais recente ao mais antigo.
+
+        A consulta deve terminar em ``LIMIT ?`` (o limite restante é
+        acrescentado aos parâmetros) e ordenar do mais recente para o mais
+        antigo, como as consultas da tabela principal.
+
+        Args:
+            sql (str): Consulta sobre a tabela access_logs
+            params (Sequence): Parâmetros, sem o limite
+            limit (int): Número máximo de linhas
+
+        Returns:
+            List[tuple]: Linhas encontradas
+        """
+        rows: List[tuple] = []
+        for month in self.months():
+            if len(rows) >= limit:
+                break
+            uri = self.path_for(month).resolve().as_uri() + '?mode=ro'
+            conn = sqlite3.connect(uri, uri=True)
+            try:
+                rows.extend(conn.execute(sql, tuple(params) + (limit - len(rows),)).fetchall())
+            except sqlite3.Error as e:
+                logging.error(f"Erro ao consultar arquivo de logs {month}: {e}")
+            finally:
+                conn.close()
+        return rows
+
+    def _months_before(self, conn: sqlite3.Connection, cutoff: int) -> List[str]:
+        """
+        Listar os meses com eventos anteriores a ``cutoff``.
+
+        Uma busca no índice idx_logs_ts por mês (o primeiro evento a partir
+        do início do mês seguinte), em vez de percorrer todos os eventos.
+        """
+        months = []
+        lower = 0
+        while True:
+            row = conn.execute('SELECT MIN(ts) FROM access_logs WHERE ts >= ? AND ts < ?',
+                               (lower, cutoff)).fetchone()
+            if row[0] is None:
+                return months
+            month = time.strftime('%Y-%m', time.gmtime(row[0]))
+            months.append(month)
+            lower = self._month_epoch(self._next_month(month))
+
+    @staticmethod
+    def _month_epoch(month: str) -> int:
+        """Início do mês ('AAAA-MM') em segundos desde a época (UTC)"""
+        return calendar.timegm((int(month[:4]), int(month[5:7]), 1, 0, 0, 0))
+
+    @staticmethod
+    def _next_month(month: str) -> str:
+        """Obter o mês seguinte ('AAAA-MM')"""
+        year, mon = int(month[:4]), int(month[5:7])
+        year, mon = (year + 1, 1) if mon == 12 else (year, mon + 1)
+        return f"{year:04d}-{mon:02d}"
@@ -0,0 +1,319 @@
+"""
+Schema Compacto dos Logs de Acesso - Sistema FONTES
+Tabela access_logs com datas inteiras, ações numeradas e IPs compactados
+
+Cada evento ocupa poucos bytes além dos detalhes:
+- ``ts``: segundos desde a época (UTC), em vez de texto 'AAAA-MM-DD HH:MM:SS'
+- ``action_id``: referência à tabela ``log_actions``, em vez do nome da ação
+- ``ip``: IPv4/IPv6 compactado (4 ou 16 bytes); rótulos que não são
+  endereços ('system', 'unknown') são mantidos como texto
+
+Os índices ficam proporcionalmente menores e as buscas por período passam a
+comparar inteiros. ``migrate_access_logs`` converte uma tabela no formato
+antigo em lotes curtos, sem bloquear as demais conexões por muito tempo, e
+pode ser retomada se interrompida.
+
+Autor: Sistema FONTES
+Data: 2025
+"""
+
+import calendar
+import datetime
+import ipaddress
+import sqlite3
+import threading
+import time
+import logging
+from typing import Dict, Optional, Union
+
+SCHEMA_VERSION = 1  # PRAGMA user_version do banco com o schema compacto
+MIGRATION_BATCH_SIZE = 5000
+
+# Ações com id fixo (as demais são numeradas na primeira ocorrência)
+KNOWN_ACTIONS = (
+    'LOGIN_SUCCESS', 'LOGIN_FAILED', 'LOGIN_BLOCKED', 'LOGOUT',
+    'USER_UPDATED', 'USER_DELETED', 'PASSWORD_CHANGED',
+)
+ACTION_LOGIN_SUCCESS = 1
+ACTION_LOGIN_FAILED = 2
+ACTION_LOGOUT = 4
+
+ACCESS_LOG_COLUMNS = 'id, ts, action_id, success, user_id, username, ip, details'
+
+ACCESS_LOGS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS {schema}.access_logs (
+        id INTEGER PRIMARY KEY{autoincrement},
+        ts INTEGER NOT NULL,
+        action_id INTEGER NOT NULL,
+        success INTEGER NOT NULL DEFAULT 1,
+        user_id INTEGER,
+        username TEXT,
+        ip BLOB,
+        details TEXT
+    )
+'''
+
+# Índices compostos para filtros com paginação por cursor (ts, id); o id
+# (rowid) já faz parte de toda entrada de índice
+ACCESS_LOG_INDEX_SQL = (
+    'CREATE INDEX IF NOT EXISTS {schema}.idx_logs_ts ON access_logs(ts)',
+    'CREATE INDEX IF NOT EXISTS {schema}.idx_logs_action_ts ON access_logs(action_id, ts)',
+    'CREATE INDEX IF NOT EXISTS {schema}.idx_logs_username_ts ON access_logs(username, ts)',
+    'CREATE INDEX IF NOT EXISTS {schema}.idx_logs_success_ts ON access_logs(success, ts)',
+    # Logs por usuário: cobre a listagem ordenada e o resumo por ação
+    'CREATE INDEX IF NOT EXISTS {schema}.idx_logs_user_ts ON access_logs(user_id, ts, action_id, success)',
+)
+
+# Data de um evento antigo; nula ou inválida usa a do evento válido anterior,
+# a do seguinte ou, sem nenhum, a hora da migração
+LEGACY_TS_SQL = '''
+    CAST(strftime('%s', l.timestamp) AS INTEGER),
+    (SELECT CAST(strftime('%s', p.timestamp) AS INTEGER) FROM access_logs_legacy p
+     WHERE p.id < l.id AND strftime('%s', p.timestamp) IS NOT NULL ORDER BY p.id DESC LIMIT 1),
+    (SELECT CAST(strftime('%s', n.timestamp) AS INTEGER) FROM access_logs_legacy n
+     WHERE n.id > l.id AND strftime('%s', n.timestamp) IS NOT NULL ORDER BY n.id LIMIT 1),
+    CAST(strftime('%s', 'now') AS INTEGER)
+'''
+
+
+def pack_ip(value: Optional[str]) -> Optional[Union[bytes, str]]:
+    """
+    Compactar endereço IP para armazenamento.
+
+    Args:
+        value (str, optional): Endereço IPv4/IPv6 ou rótulo
+
+    Returns:
+        bytes | str | None: 4/16 bytes para endereços; o próprio valor para rótulos
+    """
+    if value is None:
+        return None
+    try:
+        return ipaddress.ip_address(value).packed
+    except ValueError:
+        return value
+
+
+def unpack_ip(value: Optional[Union[bytes, str]]) -> Optional[str]:
+    """Converter o valor armazenado de volta para texto"""
+    if isinstance(value, bytes):
+        return str(ipaddress.ip_address(value))
+    return value
+
+
+def to_epoch(value: Union[str, datetime.datetime, int, float]) -> int:
+    """
+    Converter data para segundos desde a época.
+
+    Textos e datas sem fuso horário são interpretados como UTC, como na
+    coluna timestamp do formato antigo.
+
+    Args:
+        value: 'AAAA-MM-DD HH:MM:SS', datetime ou número
+
+    Returns:
+        int: Segundos desde a época (UTC)
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        return int(value.timestamp())
+    return calendar.timegm(value.timetuple())
+
+
+def format_epoch(value: Optional[int]) -> Optional[str]:
+    """Formatar segundos desde a época como 'AAAA-MM-DD HH:MM:SS' (UTC)"""
+    if value is None:
+        return None
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(value))
+
+
+def create_actions_table(conn: Union[sqlite3.Connection, sqlite3.Cursor]) -> None:
+    """Criar a tabela log_actions com as ações conhecidas"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS log_actions (
+            id INTEGER PRIMARY KEY,
+            name TEXT UNIQUE NOT NULL
+        )
+    ''')
+    conn.executemany('INSERT OR IGNORE INTO log_actions (id, name) VALUES (?, ?)',
+                     list(enumerate(KNOWN_ACTIONS, start=1)))
+
+
+def create_log_schema(conn: Union[sqlite3.Connection, sqlite3.Cursor]) -> None:
+    """Criar access_logs, log_actions e os índices no banco principal"""
+    create_actions_table(conn)
+    conn.execute(ACCESS_LOGS_TABLE_SQL.format(schema='main', autoincrement=' AUTOINCREMENT'))
+    for index_sql in ACCESS_LOG_INDEX_SQL:
+        conn.execute(index_sql.format(schema='main'))
+
+
+def migrate_access_logs(conn: sqlite3.Connection, autoincrement: bool = True,
+                        actions: Optional[Dict[str, int]] = None, batch_size: int = MIGRATION_BATCH_SIZE) -> Dict:
+    """
+    Converter access_logs do formato antigo (texto) para o compacto.
+
+    A tabela antiga é renomeada para ``access_logs_legacy`` e copiada em
+    lotes, cada um na sua própria transação, preservando os ids. Se a
+    migração for interrompida, a próxima chamada continua do último lote.
+    Os índices não são criados aqui (ver ``create_log_schema``).
+
+    Eventos com data nula ou inválida recebem a data do evento válido
+    anterior (ou seguinte, ou a atual) e guardam o valor original em
+    ``details``. A tabela antiga só é removida depois de conferir que todos
+    os eventos foram copiados; caso contrário a migração falha com
+    ``sqlite3.IntegrityError`` e a tabela antiga é mantida.
+
+    Args:
+        conn (sqlite3.Connection): Conexão com o banco (ou arquivo mensal)
+        autoincrement (bool): Criar a tabela com AUTOINCREMENT (banco principal)
+        actions (Dict[str, int], optional): Ids a usar para as ações (arquivos
+            mensais seguem os ids do banco principal)
+        batch_size (int): Eventos copiados por transação
+
+    Returns:
+        Dict: Eventos migrados, eventos com data substituída e tempo gasto (ms)
+    """
+    started = time.perf_counter()
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(access_logs)')}
+    has_legacy = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'access_logs_legacy'").fetchone()
+    if 'timestamp' not in columns and not has_legacy:
+        return {'rows_migrated': 0, 'rows_repaired': 0, 'elapsed_ms': 0.0}
+
+    conn.create_function('pack_ip', 1, pack_ip, deterministic=True)
+
+    if 'timestamp' in columns:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Triggers e índices da tabela antiga seriam levados junto no RENAME
+            for kind, name in conn.execute(
+                    "SELECT type, name FROM sqlite_master WHERE tbl_name = 'access_logs' "
+                    "AND type IN ('trigger', 'index') AND sql IS NOT NULL").fetchall():
+                conn.execute(f'DROP {kind.upper()} IF EXISTS {name}')
+            conn.execute('ALTER TABLE access_logs RENAME TO access_logs_legacy')
+
+            create_actions_table(conn)
+            if actions:
+                conn.executemany('INSERT OR IGNORE INTO log_actions (id, name) VALUES (?, ?)',
+                                 [(action_id, name) for name, action_id in actions.items()])
+            conn.execute('INSERT OR IGNORE INTO log_actions (name) SELECT DISTINCT action FROM access_logs_legacy')
+            conn.execute(ACCESS_LOGS_TABLE_SQL.format(
+                schema='main', autoincrement=' AUTOINCREMENT' if autoincrement else ''))
+
+            # Novos eventos não podem reutilizar ids que ainda serão copiados
+            if autoincrement:
+                conn.execute("DELETE FROM sqlite_sequence WHERE name = 'access_logs'")
+                conn.execute('''
+                    INSERT INTO sqlite_sequence (name, seq)
+                    SELECT 'access_logs', MAX(id) FROM access_logs_legacy HAVING MAX(id) IS NOT NULL
+                ''')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    last_id = conn.execute('''
+        SELECT COALESCE(MAX(id), 0) FROM access_logs
+        WHERE id <= (SELECT COALESCE(MAX(id), 0) FROM access_logs_legacy)
+    ''').fetchone()[0]
+    migrated = repaired = 0
+    while True:
+        with conn:
+            upper = conn.execute('''
+                SELECT MAX(id) FROM (
+                    SELECT id FROM access_logs_legacy WHERE id > ? ORDER BY id LIMIT ?
+                )
+            ''', (last_id, batch_size)).fetchone()[0]
+            if upper is None:
+                break
+            repaired += conn.execute('''
+                SELECT COUNT(*) FROM access_logs_legacy
+                WHERE id > ? AND id <= ? AND strftime('%s', timestamp) IS NULL
+            ''', (last_id, upper)).fetchone()[0]
+            migrated += conn.execute(f'''
+                INSERT OR IGNORE INTO access_logs ({ACCESS_LOG_COLUMNS})
+                SELECT l.id, COALESCE({LEGACY_TS_SQL}), a.id,
+                       COALESCE(l.success, 1), l.user_id, l.username, pack_ip(l.ip_address),
+                       CASE WHEN strftime('%s', l.timestamp) IS NULL
+                            THEN COALESCE(l.details || ' ', '') || '[data original: '
+                                 || COALESCE(l.timestamp, 'nula') || ']'
+                            ELSE l.details END
+                FROM access_logs_legacy l
+                JOIN log_actions a ON a.name = l.action
+                WHERE l.id > ? AND l.id <= ?
+            ''', (last_id, upper)).rowcount
+        last_id = upper
+
+    missing = conn.execute('''
+        SELECT COUNT(*) FROM access_logs_legacy l
+        WHERE NOT EXISTS (SELECT 1 FROM access_logs WHERE id = l.id)
+    ''').fetchone()[0]
+    if missing:
+        logging.error(f"Migração de access_logs interrompida: {missing} eventos não copiados "
+                      f"(mantidos em access_logs_legacy)")
+        raise sqlite3.IntegrityError(f"{missing} eventos de access_logs_legacy não foram migrados")
+
+    with conn:
+        conn.execute('DROP TABLE IF EXISTS access_logs_legacy')
+
+    result = {'rows_migrated': migrated, 'rows_repaired': repaired,
+              'elapsed_ms': (time.perf_counter() - started) * 1000}
+    if repaired:
+        logging.warning(f"Migração de access_logs: {repaired} eventos sem data válida receberam "
+                        f"a data do evento vizinho")
+    logging.info(f"Migração de access_logs: {migrated} eventos convertidos em {result['elapsed_ms']:.0f} ms")
+    return result
+
+
+class ActionCatalog:
+    """Mapa nome ↔ id das ações de log, mantido em memória"""
+
+    def __init__(self, connections) -> None:
+        """
+        Inicializar catálogo.
+
+        Args:
+            connections (ConnectionManager): Conexões com o banco principal
+        """
+        self.connections = connections
+        self._lock = threading.Lock()
+        self._ids: Dict[str, int] = {}
+        self._names: Dict[int, str] = {}
+
+    def load(self) -> None:
+        """Carregar todas as ações do banco"""
+        rows = self.connections.connect().execute('SELECT id, name FROM log_actions').fetchall()
+        with self._lock:
+            self._ids = {name: action_id for action_id, name in rows}
+            self._names = {action_id: name for action_id, name in rows}
+
+    def get_id(self, name: str) -> Optional[int]:
+        """Obter o id de uma ação já registrada (None se desconhecida)"""
+        action_id = self._ids.get(name)
+        if action_id is None:
+            self.load()
+            action_id = self._ids.get(name)
+        return action_id
+
+    def id_for(self, name: str) -> int:
+        """Obter o id de uma ação, registrando-a se for nova"""
+        action_id = self._ids.get(name)
+        if action_id is not None:
+            return action_id
+
+        conn = self.connections.connect()
+        with conn:
+            conn.execute('INSERT OR IGNORE INTO log_actions (name) VALUES (?)', (name,))
+        self.load()
+        return self._ids[name]
+
+    def name_for(self, action_id: int) -> str:
+        """Obter o nome de uma ação pelo id"""
+        name = self._names.get(action_id)
+        if name is None:
+            self.load()
+            name = self._names.get(action_id, str(action_id))
+        return name
@@ -6,6 +6,7 @@ import customtkinter as ctk
 import tkinter as tk
 from tkinter import messagebox
 import os
+import queue
 import sys
 import threading
 import time
@@ -19,6 +20,9 @@ if src_dir not in sys.path:
 
 from auth.authentication import auth_system
 
+# Intervalo (ms) com que a thread da interface busca o resultado do login
+RESULT_POLL_MS = 50
+
 class LoginWindow(ctk.CTk):
     """Janela de login otimizada e robusta"""
     
@@ -29,6 +33,10 @@ class LoginWindow(ctk.CTk):
         self.login_attempts = 0
         self.password_visible = False
         
+        # Resultados da thread de autenticação, consumidos só pela thread do Tk
+        self._login_results: "queue.Queue[tuple]" = queue.Queue()
+        self._login_in_flight = False  # Enter não dispara outra tentativa enquanto esta roda
+        
         # Configurações da janela
         self.title("🏛️ FONTES - Sistema INSS v3.0")
         self.geometry("500x650")
@@ -270,6 +278,9 @@ class LoginWindow(ctk.CTk):
     
     def attempt_login(self):
         """Tentar fazer login"""
+        if self._login_in_flight:
+            return
+        
         try:
             username = self.username_entry.get().strip()
             password = self.password_entry.get().strip()
@@ -287,12 +298,39 @@ class LoginWindow(ctk.CTk):
                 text="🔄 Verificando credenciais...",
                 text_color=("blue", "cyan")
             )
-            self.update()
             
-            # Realizar autenticação (retorna Tuple[bool, str, Optional[Dict]])
-            result = auth_system.authenticate(username, password)
-            success, message, user_data = result
+            # Autenticar em segundo plano para não congelar a interface
+            # durante o cálculo do hash (PBKDF2). A thread não toca no Tk:
+            # o resultado volta pela fila, lida em poll_login_result.
+            def authenticate():
+                try:
+                    self._login_results.put((self.handle_login_result,
+                                             auth_system.authenticate(username, password)))
+                except Exception as e:
+                    self._login_results.put((self.handle_login_error, (e,)))
             
+            self._login_in_flight = True
+            thread = threading.Thread(target=authenticate, daemon=True)
+            thread.start()
+            self.after(RESULT_POLL_MS, self.poll_login_result)
+        
+        except Exception as e:
+            self.handle_login_error(e)
+    
+    def poll_login_result(self):
+        """Entregar o resultado da autenticação na thread da interface"""
+        try:
+            handler, args = self._login_results.get_nowait()
+        except queue.Empty:
+            self.after(RESULT_POLL_MS, self.poll_login_result)
+            return
+        handler(*args)
+    
+    def handle_login_result(self, success: bool, message: str, user_data: Optional[dict]):
+        """Tratar resultado da autenticação (executado na thread da interface)"""
+        # Após o sucesso a janela fecha: nenhuma nova tentativa até lá
+        self._login_in_flight = bool(success and user_data)
+        try:
             if success and user_data:
                 self.status_label.configure(
                     text="✅ Login realizado com sucesso!",
@@ -327,14 +365,20 @@ class LoginWindow(ctk.CTk):
                 self.password_entry.focus_set()
         
         except Exception as e:
-            self.status_label.configure(
-                text=f"❌ Erro: {str(e)[:50]}...",
-                text_color=("red", "orange")  
-            )
-            print(f"Erro no login: {e}")
+            self.handle_login_error(e)
         finally:
             # Reabilitar botão
             self.login_btn.configure(state="normal", text="🔓 ENTRAR")
+    
+    def handle_login_error(self, error: Exception):
+        """Tratar erro inesperado no login"""
+        self._login_in_flight = False
+        self.status_label.configure(
+            text=f"❌ Erro: {str(error)[:50]}...",
+            text_color=("red", "orange")  
+        )
+        self.login_btn.configure(state="normal", text="🔓 ENTRAR")
+        print(f"Erro no login: {error}")
 
 def show_login_window(on_success_callback: Optional[Callable] = None) -> Optional[LoginWindow]:
     """Mostrar janela de login"""
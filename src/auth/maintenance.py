@@ -0,0 +1,496 @@
+"""
+Manutenção do Banco de Dados - Sistema FONTES
+ANALYZE, PRAGMA optimize, vacuum incremental, verificação de integridade e
+backup automático executados fora do horário de uso
+
+O agendador (``run_due``) só trabalha dentro da janela de manutenção e com o
+sistema ocioso; cada execução tem um orçamento de tempo, e as tarefas
+interrompíveis (ANALYZE, integrity_check, vacuum) param quando ele acaba e
+voltam a ser tentadas na próxima execução. O ANALYZE é limitado por
+``PRAGMA analysis_limit`` e o VACUUM completo por tamanho de arquivo.
+
+Cada execução fica registrada na tabela ``maintenance_runs`` com duração,
+tamanho do banco antes e depois e o resultado, exibidos no painel de
+administração.
+
+Autor: Sistema FONTES
+Data: 2025
+"""
+
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Tarefas na ordem de execução (as baratas e mais úteis primeiro) e intervalo
+# mínimo entre execuções bem-sucedidas, em segundos
+TASK_INTERVALS: Dict[str, int] = {
+    'optimize': 24 * 3600,
+    'vacuum': 24 * 3600,
+    'backup': 24 * 3600,
+    'analyze': 7 * 24 * 3600,
+    'integrity_check': 7 * 24 * 3600,
+}
+RETRY_INTERVAL = 3600  # segundos até tentar de novo uma tarefa interrompida ou com erro
+
+DEFAULT_SETTINGS: Dict = {
+    'auto_backup': False,
+    'window_start': 2,      # hora local de início da janela de manutenção
+    'window_end': 5,        # hora local de término (igual ao início = qualquer hora)
+    'time_budget_s': 30,    # tempo máximo por execução
+    'backup_keep': 7,       # backups automáticos mantidos
+}
+
+ANALYSIS_LIMIT = 1000  # linhas examinadas por índice no ANALYZE (0 = todas)
+VACUUM_MIN_FREE_RATIO = 0.10  # fração de páginas livres que justifica o vacuum
+VACUUM_CHUNK_PAGES = 256  # páginas devolvidas por passo do vacuum incremental
+FULL_VACUUM_MAX_BYTES = 64 * 1024 * 1024  # VACUUM completo só em bancos até este tamanho
+BACKUP_PAGES_PER_STEP = 1024  # páginas copiadas por passo do backup
+INTEGRITY_MAX_ERRORS = 20
+PROGRESS_STEPS = 10000  # instruções da VM entre verificações do orçamento de tempo
+
+# Sistema ocioso: no máximo QUIET_MAX_EVENTS eventos de log nos últimos QUIET_WINDOW segundos
+QUIET_WINDOW = 300
+QUIET_MAX_EVENTS = 20
+
+HISTORY_KEPT = 500  # execuções mantidas em maintenance_runs
+
+# Status que contam como execução concluída para o intervalo da tarefa
+DONE_STATUSES = ('ok', 'problems', 'skipped')
+
+MAINTENANCE_RUNS_SQL = '''
+    CREATE TABLE IF NOT EXISTS maintenance_runs (
+        id INTEGER PRIMARY KEY,
+        task TEXT NOT NULL,
+        started_at INTEGER NOT NULL,
+        elapsed_ms REAL NOT NULL,
+        status TEXT NOT NULL,
+        bytes_before INTEGER,
+        bytes_after INTEGER,
+        details TEXT
+    )
+'''
+MAINTENANCE_INDEX_SQL = 'CREATE INDEX IF NOT EXISTS idx_maintenance_task ON maintenance_runs(task, started_at)'
+
+
+def create_maintenance_schema(conn) -> None:
+    """Criar a tabela maintenance_runs e seu índice"""
+    conn.execute(MAINTENANCE_RUNS_SQL)
+    conn.execute(MAINTENANCE_INDEX_SQL)
+
+
+def load_settings(path: str) -> Dict:
+    """
+    Carregar configurações de manutenção.
+
+    Args:
+        path (str): Caminho do arquivo JSON de configurações
+
+    Returns:
+        Dict: DEFAULT_SETTINGS atualizado com os valores salvos
+    """
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+    except FileNotFoundError:
+        return settings
+    except (OSError, ValueError) as e:
+        logging.error(f"Erro ao ler configurações de manutenção: {e}")
+        return settings
+
+    settings.update({key: value for key, value in saved.items() if key in DEFAULT_SETTINGS})
+    return settings
+
+
+def save_settings(path: str, settings: Dict) -> None:
+    """Salvar configurações de manutenção em JSON"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(settings, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class DatabaseMaintenance:
+    """
+    Tarefas de manutenção do banco principal.
+
+    As tarefas usam uma conexão própria, aberta a cada execução, para que o
+    orçamento de tempo possa interromper statements longos (progress handler)
+    sem interferir nas conexões da aplicação.
+    """
+
+    def __init__(self, db_path: str, connections, settings_path: str, backup_dir: str,
+                 busy_timeout_ms: int = 5000) -> None:
+        """
+        Inicializar manutenção.
+
+        Args:
+            db_path (str): Caminho do banco principal
+            connections (ConnectionManager): Conexões usadas nas consultas do painel
+            settings_path (str): Arquivo JSON das configurações de manutenção
+            backup_dir (str): Diretório dos backups automáticos
+            busy_timeout_ms (int): Espera por locks na conexão de manutenção
+        """
+        self.db_path = db_path
+        self.connections = connections
+        self.settings_path = settings_path
+        self.backup_dir = Path(backup_dir)
+        self.busy_timeout_ms = busy_timeout_ms
+        self.settings = load_settings(settings_path)
+        self._lock = threading.Lock()
+
+        self._tasks: Dict[str, Callable[[sqlite3.Connection, float], Tuple[str, Dict]]] = {
+            'optimize': self._optimize,
+            'vacuum': self._vacuum,
+            'backup': self._backup_task,
+            'analyze': self._analyze,
+            'integrity_check': self._integrity_check,
+        }
+
+    def update_settings(self, **changes) -> Dict:
+        """
+        Alterar e salvar configurações.
+
+        Raises:
+            KeyError: Configuração desconhecida
+        """
+        for key in changes:
+            if key not in DEFAULT_SETTINGS:
+                raise KeyError(key)
+        self.settings = {**self.settings, **changes}
+        save_settings(self.settings_path, self.settings)
+        return dict(self.settings)
+
+    def is_running(self) -> bool:
+        """Verificar se há uma execução em andamento"""
+        return self._lock.locked()
+
+    def in_window(self, now: Optional[float] = None) -> bool:
+        """Verificar se ``now`` está na janela de manutenção (hora local)"""
+        start, end = int(self.settings['window_start']), int(self.settings['window_end'])
+        if start == end:
+            return True
+        hour = time.localtime(now).tm_hour
+        if start < end:
+            return start <= hour < end
+        return hour >= start or hour < end
+
+    def enabled_tasks(self) -> List[str]:
+        """Tarefas ativas, na ordem de execução"""
+        return [task for task in TASK_INTERVALS if task != 'backup' or self.settings['auto_backup']]
+
+    def due_tasks(self, now: Optional[float] = None) -> List[str]:
+        """Tarefas cujo intervalo desde a última execução já passou"""
+        now = time.time() if now is None else now
+        last = self.last_runs()
+        due = []
+        for task in self.enabled_tasks():
+            run = last.get(task)
+            if run is None or now >= self._next_due(task, run):
+                due.append(task)
+        return due
+
+    def run_due(self, force: bool = False) -> Dict:
+        """
+        Executar as tarefas pendentes dentro do orçamento de tempo.
+
+        Args:
+            force (bool): Ignorar a janela de manutenção e a verificação de ociosidade
+
+        Returns:
+            Dict: Tarefas executadas (com status) ou motivo de não executar
+        """
+        if not force:
+            if not self.in_window():
+                return {'ran': {}, 'reason': 'outside_window'}
+            if not self._is_quiet():
+                return {'ran': {}, 'reason': 'busy'}
+        return self.run(self.due_tasks(), wait=force)
+
+    def run(self, tasks: List[str], wait: bool = True) -> Dict:
+        """
+        Executar tarefas na ordem dada, respeitando o orçamento de tempo.
+
+        As tarefas que não couberem no orçamento ficam para a próxima execução.
+
+        Args:
+            tasks (List[str]): Nomes das tarefas (ver TASK_INTERVALS)
+            wait (bool): Aguardar uma execução em andamento terminar (False:
+                desistir se houver uma)
+
+        Returns:
+            Dict: Status por tarefa executada e tempo gasto (ms)
+        """
+        unknown = set(tasks) - set(self._tasks)
+        if unknown:
+            raise KeyError(', '.join(sorted(unknown)))
+        if not self._lock.acquire(blocking=wait):
+            return {'ran': {}, 'reason': 'running'}
+
+        started = time.perf_counter()
+        deadline = time.monotonic() + float(self.settings['time_budget_s'])
+        ran = {}
+        try:
+            conn = self._open()
+            try:
+                for task in tasks:
+                    if time.monotonic() >= deadline:
+                        break
+                    ran[task] = self._run_task(conn, task, deadline)
+            finally:
+                conn.close()
+        finally:
+            self._lock.release()
+
+        result = {'ran': ran, 'elapsed_ms': (time.perf_counter() - started) * 1000}
+        if ran:
+            logging.info(f"Manutenção do banco: {ran} em {result['elapsed_ms']:.0f} ms")
+        return result
+
+    def backup(self, target_path: str) -> Dict:
+        """
+        Copiar o banco para ``target_path`` com a API de backup do SQLite.
+
+        Diferente de copiar o arquivo, inclui o conteúdo ainda no WAL e
+        produz uma cópia consistente mesmo com a aplicação em uso.
+
+        Returns:
+            Dict: Caminho e tamanho da cópia
+        """
+        conn = self._open()
+        try:
+            return self._backup_to(conn, Path(target_path))
+        finally:
+            conn.close()
+
+    def last_runs(self) -> Dict[str, Dict]:
+        """Última execução de cada tarefa"""
+        rows = self.connections.connect().execute('''
+            SELECT task, MAX(started_at), status, elapsed_ms, bytes_before, bytes_after, details
+            FROM maintenance_runs GROUP BY task
+        ''').fetchall()
+        return {row[0]: self._run_row(row) for row in rows}
+
+    def history(self, limit: int = 100) -> List[Dict]:
+        """Execuções mais recentes primeiro"""
+        rows = self.connections.connect().execute('''
+            SELECT task, started_at, status, elapsed_ms, bytes_before, bytes_after, details
+            FROM maintenance_runs ORDER BY id DESC LIMIT ?
+        ''', (limit,)).fetchall()
+        return [self._run_row(row) for row in rows]
+
+    def status(self) -> Dict:
+        """
+        Estado do banco e das tarefas para o painel de administração.
+
+        Returns:
+            Dict: Tamanho do arquivo e do WAL, páginas livres, configurações
+            e, por tarefa, última execução e próxima data prevista
+        """
+        conn = self.connections.connect()
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+        freelist = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        auto_vacuum = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+
+        last = self.last_runs()
+        enabled = self.enabled_tasks()
+        tasks = []
+        for task, interval in TASK_INTERVALS.items():
+            run = last.get(task)
+            tasks.append({
+                'task': task,
+                'enabled': task in enabled,
+                'interval_s': interval,
+                'last_run': run,
+                'next_due': self._format(self._next_due(task, run)) if run else None,
+            })
+
+        return {
+            'db_bytes': page_size * page_count,
+            'wal_bytes': self._file_size(f"{self.db_path}-wal"),
+            'free_pages': freelist,
+            'free_bytes': freelist * page_size,
+            'auto_vacuum': {0: 'NONE', 1: 'FULL', 2: 'INCREMENTAL'}.get(auto_vacuum, str(auto_vacuum)),
+            'settings': dict(self.settings),
+            'in_window': self.in_window(),
+            'running': self.is_running(),
+            'tasks': tasks,
+        }
+
+    def _open(self) -> sqlite3.Connection:
+        """Conexão própria, em autocommit (PRAGMAs e VACUUM fora de transação)"""
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000,
+                               isolation_level=None, check_same_thread=False)
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout_ms)}')
+        return conn
+
+    def _is_quiet(self) -> bool:
+        """Verificar se houve pouca atividade recente (idx_logs_ts)"""
+        recent = self.connections.connect().execute('''
+            SELECT COUNT(*) FROM (SELECT 1 FROM access_logs WHERE ts >= ? LIMIT ?)
+        ''', (int(time.time()) - QUIET_WINDOW, QUIET_MAX_EVENTS + 1)).fetchone()[0]
+        return recent <= QUIET_MAX_EVENTS
+
+    def _run_task(self, conn: sqlite3.Connection, task: str, deadline: float) -> str:
+        """Executar uma tarefa e registrar o resultado em maintenance_runs"""
+        started_at = int(time.time())
+        started = time.perf_counter()
+        bytes_before = self._db_bytes(conn)
+
+        def check_budget() -> int:
+            return int(time.monotonic() >= deadline)
+
+        conn.set_progress_handler(check_budget, PROGRESS_STEPS)
+        try:
+            status, details = self._tasks[task](conn, deadline)
+        except sqlite3.OperationalError as e:
+            if 'interrupted' in str(e):
+                status, details = 'interrupted', {}
+            else:
+                logging.error(f"Erro na manutenção ({task}): {e}")
+                status, details = 'failed', {'error': str(e)}
+        except Exception as e:
+            logging.error(f"Erro na manutenção ({task}): {e}")
+            status, details = 'failed', {'error': str(e)}
+        finally:
+            conn.set_progress_handler(None, 0)
+        if conn.in_transaction:
+            conn.rollback()
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        conn.execute('''
+            INSERT INTO maintenance_runs (task, started_at, elapsed_ms, status, bytes_before, bytes_after, details)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (task, started_at, elapsed_ms, status, bytes_before, self._db_bytes(conn),
+              json.dumps(details) if details else None))
+        conn.execute('''
+            DELETE FROM maintenance_runs WHERE id <= (
+                SELECT id FROM maintenance_runs ORDER BY id DESC LIMIT 1 OFFSET ?
+            )
+        ''', (HISTORY_KEPT,))
+        return status
+
+    def _optimize(self, conn: sqlite3.Connection, deadline: float) -> Tuple[str, Dict]:
+        """PRAGMA optimize: ANALYZE apenas das tabelas cujas estatísticas envelheceram"""
+        conn.execute(f'PRAGMA analysis_limit = {ANALYSIS_LIMIT}')
+        conn.execute('PRAGMA optimize')
+        return 'ok', {}
+
+    def _analyze(self, conn: sqlite3.Connection, deadline: float) -> Tuple[str, Dict]:
+        """ANALYZE completo (amostrado por analysis_limit)"""
+        conn.execute(f'PRAGMA analysis_limit = {ANALYSIS_LIMIT}')
+        conn.execute('ANALYZE')
+        indexes = conn.execute('SELECT COUNT(*) FROM sqlite_stat1').fetchone()[0]
+        return 'ok', {'indexes': indexes}
+
+    def _vacuum(self, conn: sqlite3.Connection, deadline: float) -> Tuple[str, Dict]:
+        """
+        Devolver páginas livres ao sistema de arquivos.
+
+        Bancos com auto_vacuum INCREMENTAL devolvem em passos até o orçamento
+        acabar. Os demais (criados antes do modo incremental) recebem um
+        VACUUM completo que os converte, desde que caibam no limite de tamanho.
+        """
+        page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+        free_before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        auto_vacuum = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+
+        if auto_vacuum == 2:
+            if not page_count or free_before / page_count < VACUUM_MIN_FREE_RATIO:
+                return 'ok', {'free_pages': free_before}
+            while free_before and time.monotonic() < deadline:
+                conn.execute(f'PRAGMA incremental_vacuum({VACUUM_CHUNK_PAGES})').fetchall()
+                free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+                if free == free_before:
+                    break
+                free_before = free
+            details = {'free_pages': conn.execute('PRAGMA freelist_count').fetchone()[0]}
+        elif auto_vacuum == 0:
+            db_bytes = self._db_bytes(conn)
+            if db_bytes > FULL_VACUUM_MAX_BYTES:
+                return 'skipped', {'reason': 'size', 'db_bytes': db_bytes}
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+            details = {'full': True}
+        else:
+            return 'ok', {'free_pages': free_before}  # auto_vacuum FULL: o SQLite já devolve
+
+        # No WAL o arquivo só encolhe no checkpoint
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+        return 'ok', details
+
+    def _integrity_check(self, conn: sqlite3.Connection, deadline: float) -> Tuple[str, Dict]:
+        """PRAGMA integrity_check (interrompido se o orçamento acabar)"""
+        rows = [row[0] for row in conn.execute(f'PRAGMA integrity_check({INTEGRITY_MAX_ERRORS})')]
+        if rows == ['ok']:
+            return 'ok', {}
+        logging.error(f"Verificação de integridade do banco encontrou problemas: {rows}")
+        return 'problems', {'errors': rows}
+
+    def _backup_task(self, conn: sqlite3.Connection, deadline: float) -> Tuple[str, Dict]:
+        """Backup automático diário, mantendo os ``backup_keep`` mais recentes"""
+        stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+        details = self._backup_to(conn, self.backup_dir / f"{Path(self.db_path).stem}_{stamp}.db")
+
+        backups = sorted(self.backup_dir.glob(f"{Path(self.db_path).stem}_*.db"), reverse=True)
+        for old in backups[max(int(self.settings['backup_keep']), 1):]:
+            old.unlink()
+        return 'ok', details
+
+    def _backup_to(self, conn: sqlite3.Connection, target: Path) -> Dict:
+        """Copiar o banco em passos, liberando o lock entre eles; grava em .tmp e renomeia"""
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_name(target.name + '.tmp')
+        dest = sqlite3.connect(str(tmp_path))
+        try:
+            conn.backup(dest, pages=BACKUP_PAGES_PER_STEP, sleep=0.005)
+        finally:
+            dest.close()
+        os.replace(tmp_path, target)
+        return {'path': str(target), 'bytes': target.stat().st_size}
+
+    def _next_due(self, task: str, run: Dict) -> float:
+        """Data (época) da próxima execução de uma tarefa"""
+        interval = TASK_INTERVALS[task] if run['status'] in DONE_STATUSES else RETRY_INTERVAL
+        return run['started_epoch'] + interval
+
+    @staticmethod
+    def _run_row(row: tuple) -> Dict:
+        """Converter linha de maintenance_runs em dicionário"""
+        task, started_at, status, elapsed_ms, bytes_before, bytes_after, details = row
+        return {
+            'task': task,
+            'started_at': DatabaseMaintenance._format(started_at),
+            'started_epoch': started_at,
+            'status': status,
+            'elapsed_ms': elapsed_ms,
+            'bytes_before': bytes_before,
+            'bytes_after': bytes_after,
+            'bytes_reclaimed': (bytes_before or 0) - (bytes_after or 0),
+            'details': json.loads(details) if details else {},
+        }
+
+    @staticmethod
+    def _format(epoch: float) -> str:
+        """Data local 'AAAA-MM-DD HH:MM:SS'"""
+        return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(epoch))
+
+    @staticmethod
+    def _db_bytes(conn: sqlite3.Connection) -> int:
+        """Tamanho lógico do banco (páginas × tamanho da página)"""
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        return page_size * conn.execute('PRAGMA page_count').fetchone()[0]
+
+    @staticmethod
+    def _file_size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
@@ -0,0 +1,368 @@
+"""
+Serviço de Hash de Senhas - Sistema FONTES
+Execução do PBKDF2 fora da thread chamadora, com limite de concorrência
+
+O PBKDF2 é deliberadamente caro. Este módulo executa as derivações em um
+pool de threads (hashlib libera o GIL durante o cálculo) ou de processos,
+limitando quantas derivações podem estar em execução ou aguardando. Quando
+o limite é atingido, o pedido espera no máximo ``queue_timeout`` segundos e
+então falha com ``HashingBusyError``, em vez de acumular trabalho.
+
+Formato armazenado dos hashes (algoritmo e custo registrados no próprio hash):
+
+    pbkdf2_sha256$<iterações>$<salt base64>$<hash base64>
+
+Os formatos antigos (base64 de salt+hash e ``salt:hash`` em hexadecimal do
+reset_account.py) continuam aceitos com ``LEGACY_PBKDF2_ITERATIONS``.
+
+Autor: Sistema FONTES
+Data: 2025
+"""
+
+import base64
+import datetime
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+from utils.metrics import REGISTRY
+
+EXECUTOR_TYPES = ('thread', 'process', 'inline')
+DEFAULT_QUEUE_TIMEOUT = 2.0  # segundos aguardando vaga no pool
+BUSY_MESSAGE = "Sistema ocupado, tente novamente em instantes"
+
+# Parâmetros do KDF
+HASH_ALGORITHM = 'pbkdf2_sha256'
+LEGACY_PBKDF2_ITERATIONS = 100000
+MIN_PBKDF2_ITERATIONS = 50000
+MAX_PBKDF2_ITERATIONS = 5000000
+DEFAULT_CALIBRATION_TARGET_MS = 250
+SALT_SIZE = 32
+
+# Métricas (segundos, incluindo a espera por uma vaga no pool)
+PBKDF2_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.175, 0.25, 0.35, 0.5, 0.75, 1.0, 2.0, 5.0)
+PBKDF2_SECONDS = REGISTRY.histogram('fontes_pbkdf2_seconds', 'Duração das derivações PBKDF2',
+                                    ('executor',), buckets=PBKDF2_BUCKETS)
+PBKDF2_REJECTED = REGISTRY.counter('fontes_pbkdf2_rejected_total',
+                                   'Derivações rejeitadas por saturação do pool')
+PBKDF2_FAILED = REGISTRY.counter('fontes_pbkdf2_failed_total',
+                                 'Derivações que terminaram com erro', ('executor',))
+
+
+class HashingBusyError(Exception):
+    """Pool de hash saturado: o pedido não obteve vaga dentro do prazo"""
+
+
+def pbkdf2_sha256(password: str, salt: bytes, iterations: int) -> bytes:
+    """
+    Derivar chave com PBKDF2-HMAC-SHA256.
+
+    Função de módulo para poder ser enviada a um pool de processos.
+
+    Args:
+        password (str): Senha em texto plano
+        salt (bytes): Salt aleatório
+        iterations (int): Número de iterações
+
+    Returns:
+        bytes: Chave derivada
+    """
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+
+
+class PasswordHash(NamedTuple):
+    """Hash de senha decodificado"""
+    algorithm: str
+    iterations: int
+    salt: bytes
+    digest: bytes
+    legacy: bool
+
+
+def encode_password_hash(iterations: int, salt: bytes, digest: bytes) -> str:
+    """
+    Codificar hash no formato ``pbkdf2_sha256$iterações$salt$hash``.
+
+    Args:
+        iterations (int): Número de iterações usado na derivação
+        salt (bytes): Salt aleatório
+        digest (bytes): Chave derivada
+
+    Returns:
+        str: Hash pronto para armazenamento
+    """
+    return '$'.join((HASH_ALGORITHM, str(iterations),
+                     base64.b64encode(salt).decode('ascii'),
+                     base64.b64encode(digest).decode('ascii')))
+
+
+def decode_password_hash(stored: str) -> PasswordHash:
+    """
+    Decodificar um hash armazenado em qualquer um dos formatos suportados.
+
+    Args:
+        stored (str): Hash armazenado no banco
+
+    Returns:
+        PasswordHash: Algoritmo, custo, salt e chave derivada
+
+    Raises:
+        ValueError: Se o formato não for reconhecido
+    """
+    if '$' in stored:
+        algorithm, iterations, salt_b64, digest_b64 = stored.split('$')
+        return PasswordHash(algorithm, int(iterations), base64.b64decode(salt_b64),
+                            base64.b64decode(digest_b64), False)
+
+    if ':' in stored:
+        # Formato salt:hash em hexadecimal (reset_account.py)
+        salt_hex, digest_hex = stored.split(':', 1)
+        return PasswordHash(HASH_ALGORITHM, LEGACY_PBKDF2_ITERATIONS,
+                            bytes.fromhex(salt_hex), bytes.fromhex(digest_hex), True)
+
+    # Formato base64 original (salt de 32 bytes seguido do hash)
+    data = base64.b64decode(stored.encode('utf-8'))
+    if len(data) <= SALT_SIZE:
+        raise ValueError("Hash de senha em formato desconhecido")
+    return PasswordHash(HASH_ALGORITHM, LEGACY_PBKDF2_ITERATIONS,
+                        data[:SALT_SIZE], data[SALT_SIZE:], True)
+
+
+def digests_match(expected: bytes, actual: bytes) -> bool:
+    """Comparar chaves derivadas em tempo constante"""
+    return hmac.compare_digest(expected, actual)
+
+
+def calibrate_iterations(target_ms: float = DEFAULT_CALIBRATION_TARGET_MS,
+                         sample_iterations: int = 20000, rounds: int = 5) -> int:
+    """
+    Calcular o número de iterações que leva ``target_ms`` neste hardware.
+
+    Mede algumas derivações de ``sample_iterations`` iterações, usa a mais
+    rápida como referência e extrapola para o alvo, arredondando para
+    milhares e respeitando os limites mínimo e máximo.
+
+    Args:
+        target_ms (float): Latência desejada por verificação, em ms
+        sample_iterations (int): Iterações de cada medição
+        rounds (int): Número de medições
+
+    Returns:
+        int: Número de iterações calibrado
+    """
+    salt = os.urandom(SALT_SIZE)
+    best = float('inf')
+    for _ in range(rounds):
+        started = time.perf_counter()
+        pbkdf2_sha256('calibracao', salt, sample_iterations)
+        best = min(best, time.perf_counter() - started)
+
+    per_iteration_ms = best * 1000 / sample_iterations
+    iterations = int(target_ms / per_iteration_ms) // 1000 * 1000
+    return max(MIN_PBKDF2_ITERATIONS, min(MAX_PBKDF2_ITERATIONS, iterations))
+
+
+def load_kdf_params(path: str) -> Dict:
+    """
+    Carregar parâmetros calibrados do KDF.
+
+    Args:
+        path (str): Caminho do arquivo JSON de parâmetros
+
+    Returns:
+        Dict: Parâmetros salvos, ou dicionário vazio se não houver arquivo
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            params = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.error(f"Erro ao ler parâmetros do KDF: {e}")
+        return {}
+
+    if params.get('algorithm', HASH_ALGORITHM) != HASH_ALGORITHM:
+        logging.error(f"Algoritmo de KDF não suportado: {params.get('algorithm')}")
+        return {}
+    return params
+
+
+def save_kdf_params(path: str, iterations: int, target_ms: Optional[float] = None) -> Dict:
+    """
+    Salvar parâmetros do KDF para este nó.
+
+    Args:
+        path (str): Caminho do arquivo JSON de parâmetros
+        iterations (int): Número de iterações
+        target_ms (float, optional): Latência alvo usada na calibração
+
+    Returns:
+        Dict: Parâmetros salvos
+    """
+    params = {
+        'algorithm': HASH_ALGORITHM,
+        'iterations': iterations,
+        'target_ms': target_ms,
+        'calibrated_at': datetime.datetime.now().isoformat(timespec='seconds'),
+    }
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(params, f, indent=2)
+    return params
+
+
+class PasswordHasher:
+    """
+    Executor de derivações PBKDF2 com limite de concorrência.
+
+    ``max_workers`` derivações executam em paralelo e até ``max_pending``
+    aguardam na fila; pedidos além disso esperam por uma vaga até
+    ``queue_timeout`` segundos e então recebem ``HashingBusyError``.
+    """
+
+    def __init__(self, executor: str = 'thread', max_workers: Optional[int] = None,
+                 max_pending: Optional[int] = None,
+                 queue_timeout: float = DEFAULT_QUEUE_TIMEOUT) -> None:
+        """
+        Inicializar serviço de hash.
+
+        Args:
+            executor (str): 'thread', 'process' ou 'inline' (thread chamadora)
+            max_workers (int, optional): Derivações simultâneas (padrão: núcleos)
+            max_pending (int, optional): Derivações aguardando (padrão: 2x workers)
+            queue_timeout (float): Espera máxima por uma vaga, em segundos
+        """
+        if executor not in EXECUTOR_TYPES:
+            raise ValueError(f"Tipo de executor inválido: {executor}")
+
+        self.executor_type = executor
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = self.max_workers * 2 if max_pending is None else max_pending
+        self.queue_timeout = queue_timeout
+
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_pending)
+        self._lock = threading.Lock()
+        self._executor: Optional[Executor] = None
+        self._pid = os.getpid()
+
+        self._stats = {
+            'completed': 0,
+            'rejected': 0,
+            'failed': 0,
+            'in_flight': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+        }
+
+    def derive(self, password: str, salt: bytes, iterations: int) -> bytes:
+        """
+        Derivar chave respeitando o limite de concorrência.
+
+        Args:
+            password (str): Senha em texto plano
+            salt (bytes): Salt aleatório
+            iterations (int): Número de iterações
+
+        Returns:
+            bytes: Chave derivada
+
+        Raises:
+            HashingBusyError: Se não houver vaga dentro de ``queue_timeout``
+        """
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self._record_rejection()
+            raise HashingBusyError(BUSY_MESSAGE)
+
+        started = time.perf_counter()
+        self._update_in_flight(1)
+        try:
+            if self.executor_type == 'inline':
+                key = pbkdf2_sha256(password, salt, iterations)
+            else:
+                key = self._get_executor().submit(pbkdf2_sha256, password, salt, iterations).result()
+        except BaseException:
+            self._record_failure()
+            raise
+        finally:
+            self._slots.release()
+            self._update_in_flight(-1)
+        self._record_completion((time.perf_counter() - started) * 1000)
+        return key
+
+    def stats(self) -> Dict:
+        """
+        Obter contadores do serviço.
+
+        Returns:
+            Dict: Derivações concluídas, rejeitadas, com erro, em execução e latência
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['avg_ms'] = (stats['total_ms'] / stats['completed']) if stats['completed'] else 0.0
+        stats['executor'] = self.executor_type
+        stats['max_workers'] = self.max_workers
+        stats['max_pending'] = self.max_pending
+        return stats
+
+    def shutdown(self) -> None:
+        """Encerrar o pool de execução"""
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+        if executor is not None and os.getpid() == self._pid:
+            executor.shutdown(wait=True)
+
+    def _get_executor(self) -> Executor:
+        """Obter o pool, recriando-o após um fork"""
+        pid = os.getpid()
+        executor = self._executor
+        if executor is not None and pid == self._pid:
+            return executor
+
+        with self._lock:
+            if pid != self._pid:
+                # Pools não sobrevivem ao fork; o processo filho cria o seu
+                self._executor = None
+                self._pid = pid
+            if self._executor is None:
+                if self.executor_type == 'process':
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix="pbkdf2")
+                logging.debug(f"Pool de hash iniciado ({self.executor_type}, {self.max_workers} workers)")
+            return self._executor
+
+    def _update_in_flight(self, delta: int) -> None:
+        """Atualizar o número de derivações em andamento"""
+        with self._lock:
+            self._stats['in_flight'] += delta
+
+    def _record_completion(self, elapsed_ms: float) -> None:
+        """Registrar uma derivação concluída"""
+        with self._lock:
+            self._stats['completed'] += 1
+            self._stats['total_ms'] += elapsed_ms
+            if elapsed_ms > self._stats['max_ms']:
+                self._stats['max_ms'] = elapsed_ms
+        PBKDF2_SECONDS.observe(elapsed_ms / 1000, self.executor_type)
+
+    def _record_failure(self) -> None:
+        """Registrar uma derivação que terminou com erro"""
+        with self._lock:
+            self._stats['failed'] += 1
+        PBKDF2_FAILED.inc(self.executor_type)
+
+    def _record_rejection(self) -> None:
+        """Registrar um pedido rejeitado por saturação"""
+        with self._lock:
+            self._stats['rejected'] += 1
+        PBKDF2_REJECTED.inc()
+        logging.warning("Pool de hash saturado, pedido rejeitado")
@@ -0,0 +1,83 @@
+"""
+Tarefas Periódicas - Sistema FONTES
+Execução de rotinas de manutenção em segundo plano
+
+Autor: Sistema FONTES
+Data: 2025
+"""
+
+import threading
+import time
+import logging
+from typing import Callable, Dict, Optional
+
+
+class PeriodicTask:
+    """
+    Executa uma função em intervalos regulares numa thread daemon.
+
+    A primeira execução ocorre após ``initial_delay`` segundos (padrão: o
+    próprio intervalo). Exceções são registradas no log e não interrompem
+    as execuções seguintes.
+    """
+
+    def __init__(self, name: str, func: Callable[[], Optional[Dict]], interval: float,
+                 initial_delay: Optional[float] = None) -> None:
+        """
+        Inicializar tarefa periódica.
+
+        Args:
+            name (str): Nome da tarefa (usado na thread e nos logs)
+            func (Callable): Função executada a cada intervalo
+            interval (float): Intervalo entre execuções, em segundos
+            initial_delay (float, optional): Espera antes da primeira execução
+        """
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.initial_delay = interval if initial_delay is None else initial_delay
+
+        self.runs = 0
+        self.last_result: Optional[Dict] = None
+        self.last_run_at: Optional[float] = None
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Iniciar a tarefa (ignorado se já estiver em execução)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """Interromper a tarefa e aguardar a execução em andamento"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def is_running(self) -> bool:
+        """Verificar se a thread da tarefa está ativa"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def run_now(self) -> Optional[Dict]:
+        """Executar a tarefa imediatamente na thread chamadora"""
+        try:
+            result = self.func()
+        except Exception as e:
+            logging.error(f"Erro na tarefa {self.name}: {e}")
+            return None
+        self.runs += 1
+        self.last_result = result
+        self.last_run_at = time.time()
+        return result
+
+    def _run(self) -> None:
+        """Laço da thread"""
+        delay = self.initial_delay
+        while not self._stop.wait(delay):
+            self.run_now()
+            delay = self.interval
@@ -0,0 +1,217 @@
+"""
+Cache de Sessões - Sistema FONTES
+Cache LRU com TTL para sessões já validadas
+
+Evita a consulta sessions⋈users a cada validação de sessão. As entradas
+expiram após ``ttl`` segundos (ou antes, quando a própria sessão expira) e
+são removidas explicitamente por logout, desativação, remoção, troca de
+senha ou alteração de dados do usuário.
+
+Sem cache compartilhado, o cache é local ao processo: em outros workers,
+uma alteração só é percebida quando a entrada expira, por isso o TTL deve
+ser curto. Com um ``SharedCache`` remoto (Redis), ele funciona como segundo
+nível: sessões validadas por um worker servem a todos, as invalidações valem
+para todos, e o nível local passa a usar ``SHARED_LOCAL_TTL``. As chaves no
+servidor usam um hash do token, não o token.
+
+Autor: Sistema FONTES
+Data: 2025
+"""
+
+import datetime
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+from utils.metrics import REGISTRY
+
+from .shared_cache import SharedCache
+
+DEFAULT_SESSION_CACHE_SIZE = 10000
+DEFAULT_SESSION_CACHE_TTL = 60.0  # segundos
+SHARED_LOCAL_TTL = 5.0  # segundos no nível local quando há cache compartilhado
+
+# Taxa de acerto = hit+shared_hit / total
+LOOKUPS = REGISTRY.counter('fontes_session_cache_lookups_total',
+                           'Consultas ao cache de sessões por resultado', ('result',))
+
+
+class SessionCache:
+    """Cache LRU+TTL de sessões validadas, indexado por token e por usuário"""
+
+    def __init__(self, max_entries: int = DEFAULT_SESSION_CACHE_SIZE,
+                 ttl: float = DEFAULT_SESSION_CACHE_TTL,
+                 shared: Optional[SharedCache] = None) -> None:
+        """
+        Inicializar cache de sessões.
+
+        Args:
+            max_entries (int): Número máximo de sessões em cache
+            ttl (float): Tempo de vida de cada entrada, em segundos
+            shared (SharedCache, optional): Segundo nível compartilhado entre
+                processos (usado apenas se for remoto)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared = shared if shared is not None and shared.is_remote else None
+        self.local_ttl = min(ttl, SHARED_LOCAL_TTL) if self.shared else ttl
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+
+        self._hits = 0
+        self._shared_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, token: str) -> Optional[Dict]:
+        """
+        Obter sessão em cache.
+
+        Args:
+            token (str): Token da sessão
+
+        Returns:
+            Optional[Dict]: Dados da sessão ('user', 'expires_at') ou None
+        """
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                deadline, user_id, session = entry
+                if time.monotonic() < deadline:
+                    self._entries.move_to_end(token)
+                    self._hits += 1
+                    LOOKUPS.inc('hit')
+                    return session
+                self._remove(token, user_id)
+
+        session = self._get_shared(token)
+        with self._lock:
+            if session is None:
+                self._misses += 1
+            else:
+                self._shared_hits += 1
+        LOOKUPS.inc('miss' if session is None else 'shared_hit')
+        return session
+
+    def put(self, token: str, user: Dict, expires_at: datetime.datetime) -> None:
+        """
+        Armazenar sessão validada.
+
+        Args:
+            token (str): Token da sessão
+            user (Dict): Dados do usuário (deve conter 'id')
+            expires_at (datetime): Expiração da sessão
+        """
+        remaining = (expires_at - datetime.datetime.now()).total_seconds()
+        if remaining <= 0 or self.max_entries <= 0:
+            return
+
+        if self.shared:
+            key = self._shared_key(token)
+            self.shared.set(key, {'user': dict(user), 'expires_at': expires_at.timestamp()},
+                            min(self.ttl, remaining))
+            self.shared.add_to_set(f"user_sessions:{user['id']}", key, self.ttl)
+        self._put_local(token, user, expires_at, min(self.local_ttl, remaining))
+
+    def _put_local(self, token: str, user: Dict, expires_at: datetime.datetime, ttl: float) -> None:
+        """Armazenar no nível local"""
+        user_id = user['id']
+        session = {'user': dict(user), 'expires_at': expires_at}
+        with self._lock:
+            old = self._entries.pop(token, None)
+            if old is not None:
+                self._unlink(token, old[1])
+
+            self._entries[token] = (time.monotonic() + ttl, user_id, session)
+            self._tokens_by_user.setdefault(user_id, set()).add(token)
+
+            while len(self._entries) > self.max_entries:
+                evicted_token, (_, evicted_user, _) = self._entries.popitem(last=False)
+                self._unlink(evicted_token, evicted_user)
+                self._evictions += 1
+
+    def invalidate(self, token: str) -> None:
+        """Remover uma sessão do cache"""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                self._remove(token, entry[1])
+                self._invalidations += 1
+        if self.shared:
+            self.shared.delete(self._shared_key(token))
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Remover todas as sessões de um usuário do cache"""
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token, user_id)
+                self._invalidations += 1
+        if self.shared:
+            keys = self.shared.pop_set(f"user_sessions:{user_id}")
+            if keys:
+                self.shared.delete(*keys)
+
+    def clear(self) -> None:
+        """Esvaziar o nível local (entradas compartilhadas expiram pelo TTL)"""
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> Dict:
+        """
+        Obter estatísticas do cache.
+
+        Returns:
+            Dict: Acertos, falhas, taxa de acerto, tamanho e remoções
+        """
+        with self._lock:
+            hits = self._hits + self._shared_hits
+            lookups = hits + self._misses
+            return {
+                'hits': hits,
+                'shared_hits': self._shared_hits,
+                'misses': self._misses,
+                'hit_ratio': (hits / lookups) if lookups else 0.0,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations,
+            }
+
+    def _get_shared(self, token: str) -> Optional[Dict]:
+        """Buscar no nível compartilhado e trazer para o local"""
+        if not self.shared:
+            return None
+        value = self.shared.get(self._shared_key(token))
+        if value is None:
+            return None
+        expires_at = datetime.datetime.fromtimestamp(value['expires_at'])
+        remaining = (expires_at - datetime.datetime.now()).total_seconds()
+        if remaining <= 0:
+            return None
+        self._put_local(token, value['user'], expires_at, min(self.local_ttl, remaining))
+        return {'user': dict(value['user']), 'expires_at': expires_at}
+
+    @staticmethod
+    def _shared_key(token: str) -> str:
+        """Chave no cache compartilhado (hash do token)"""
+        return 'session:' + hashlib.sha256(token.encode('utf-8')).hexdigest()[:32]
+
+    def _remove(self, token: str, user_id: int) -> None:
+        """Remover entrada (chamar com o lock adquirido)"""
+        self._entries.pop(token, None)
+        self._unlink(token, user_id)
+
+    def _unlink(self, token: str, user_id: int) -> None:
+        """Remover token do índice por usuário (chamar com o lock adquirido)"""
+        tokens = self._tokens_by_user.get(user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user_id]
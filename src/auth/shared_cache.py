@@ -0,0 +1,434 @@
+"""
+Cache Compartilhado - Sistema FONTES
+Estado quente (sessões validadas, contadores de login, estatísticas)
+compartilhado entre workers e nós via protocolo Redis
+
+Com ``FONTES_CACHE_URL=redis://host:6379/0`` os valores ficam num servidor
+Redis (ou compatível), visível a todos os processos. Sem URL, ou enquanto o
+servidor estiver inacessível, o mesmo código usa um cache em memória local
+ao processo; a cada ``RETRY_INTERVAL`` segundos o servidor é tentado de novo.
+
+O cliente fala o protocolo RESP diretamente (sem dependências), com uma
+conexão por thread e pipelining para comandos agrupados. Os valores são
+gravados em JSON sob um prefixo (``FONTES_CACHE_PREFIX``, padrão
+``fontes:``).
+
+Autor: Sistema FONTES
+Data: 2025
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from urllib.parse import unquote, urlparse
+
+CACHE_URL_ENV = 'FONTES_CACHE_URL'
+CACHE_PREFIX_ENV = 'FONTES_CACHE_PREFIX'
+DEFAULT_CACHE_PREFIX = 'fontes:'
+
+DEFAULT_TIMEOUT = 0.5  # segundos para conectar e para cada resposta
+RETRY_INTERVAL = 30.0  # segundos usando o cache local após uma falha do servidor
+DEFAULT_LOCAL_ENTRIES = 10000
+
+
+class CacheUnavailable(Exception):
+    """Servidor de cache inacessível (conexão recusada, timeout, conexão perdida)"""
+
+
+class CacheError(Exception):
+    """Resposta de erro do servidor de cache"""
+
+
+class LocalCache:
+    """
+    Cache em memória com TTL, local ao processo.
+
+    Implementa as mesmas operações de ``RedisCache`` (valores texto,
+    contadores e conjuntos), usado sem servidor configurado e como reserva.
+    """
+
+    name = 'local'
+
+    def __init__(self, max_entries: int = DEFAULT_LOCAL_ENTRIES) -> None:
+        """
+        Inicializar cache local.
+
+        Args:
+            max_entries (int): Chaves mantidas (as menos usadas saem primeiro)
+        """
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        """Obter valor (None se ausente ou expirado)"""
+        with self._lock:
+            value = self._get(key)
+            return None if value is None else str(value)
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        """Gravar valor com tempo de vida em segundos"""
+        with self._lock:
+            self._put(key, value, ttl)
+
+    def delete(self, keys: Sequence[str]) -> None:
+        """Remover chaves"""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def incr(self, key: str, ttl: float) -> int:
+        """Incrementar contador; o TTL é definido na criação e não é renovado"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() >= entry[0]:
+                value = 1
+                self._put(key, value, ttl)
+            else:
+                value = int(entry[1]) + 1
+                self._entries[key] = (entry[0], value)
+            return value
+
+    def sadd(self, key: str, member: str, ttl: float) -> None:
+        """Adicionar membro a um conjunto e renovar o TTL do conjunto"""
+        with self._lock:
+            members = self._get(key)
+            members = set(members) if isinstance(members, set) else set()
+            members.add(member)
+            self._put(key, members, ttl)
+
+    def spop_all(self, key: str) -> List[str]:
+        """Remover um conjunto e devolver seus membros"""
+        with self._lock:
+            members = self._get(key)
+            self._entries.pop(key, None)
+            return sorted(members) if isinstance(members, set) else []
+
+    def ping(self) -> bool:
+        """Verificar disponibilidade (sempre disponível)"""
+        return True
+
+    def close(self) -> None:
+        """Esvaziar o cache"""
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, key: str) -> Any:
+        """Valor vivo da chave (chamar com o lock adquirido)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() >= entry[0]:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _put(self, key: str, value: Any, ttl: float) -> None:
+        """Gravar entrada e respeitar o limite de chaves (chamar com o lock adquirido)"""
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class RedisCache:
+    """
+    Cliente mínimo do protocolo Redis (RESP2).
+
+    Cada thread usa sua própria conexão; após um fork, o processo filho abre
+    as suas. Falhas de rede fecham a conexão e levantam ``CacheUnavailable``.
+    """
+
+    def __init__(self, host: str, port: int = 6379, db: int = 0, password: Optional[str] = None,
+                 timeout: float = DEFAULT_TIMEOUT) -> None:
+        """
+        Inicializar cliente.
+
+        Args:
+            host (str): Endereço do servidor
+            port (int): Porta do servidor
+            db (int): Número do banco (SELECT)
+            password (str, optional): Senha (AUTH)
+            timeout (float): Limite para conectar e para cada resposta, em segundos
+        """
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self.name = f"redis://{host}:{port}/{db}"
+        self._local = threading.local()
+
+    @classmethod
+    def from_url(cls, url: str, timeout: float = DEFAULT_TIMEOUT) -> 'RedisCache':
+        """
+        Criar cliente a partir de ``redis://[:senha@]host[:porta][/db]``.
+
+        Raises:
+            ValueError: Esquema diferente de redis://
+        """
+        parsed = urlparse(url)
+        if parsed.scheme != 'redis':
+            raise ValueError(f"URL de cache não suportada: {url}")
+        db = int(parsed.path.lstrip('/') or 0)
+        password = unquote(parsed.password) if parsed.password else None
+        return cls(parsed.hostname or 'localhost', parsed.port or 6379, db, password, timeout)
+
+    def get(self, key: str) -> Optional[str]:
+        """GET"""
+        value = self.execute('GET', key)
+        return None if value is None else value.decode('utf-8')
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        """SET com expiração em milissegundos"""
+        self.execute('SET', key, value, 'PX', max(int(ttl * 1000), 1))
+
+    def delete(self, keys: Sequence[str]) -> None:
+        """DEL"""
+        if keys:
+            self.execute('DEL', *keys)
+
+    def incr(self, key: str, ttl: float) -> int:
+        """INCR de contador com expiração a partir da criação"""
+        # SET NX cria o contador já com o TTL; INCR preserva o TTL existente
+        replies = self.pipeline([('SET', key, 0, 'PX', max(int(ttl * 1000), 1), 'NX'), ('INCR', key)])
+        return replies[1]
+
+    def sadd(self, key: str, member: str, ttl: float) -> None:
+        """SADD renovando a expiração do conjunto"""
+        self.pipeline([('SADD', key, member), ('PEXPIRE', key, max(int(ttl * 1000), 1))])
+
+    def spop_all(self, key: str) -> List[str]:
+        """SMEMBERS seguido de DEL"""
+        members, _ = self.pipeline([('SMEMBERS', key), ('DEL', key)])
+        return sorted(member.decode('utf-8') for member in members or [])
+
+    def ping(self) -> bool:
+        """PING"""
+        return self.execute('PING') == 'PONG'
+
+    def execute(self, *args) -> Any:
+        """Executar um comando e devolver a resposta"""
+        return self.pipeline([args])[0]
+
+    def pipeline(self, commands: Iterable[Sequence]) -> List[Any]:
+        """
+        Enviar vários comandos de uma vez e ler as respostas em ordem.
+
+        Raises:
+            CacheUnavailable: Falha de rede (a conexão é descartada)
+            CacheError: O servidor respondeu com erro a algum comando
+        """
+        commands = list(commands)
+        payload = b''.join(self._encode(command) for command in commands)
+        sock, reader = self._connection()
+        try:
+            sock.sendall(payload)
+            replies = [self._read_reply(reader) for _ in commands]
+        except (OSError, EOFError) as e:
+            self._discard()
+            raise CacheUnavailable(f"{self.name}: {e}") from e
+
+        for reply in replies:
+            if isinstance(reply, CacheError):
+                raise reply
+        return replies
+
+    def close(self) -> None:
+        """Fechar a conexão da thread atual"""
+        self._discard()
+
+    def _connection(self):
+        """Conexão da thread atual, aberta sob demanda"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and conn[0] == os.getpid():
+            return conn[1], conn[2]
+
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except OSError as e:
+            raise CacheUnavailable(f"{self.name}: {e}") from e
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        reader = sock.makefile('rb')
+        self._local.conn = (os.getpid(), sock, reader)
+
+        setup = []
+        if self.password:
+            setup.append(('AUTH', self.password))
+        if self.db:
+            setup.append(('SELECT', self.db))
+        if setup:
+            self.pipeline(setup)
+        return sock, reader
+
+    def _discard(self) -> None:
+        """Fechar e esquecer a conexão da thread atual"""
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None and conn[0] == os.getpid():
+            try:
+                conn[2].close()
+                conn[1].close()
+            except OSError:
+                pass
+
+    @staticmethod
+    def _encode(command: Sequence) -> bytes:
+        """Codificar um comando como array RESP de bulk strings"""
+        parts = [b'*%d\r\n' % len(command)]
+        for arg in command:
+            if isinstance(arg, bytes):
+                data = arg
+            else:
+                data = str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        return b''.join(parts)
+
+    @classmethod
+    def _read_reply(cls, reader) -> Any:
+        """Ler uma resposta RESP (erros são devolvidos como CacheError)"""
+        line = reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise EOFError("conexão encerrada pelo servidor")
+        kind, body = line[:1], line[1:-2]
+        if kind == b'+':
+            return body.decode('utf-8')
+        if kind == b'-':
+            return CacheError(body.decode('utf-8'))
+        if kind == b':':
+            return int(body)
+        if kind == b'$':
+            length = int(body)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            if len(data) < length + 2:
+                raise EOFError("conexão encerrada pelo servidor")
+            return data[:-2]
+        if kind == b'*':
+            count = int(body)
+            if count < 0:
+                return None
+            return [cls._read_reply(reader) for _ in range(count)]
+        raise EOFError(f"resposta RESP inválida: {line!r}")
+
+
+class SharedCache:
+    """
+    Cache de valores JSON com servidor compartilhado e reserva local.
+
+    Operações que falham no servidor são refeitas no cache local, e o
+    servidor fica fora de uso por ``retry_interval`` segundos. Valores
+    gravados localmente durante a falha não são copiados para o servidor.
+    """
+
+    def __init__(self, backend: Optional[RedisCache] = None, prefix: str = DEFAULT_CACHE_PREFIX,
+                 local: Optional[LocalCache] = None, retry_interval: float = RETRY_INTERVAL) -> None:
+        """
+        Inicializar cache compartilhado.
+
+        Args:
+            backend (RedisCache, optional): Servidor compartilhado (None: só local)
+            prefix (str): Prefixo de todas as chaves
+            local (LocalCache, optional): Cache local de reserva
+            retry_interval (float): Segundos até tentar o servidor após uma falha
+        """
+        self.backend = backend
+        self.prefix = prefix
+        self.local = local or LocalCache()
+        self.retry_interval = retry_interval
+
+        self._lock = threading.Lock()
+        self._down_until = 0.0
+        self._errors = 0
+        self._fallback_ops = 0
+
+    @property
+    def is_remote(self) -> bool:
+        """Há um servidor compartilhado configurado"""
+        return self.backend is not None
+
+    def get(self, key: str) -> Any:
+        """Obter valor (None se ausente)"""
+        value = self._call('get', self.prefix + key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Gravar valor serializável em JSON com tempo de vida em segundos"""
+        self._call('set', self.prefix + key, json.dumps(value, separators=(',', ':')), ttl)
+
+    def delete(self, *keys: str) -> None:
+        """Remover chaves"""
+        self._call('delete', [self.prefix + key for key in keys])
+
+    def incr(self, key: str, ttl: float) -> int:
+        """Incrementar contador que expira ``ttl`` segundos após o primeiro incremento"""
+        return self._call('incr', self.prefix + key, ttl)
+
+    def add_to_set(self, key: str, member: str, ttl: float) -> None:
+        """Adicionar membro a um conjunto"""
+        self._call('sadd', self.prefix + key, member, ttl)
+
+    def pop_set(self, key: str) -> List[str]:
+        """Remover um conjunto e devolver seus membros"""
+        return self._call('spop_all', self.prefix + key)
+
+    def stats(self) -> Dict:
+        """
+        Obter estado do cache.
+
+        Returns:
+            Dict: Servidor em uso, disponibilidade, erros e operações feitas na reserva local
+        """
+        with self._lock:
+            return {
+                'backend': self.backend.name if self.backend else self.local.name,
+                'available': self.backend is not None and time.monotonic() >= self._down_until,
+                'errors': self._errors,
+                'fallback_ops': self._fallback_ops,
+            }
+
+    def close(self) -> None:
+        """Fechar a conexão da thread atual com o servidor"""
+        if self.backend is not None:
+            self.backend.close()
+
+    def _call(self, operation: str, *args) -> Any:
+        """Executar no servidor ou, se indisponível, no cache local"""
+        backend = self.backend
+        if backend is not None and time.monotonic() >= self._down_until:
+            try:
+                return getattr(backend, operation)(*args)
+            except (CacheUnavailable, CacheError) as e:
+                with self._lock:
+                    self._errors += 1
+                    self._down_until = time.monotonic() + self.retry_interval
+                logging.warning(f"Cache compartilhado indisponível, usando cache local "
+                                f"por {self.retry_interval:.0f} s: {e}")
+        if backend is not None:
+            with self._lock:
+                self._fallback_ops += 1
+        return getattr(self.local, operation)(*args)
+
+
+def create_shared_cache(url: Optional[str] = None, prefix: Optional[str] = None) -> SharedCache:
+    """
+    Criar o cache a partir da URL (padrão: variável FONTES_CACHE_URL).
+
+    Args:
+        url (str, optional): ``redis://...``; vazio usa apenas o cache local
+        prefix (str, optional): Prefixo das chaves (padrão: FONTES_CACHE_PREFIX ou 'fontes:')
+
+    Returns:
+        SharedCache: Cache pronto para uso
+    """
+    url = os.environ.get(CACHE_URL_ENV, '') if url is None else url
+    prefix = os.environ.get(CACHE_PREFIX_ENV, DEFAULT_CACHE_PREFIX) if prefix is None else prefix
+    backend = RedisCache.from_url(url) if url else None
+    return SharedCache(backend, prefix)
@@ -0,0 +1,204 @@
+"""
+Tokens de Sessão Assinados - Sistema FONTES
+Tokens HMAC verificáveis sem consulta ao banco de dados
+
+Formato do token::
+
+    v1.<dados base64url>.<HMAC-SHA256 base64url>
+
+Os dados são uma lista JSON com id, usuário, nome, email, função, expiração
+(epoch) e um identificador aleatório da sessão (jti). A verificação custa
+um HMAC e a decodificação do JSON.
+
+Como um token assinado continua válido até expirar, sessões encerradas
+(logout, desativação ou remoção do usuário, troca de função) entram numa
+lista de revogação em memória, sincronizada periodicamente a partir das
+sessões inativas e ainda não expiradas da tabela ``sessions``.
+
+Autor: Sistema FONTES
+Data: 2025
+"""
+
+import base64
+import datetime
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, NamedTuple, Optional
+
+SIGNED_TOKEN_PREFIX = 'v1.'
+SECRET_SIZE = 32
+SECRET_ENV_VAR = 'FONTES_SESSION_SECRET'
+
+
+class TokenClaims(NamedTuple):
+    """Dados carregados por um token assinado"""
+    user_id: int
+    username: str
+    full_name: str
+    email: Optional[str]
+    role: str
+    expires_at: datetime.datetime
+    jti: str
+
+
+def _b64encode(data: bytes) -> str:
+    """Base64 URL-safe sem padding"""
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data: str) -> bytes:
+    """Decodificar base64 URL-safe sem padding"""
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def load_or_create_secret(path: str) -> bytes:
+    """
+    Obter a chave de assinatura.
+
+    Usa a variável de ambiente ``FONTES_SESSION_SECRET`` (hexadecimal) se
+    definida; caso contrário lê o arquivo, criando-o com uma chave aleatória
+    na primeira execução. Todos os processos que compartilham o banco devem
+    usar a mesma chave.
+
+    Args:
+        path (str): Caminho do arquivo da chave
+
+    Returns:
+        bytes: Chave secreta
+    """
+    env_secret = os.environ.get(SECRET_ENV_VAR)
+    if env_secret:
+        return bytes.fromhex(env_secret)
+
+    secret_path = Path(path)
+    try:
+        return bytes.fromhex(secret_path.read_text(encoding='ascii').strip())
+    except FileNotFoundError:
+        pass
+
+    secret = secrets.token_bytes(SECRET_SIZE)
+    secret_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        # O_EXCL: se outro processo criou a chave ao mesmo tempo, usar a dele
+        fd = os.open(str(secret_path), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return bytes.fromhex(secret_path.read_text(encoding='ascii').strip())
+    with os.fdopen(fd, 'w', encoding='ascii') as f:
+        f.write(secret.hex())
+    logging.info(f"Chave de assinatura de sessões criada em {secret_path}")
+    return secret
+
+
+class TokenSigner:
+    """Emissão e verificação de tokens de sessão assinados"""
+
+    def __init__(self, secret: bytes) -> None:
+        """
+        Inicializar assinador.
+
+        Args:
+            secret (bytes): Chave secreta do HMAC
+        """
+        self._secret = secret
+
+    def issue(self, user: Dict, expires_at: datetime.datetime) -> str:
+        """
+        Emitir token para um usuário.
+
+        Args:
+            user (Dict): Dados do usuário ('id', 'username', 'full_name', 'email', 'role')
+            expires_at (datetime): Expiração da sessão (horário local)
+
+        Returns:
+            str: Token assinado
+        """
+        payload = json.dumps([user['id'], user['username'], user['full_name'], user['email'],
+                              user['role'], int(expires_at.timestamp()), secrets.token_hex(8)],
+                             separators=(',', ':'), ensure_ascii=False)
+        body = SIGNED_TOKEN_PREFIX + _b64encode(payload.encode('utf-8'))
+        return body + '.' + _b64encode(self._sign(body))
+
+    def verify(self, token: str) -> Optional[TokenClaims]:
+        """
+        Verificar assinatura e expiração de um token.
+
+        Args:
+            token (str): Token recebido
+
+        Returns:
+            Optional[TokenClaims]: Dados do token, ou None se inválido ou expirado
+        """
+        claims = self.decode(token)
+        if claims is None or claims.expires_at <= datetime.datetime.now():
+            return None
+        return claims
+
+    def decode(self, token: str) -> Optional[TokenClaims]:
+        """
+        Verificar a assinatura e decodificar o token, sem checar expiração.
+
+        Args:
+            token (str): Token recebido
+
+        Returns:
+            Optional[TokenClaims]: Dados do token, ou None se a assinatura não confere
+        """
+        if not token.startswith(SIGNED_TOKEN_PREFIX):
+            return None
+        body, _, signature = token.rpartition('.')
+        try:
+            if not hmac.compare_digest(self._sign(body), _b64decode(signature)):
+                return None
+            user_id, username, full_name, email, role, expires, jti = json.loads(
+                _b64decode(body[len(SIGNED_TOKEN_PREFIX):]))
+        except (ValueError, TypeError):
+            return None
+        return TokenClaims(user_id, username, full_name, email, role,
+                           datetime.datetime.fromtimestamp(expires), jti)
+
+    def _sign(self, body: str) -> bytes:
+        """Calcular o HMAC do corpo do token"""
+        return hmac.new(self._secret, body.encode('ascii'), hashlib.sha256).digest()
+
+
+class RevocationList:
+    """Identificadores (jti) de sessões assinadas encerradas antes de expirar"""
+
+    def __init__(self) -> None:
+        """Inicializar lista vazia"""
+        self._lock = threading.Lock()
+        self._revoked: Dict[str, datetime.datetime] = {}
+        self.synced_at: Optional[datetime.datetime] = None
+
+    def __contains__(self, jti: str) -> bool:
+        return jti in self._revoked
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def add(self, claims: TokenClaims) -> None:
+        """Revogar uma sessão localmente (antes da próxima sincronização)"""
+        with self._lock:
+            self._revoked[claims.jti] = claims.expires_at
+
+    def replace(self, revoked: Iterable[TokenClaims]) -> None:
+        """
+        Substituir o conteúdo pelo estado lido do banco.
+
+        Revogações locais ainda não confirmadas pelo banco e não expiradas
+        são mantidas.
+        """
+        now = datetime.datetime.now()
+        entries = {claims.jti: claims.expires_at for claims in revoked}
+        with self._lock:
+            for jti, expires_at in self._revoked.items():
+                if expires_at > now:
+                    entries.setdefault(jti, expires_at)
+            self._revoked = entries
+            self.synced_at = now
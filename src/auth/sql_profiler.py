@@ -0,0 +1,442 @@
+"""
+Instrumentação SQL - Sistema FONTES
+Contagem, latência e planos de consulta das conexões de autenticação
+
+Desativada por padrão. Quando ativada (``AuthenticationSystem(profile_sql=True)``,
+variável de ambiente ``FONTES_SQL_PROFILE=1`` ou pela aba Performance do
+painel de administração), registra por statement:
+- execuções e histograma de latência do ``execute`` (até a primeira linha)
+- passos da máquina virtual do SQLite (callback de progresso)
+- statements executados pelo SQLite em consequência dele: triggers e o
+  BEGIN implícito do módulo sqlite3 (callback de trace)
+- as execuções mais lentas, com o plano de consulta (EXPLAIN QUERY PLAN)
+
+Operações de alto nível (authenticate, validate_session, get_*_logs...)
+marcadas com ``profiled`` têm o tempo total e o tempo gasto no banco
+acumulados separadamente, para mostrar qual delas domina sob carga.
+
+Independente da instrumentação, toda execução alimenta o histograma
+``fontes_sqlite_query_seconds`` (por tipo de statement) e toda operação
+marcada alimenta ``fontes_auth_operation_seconds``, exportados em /metrics.
+
+Autor: Sistema FONTES
+Data: 2025
+"""
+
+import bisect
+import datetime
+import functools
+import heapq
+import itertools
+import json
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from utils.metrics import REGISTRY
+
+SQL_PROFILE_ENV = 'FONTES_SQL_PROFILE'
+PROGRESS_STEPS = 1000  # instruções da VM entre chamadas do callback de progresso
+SLOWEST_KEPT = 20  # execuções mais lentas guardadas com os parâmetros
+REPORT_STATEMENTS = 50  # statements listados no relatório (por tempo total)
+
+# Limites superiores (ms) das faixas do histograma de latência
+LATENCY_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# Métricas permanentes (segundos)
+QUERY_KINDS = ('select', 'insert', 'update', 'delete', 'replace', 'with', 'pragma', 'begin', 'commit')
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERY_SECONDS = REGISTRY.histogram('fontes_sqlite_query_seconds',
+                                   'Duração do execute no SQLite por tipo de statement',
+                                   ('statement',), buckets=QUERY_BUCKETS)
+OPERATION_SECONDS = REGISTRY.histogram('fontes_auth_operation_seconds',
+                                       'Duração das operações de autenticação', ('operation',))
+
+_WHITESPACE = re.compile(r'\s+')
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def normalize_sql(sql: str) -> str:
+    """Remover espaços repetidos para agrupar execuções do mesmo statement"""
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def statement_kind(sql: str) -> str:
+    """Tipo do statement (primeira palavra) para o rótulo da métrica"""
+    head = sql.lstrip()[:7].lower()
+    for kind in QUERY_KINDS:
+        if head.startswith(kind):
+            return kind
+    return 'other'
+
+
+class LatencyHistogram:
+    """Histograma de latências em faixas fixas (LATENCY_BUCKETS_MS)"""
+
+    __slots__ = ('counts', 'count', 'total_ms', 'max_ms')
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, elapsed_ms: float) -> None:
+        """Registrar uma medição"""
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Estimar um percentil pelo limite superior da faixa que o contém.
+
+        Args:
+            fraction (float): Percentil entre 0 e 1 (ex.: 0.95)
+
+        Returns:
+            float: Latência em ms (o máximo observado na última faixa)
+        """
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def to_dict(self) -> Dict:
+        """Resumo serializável em JSON"""
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': round(self.max_ms, 3),
+            'buckets': [[bound, count] for bound, count in
+                        zip(list(LATENCY_BUCKETS_MS) + ['inf'], self.counts) if count],
+        }
+
+
+class _StatementStats:
+    """Acumuladores de um statement"""
+
+    __slots__ = ('latency', 'vm_steps', 'sqlite_statements', 'operations')
+
+    def __init__(self) -> None:
+        self.latency = LatencyHistogram()
+        self.vm_steps = 0
+        self.sqlite_statements = 0
+        self.operations: Dict[str, int] = {}
+
+
+class SqlProfiler:
+    """Estatísticas de execução SQL coletadas pelos callbacks do sqlite3"""
+
+    def __init__(self, db_path: str) -> None:
+        """
+        Inicializar coletor.
+
+        Args:
+            db_path (str): Banco usado para obter os planos de consulta
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._sequence = itertools.count()
+        self.reset()
+
+    def reset(self) -> None:
+        """Descartar tudo o que foi coletado"""
+        with self._lock:
+            self.started_at = datetime.datetime.now()
+            self._started = time.perf_counter()
+            self._statements: Dict[str, _StatementStats] = {}
+            self._operations: Dict[str, Dict] = {}
+            self._untimed: Dict[str, int] = {}
+            self._slowest: List[tuple] = []
+
+    # Callbacks registrados nas conexões (ver ProfiledConnection)
+
+    def on_trace(self, sql: str) -> None:
+        """Callback de trace: chamado pelo SQLite no início de cada statement"""
+        scratch = getattr(self._local, 'statement', None)
+        if scratch is not None:
+            scratch[1] += 1
+            return
+        # Fora de um execute (commit(), executescript...): apenas contar
+        key = _LITERALS.sub('?', normalize_sql(sql))
+        with self._lock:
+            self._untimed[key] = self._untimed.get(key, 0) + 1
+
+    def on_progress(self) -> int:
+        """Callback de progresso: chamado a cada PROGRESS_STEPS instruções da VM"""
+        scratch = getattr(self._local, 'statement', None)
+        if scratch is not None:
+            scratch[0] += PROGRESS_STEPS
+        return 0  # Diferente de zero interromperia o statement
+
+    @contextmanager
+    def statement(self, sql: str):
+        """
+        Medir a execução de um statement na thread atual.
+
+        Os parâmetros não são recebidos: senhas, tokens e nomes de usuário
+        não ficam guardados na amostra das execuções lentas.
+
+        Args:
+            sql (str): Statement executado
+        """
+        local = self._local
+        scratch = local.statement = [0, 0]  # passos da VM, statements vistos pelo trace
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            local.statement = None
+            self._record(sql, elapsed_ms, scratch)
+
+    @contextmanager
+    def operation(self, name: str):
+        """
+        Medir uma operação de alto nível (authenticate, get_all_logs...).
+
+        Operações aninhadas são contabilizadas na mais externa.
+
+        Args:
+            name (str): Nome da operação
+        """
+        local = self._local
+        if getattr(local, 'operation', None) is not None:
+            yield
+            return
+
+        scratch = local.operation = [name, 0.0, 0]  # nome, ms no banco, statements
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            local.operation = None
+            with self._lock:
+                stats = self._operations.get(name)
+                if stats is None:
+                    stats = self._operations[name] = {'latency': LatencyHistogram(),
+                                                      'db_ms': 0.0, 'statements': 0}
+                stats['latency'].add(elapsed_ms)
+                stats['db_ms'] += scratch[1]
+                stats['statements'] += scratch[2]
+
+    def _record(self, sql: str, elapsed_ms: float, scratch: list) -> None:
+        """Acumular uma execução medida"""
+        key = normalize_sql(sql)
+        operation = getattr(self._local, 'operation', None)
+        if operation is not None:
+            operation[1] += elapsed_ms
+            operation[2] += 1
+        op_name = operation[0] if operation is not None else None
+
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                stats = self._statements[key] = _StatementStats()
+            stats.latency.add(elapsed_ms)
+            stats.vm_steps += scratch[0]
+            stats.sqlite_statements += scratch[1]
+            if op_name is not None:
+                stats.operations[op_name] = stats.operations.get(op_name, 0) + 1
+
+            if len(self._slowest) < SLOWEST_KEPT or elapsed_ms > self._slowest[0][0]:
+                sample = (elapsed_ms, next(self._sequence), key, op_name,
+                          threading.current_thread().name, datetime.datetime.now())
+                if len(self._slowest) < SLOWEST_KEPT:
+                    heapq.heappush(self._slowest, sample)
+                else:
+                    heapq.heapreplace(self._slowest, sample)
+
+    def report(self, explain: bool = True) -> Dict:
+        """
+        Montar o relatório (serializável em JSON).
+
+        Args:
+            explain (bool): Incluir o plano de consulta das execuções mais lentas
+
+        Returns:
+            Dict: operations, statements, untimed e slowest, ordenados por custo
+        """
+        with self._lock:
+            operations = [
+                dict(name=name, db_ms=round(stats['db_ms'], 3), statements=stats['statements'],
+                     **stats['latency'].to_dict())
+                for name, stats in self._operations.items()
+            ]
+            statements = [
+                dict(sql=key, vm_steps=stats.vm_steps, sqlite_statements=stats.sqlite_statements,
+                     operations=dict(stats.operations), **stats.latency.to_dict())
+                for key, stats in self._statements.items()
+            ]
+            untimed = [{'sql': key, 'count': count} for key, count in self._untimed.items()]
+            slowest = sorted(self._slowest, reverse=True)
+            elapsed_s = time.perf_counter() - self._started
+            started_at = self.started_at
+
+        operations.sort(key=lambda item: item['total_ms'], reverse=True)
+        statements.sort(key=lambda item: item['total_ms'], reverse=True)
+        untimed.sort(key=lambda item: item['count'], reverse=True)
+
+        plans: Dict[str, Optional[List[str]]] = {}
+        slow_items = []
+        for elapsed_ms, _, key, op_name, thread_name, at in slowest:
+            if explain and key not in plans:
+                plans[key] = self.explain(key)
+            slow_items.append({'sql': key, 'elapsed_ms': round(elapsed_ms, 3), 'operation': op_name,
+                               'thread': thread_name, 'at': at.isoformat(timespec='seconds'),
+                               'plan': plans.get(key)})
+
+        return {
+            'started_at': started_at.isoformat(timespec='seconds'),
+            'elapsed_s': round(elapsed_s, 1),
+            'operations': operations,
+            'statements': statements[:REPORT_STATEMENTS],
+            'untimed': untimed,
+            'slowest': slow_items,
+        }
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        """Relatório em JSON"""
+        return json.dumps(self.report(), indent=indent, ensure_ascii=False)
+
+    def explain(self, sql: str) -> Optional[List[str]]:
+        """
+        Obter o plano de consulta de um statement, numa conexão somente leitura.
+
+        O plano não depende dos valores: os parâmetros são substituídos por NULL.
+
+        Args:
+            sql (str): Statement
+
+        Returns:
+            Optional[List[str]]: Linhas do plano, ou None se não aplicável
+        """
+        if sql.split(None, 1)[0].upper() not in ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE'):
+            return None
+        try:
+            conn = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True)
+        except sqlite3.Error:
+            return None
+        try:
+            return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, (None,) * sql.count('?'))]
+        except sqlite3.Error:
+            return None  # Tabelas temporárias ou bancos anexados de outra conexão
+        finally:
+            conn.close()
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor que mede execute/executemany quando a instrumentação está ativa"""
+
+    def execute(self, sql, parameters=()):
+        profiler = self.connection.active_profiler()
+        started = time.perf_counter()
+        try:
+            if profiler is None:
+                return super().execute(sql, parameters)
+            with profiler.statement(sql):
+                return super().execute(sql, parameters)
+        finally:
+            QUERY_SECONDS.observe(time.perf_counter() - started, statement_kind(sql))
+
+    def executemany(self, sql, seq_of_parameters):
+        profiler = self.connection.active_profiler()
+        started = time.perf_counter()
+        try:
+            if profiler is None:
+                return super().executemany(sql, seq_of_parameters)
+            with profiler.statement(sql):
+                return super().executemany(sql, seq_of_parameters)
+        finally:
+            QUERY_SECONDS.observe(time.perf_counter() - started, statement_kind(sql))
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """
+    Conexão que repassa execuções ao SqlProfiler do seu ConnectionManager.
+
+    Os callbacks de trace e progresso são (des)registrados pela própria
+    thread dona da conexão, na primeira execução depois que a
+    instrumentação é ligada ou desligada. Desligada, o custo por execução
+    é uma comparação de atributo e uma observação no histograma de /metrics.
+    """
+
+    profiler_source = None  # objeto com o atributo ``profiler`` (ConnectionManager)
+    _attached: Optional[SqlProfiler] = None
+
+    def active_profiler(self) -> Optional[SqlProfiler]:
+        """Profiler ativo, registrando os callbacks se ele mudou"""
+        source = self.profiler_source
+        profiler = source.profiler if source is not None else None
+        if profiler is not self._attached:
+            if profiler is None:
+                self.set_trace_callback(None)
+                self.set_progress_handler(None, 0)
+            else:
+                self.set_trace_callback(profiler.on_trace)
+                self.set_progress_handler(profiler.on_progress, PROGRESS_STEPS)
+            self._attached = profiler
+        return profiler
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        profiler = self.active_profiler()
+        started = time.perf_counter()
+        try:
+            if profiler is None:
+                return super().execute(sql, parameters)
+            with profiler.statement(sql):
+                return super().execute(sql, parameters)
+        finally:
+            QUERY_SECONDS.observe(time.perf_counter() - started, statement_kind(sql))
+
+    def executemany(self, sql, seq_of_parameters):
+        profiler = self.active_profiler()
+        started = time.perf_counter()
+        try:
+            if profiler is None:
+                return super().executemany(sql, seq_of_parameters)
+            with profiler.statement(sql):
+                return super().executemany(sql, seq_of_parameters)
+        finally:
+            QUERY_SECONDS.observe(time.perf_counter() - started, statement_kind(sql))
+
+
+def profiled(name: str):
+    """
+    Marcar um método como operação medida pelo ``self.profiler`` (se ativo)
+    e pelo histograma ``fontes_auth_operation_seconds``.
+
+    Args:
+        name (str): Nome da operação no relatório
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = self.profiler
+            with OPERATION_SECONDS.time(name):
+                if profiler is None:
+                    return method(self, *args, **kwargs)
+                with profiler.operation(name):
+                    return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
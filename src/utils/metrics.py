@@ -0,0 +1,367 @@
+"""
+Métricas - Sistema FONTES
+Contadores, gauges e histogramas expostos no formato texto do Prometheus
+
+Cada processo mantém seus valores em memória. Com ``FONTES_METRICS_DIR``
+(ou ``PROMETHEUS_MULTIPROC_DIR``) definido, cada processo grava um retrato
+em ``<dir>/metrics_<pid>.json`` a cada ``FLUSH_INTERVAL`` segundos, e a
+exposição soma os retratos de todos os processos do diretório. Assim o
+/metrics servido por qualquer worker do gunicorn mostra o total do serviço:
+contadores e histogramas de workers já encerrados continuam somados, gauges
+só contam processos vivos. O diretório deve ser esvaziado ao iniciar o
+serviço (ver ``gunicorn.conf.py``).
+
+Autor: Sistema FONTES
+Data: 2025
+"""
+
+import atexit
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+METRICS_DIR_ENVS = ('FONTES_METRICS_DIR', 'PROMETHEUS_MULTIPROC_DIR')
+FLUSH_INTERVAL = 1.0  # segundos entre gravações do retrato do processo
+SNAPSHOT_PREFIX = 'metrics_'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Limites superiores (segundos) padrão dos histogramas
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def metrics_dir_from_env() -> Optional[str]:
+    """Diretório compartilhado entre processos, se configurado"""
+    for name in METRICS_DIR_ENVS:
+        if os.environ.get(name):
+            return os.environ[name]
+    return None
+
+
+def clear_metrics_dir(directory: str) -> None:
+    """Apagar retratos de execuções anteriores (chamar antes dos workers subirem)"""
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.startswith(SNAPSHOT_PREFIX):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == 'nt':
+        return True  # os.kill(pid, 0) no Windows envia CTRL_C_EVENT
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _labels_text(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    """Base: valores por combinação de rótulos, protegidos pelo lock do registro"""
+
+    kind = ''
+
+    def __init__(self, registry: 'MetricsRegistry', name: str, documentation: str,
+                 labelnames: Sequence[str] = ()) -> None:
+        self._registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Sequence) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name}: rótulos esperados {self.labelnames}, recebidos {labels}")
+        return tuple(str(label) for label in labels)
+
+    def _describe(self) -> Dict:
+        return {'type': self.kind, 'help': self.documentation, 'labelnames': list(self.labelnames)}
+
+
+class Counter(_Metric):
+    """Contador monotônico"""
+
+    kind = 'counter'
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        """Somar ``amount`` ao contador dos rótulos informados"""
+        key = self._key(labels)
+        with self._registry._updating():
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Counter):
+    """Valor que sobe e desce (somado entre processos vivos)"""
+
+    kind = 'gauge'
+
+    def dec(self, *labels, amount: float = 1.0) -> None:
+        """Subtrair ``amount``"""
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels) -> None:
+        """Definir o valor"""
+        key = self._key(labels)
+        with self._registry._updating():
+            self._values[key] = float(value)
+
+    @contextmanager
+    def track_inprogress(self, *labels):
+        """Incrementar durante o bloco"""
+        self.inc(*labels)
+        try:
+            yield
+        finally:
+            self.dec(*labels)
+
+
+class Histogram(_Metric):
+    """Histograma de durações com faixas fixas"""
+
+    kind = 'histogram'
+
+    def __init__(self, registry: 'MetricsRegistry', name: str, documentation: str,
+                 labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels) -> None:
+        """Registrar uma observação"""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._registry._updating():
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        """Medir a duração do bloco"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def _describe(self) -> Dict:
+        description = super()._describe()
+        description['buckets'] = list(self.buckets)
+        return description
+
+
+class MetricsRegistry:
+    """Conjunto de métricas de um processo, com agregação opcional entre processos"""
+
+    def __init__(self, directory: Optional[str] = None, flush_interval: float = FLUSH_INTERVAL) -> None:
+        """
+        Inicializar registro.
+
+        Args:
+            directory (str, optional): Diretório compartilhado pelos processos
+            flush_interval (float): Segundos entre gravações do retrato
+        """
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._dirty = False
+        self._flusher_pid: Optional[int] = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            atexit.register(self.flush)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Obter (ou criar) um contador"""
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Obter (ou criar) um gauge"""
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Obter (ou criar) um histograma"""
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def _register(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, documentation, labelnames, **kwargs)
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Métrica {name} já registrada com outro tipo ou rótulos")
+            return metric
+
+    @contextmanager
+    def _updating(self):
+        """Lock de atualização; zera valores herdados num fork e agenda a gravação"""
+        with self._lock:
+            pid = os.getpid()
+            if pid != self._pid:
+                # Os valores do processo pai já estão no retrato dele
+                for metric in self._metrics.values():
+                    metric._values.clear()
+                self._pid = pid
+            yield
+            self._dirty = True
+            if self.directory and self._flusher_pid != pid:
+                self._flusher_pid = pid
+                threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+
+    def _snapshot(self, mark_clean: bool = False) -> Dict:
+        with self._lock:
+            if mark_clean:
+                self._dirty = False
+            snapshot = {}
+            for name, metric in self._metrics.items():
+                if metric._values:
+                    entry = metric._describe()
+                    entry['samples'] = [[list(key), value if not isinstance(value, list) else list(value)]
+                                        for key, value in metric._values.items()]
+                    snapshot[name] = entry
+            return snapshot
+
+    def flush(self) -> None:
+        """Gravar o retrato deste processo no diretório compartilhado"""
+        if not self.directory:
+            return
+        pid = os.getpid()
+        path = os.path.join(self.directory, f"{SNAPSHOT_PREFIX}{pid}.json")
+        temp_path = f"{path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'pid': pid, 'metrics': self._snapshot(mark_clean=True)}, f)
+            os.replace(temp_path, path)
+        except FileNotFoundError:
+            pass  # diretório removido (ex.: serviço encerrando)
+        except OSError as e:
+            logging.error(f"Erro ao gravar métricas: {e}")
+
+    def close(self) -> None:
+        """Gravar o último retrato e parar a gravação periódica"""
+        self._flusher_pid = None
+        if self.directory:
+            atexit.unregister(self.flush)
+            self.flush()
+
+    def _flush_loop(self) -> None:
+        pid = os.getpid()
+        while self._flusher_pid == pid:
+            time.sleep(self.flush_interval)
+            if self._dirty:
+                self.flush()
+
+    def _snapshots(self) -> List[Tuple[int, Dict]]:
+        """Retratos a agregar: o deste processo (em memória) e os dos demais"""
+        pid = os.getpid()
+        snapshots = [(pid, self._snapshot())]
+        if not self.directory:
+            return snapshots
+        try:
+            names = os.listdir(self.directory)
+        except OSError as e:
+            logging.error(f"Erro ao ler diretório de métricas: {e}")
+            return snapshots
+        for name in names:
+            if not (name.startswith(SNAPSHOT_PREFIX) and name.endswith('.json')):
+                continue
+            try:
+                other = int(name[len(SNAPSHOT_PREFIX):-len('.json')])
+                if other == pid:
+                    continue
+                with open(os.path.join(self.directory, name), encoding='utf-8') as f:
+                    snapshots.append((other, json.load(f)['metrics']))
+            except (OSError, ValueError, KeyError):
+                continue  # retrato sendo substituído ou corrompido
+        return snapshots
+
+    def collect(self) -> Dict[str, Dict]:
+        """
+        Agregar as métricas de todos os processos.
+
+        Returns:
+            Dict: nome -> descrição e 'samples' {rótulos: valor}
+        """
+        merged: Dict[str, Dict] = {}
+        own_pid = os.getpid()
+        for pid, metrics in self._snapshots():
+            alive = pid == own_pid or _pid_alive(pid)
+            for name, entry in metrics.items():
+                if entry['type'] == 'gauge' and not alive:
+                    continue
+                target = merged.get(name)
+                if target is None:
+                    target = merged[name] = {key: value for key, value in entry.items() if key != 'samples'}
+                    target['samples'] = {}
+                elif target['type'] != entry['type'] or target.get('buckets') != entry.get('buckets'):
+                    continue  # outra versão do código com definição diferente
+                samples = target['samples']
+                for labels, value in entry['samples']:
+                    key = tuple(labels)
+                    current = samples.get(key)
+                    if current is None:
+                        samples[key] = list(value) if isinstance(value, list) else value
+                    elif isinstance(value, list):
+                        samples[key] = [a + b for a, b in zip(current, value)]
+                    else:
+                        samples[key] = current + value
+        return merged
+
+    def render(self) -> str:
+        """Texto no formato de exposição do Prometheus (0.0.4)"""
+        lines = []
+        for name, entry in sorted(self.collect().items()):
+            kind, labelnames = entry['type'], entry['labelnames']
+            lines.append(f"# HELP {name} {entry['help']}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(entry['samples'].items()):
+                if kind == 'histogram':
+                    cumulative = 0
+                    for bound, count in zip(entry['buckets'] + [math.inf], value[:-1]):
+                        cumulative += count
+                        le = f'le="{_format_value(bound) if math.isinf(bound) else repr(float(bound))}"'
+                        lines.append(f"{name}_bucket{_labels_text(labelnames, labels, le)} {cumulative}")
+                    lines.append(f"{name}_sum{_labels_text(labelnames, labels)} {_format_value(value[-1])}")
+                    lines.append(f"{name}_count{_labels_text(labelnames, labels)} {cumulative}")
+                else:
+                    suffix = '_total' if kind == 'counter' and not name.endswith('_total') else ''
+                    lines.append(f"{name}{suffix}{_labels_text(labelnames, labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+# Registro do processo, compartilhado por todos os módulos
+REGISTRY = MetricsRegistry(metrics_dir_from_env())
@@ -0,0 +1,248 @@
+"""
+Limitador de Tentativas de Login - Sistema FONTES
+Token bucket por IP e por usuário, compartilhado entre processos via SQLite
+
+Cada chave (``ip:<endereço>``, ``user:<nome>``) tem um balde com
+``capacity`` fichas, reabastecido por completo em ``period`` segundos. Cada
+tentativa consome uma ficha de cada balde envolvido; se algum estiver vazio
+a tentativa é rejeitada antes de qualquer PBKDF2, com o tempo de espera
+(Retry-After) até a próxima ficha.
+
+Com um caminho de arquivo (``FONTES_RATE_LIMIT_DB`` no servidor web) os
+baldes ficam num banco SQLite em WAL, lido e atualizado numa transação
+``BEGIN IMMEDIATE``; todos os workers do gunicorn veem os mesmos saldos.
+Sem caminho, o banco fica em memória, local ao processo. Rejeições já
+decididas são lembradas no processo até expirarem, e as tentativas
+seguintes da mesma chave nem chegam ao SQLite.
+
+Em caso de erro do SQLite o limitador deixa a tentativa passar (o login
+continua protegido pelo limite de concorrência do PasswordHasher).
+
+Autor: Sistema FONTES
+Data: 2025
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+import logging
+from typing import Callable, Dict, NamedTuple, Optional
+
+from utils.metrics import REGISTRY
+
+RATE_LIMIT_DB_ENV = 'FONTES_RATE_LIMIT_DB'
+BUSY_TIMEOUT = 1.0  # segundos aguardando o lock de escrita do SQLite
+PRUNE_EVERY = 500  # tentativas entre remoções de baldes já cheios
+MAX_LOCAL_BLOCKS = 10000  # rejeições lembradas no processo
+THROTTLED_MESSAGE = "Muitas tentativas de login. Tente novamente em {seconds} segundos"
+
+
+class Rule(NamedTuple):
+    """Capacidade do balde e segundos para reabastecê-lo por completo"""
+    capacity: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        """Fichas por segundo"""
+        return self.capacity / self.period
+
+
+# Rajadas curtas são permitidas; tentativas sustentadas seguem o ritmo de reposição
+DEFAULT_RULES = {
+    'ip': Rule(30, 60),     # 30 tentativas por minuto por endereço
+    'user': Rule(10, 300),  # 10 tentativas a cada 5 minutos por usuário
+}
+
+THROTTLED = REGISTRY.counter('fontes_login_throttled_total',
+                             'Tentativas de login rejeitadas pelo limitador', ('scope',))
+
+
+def rate_limit_db_from_env() -> Optional[str]:
+    """Banco compartilhado entre processos, se configurado"""
+    return os.environ.get(RATE_LIMIT_DB_ENV) or None
+
+
+def retry_after_header(seconds: float) -> str:
+    """Valor do cabeçalho Retry-After (segundos inteiros, no mínimo 1)"""
+    return str(max(1, math.ceil(seconds)))
+
+
+class LoginThrottle:
+    """Token bucket por IP e usuário, seguro entre threads e processos"""
+
+    def __init__(self, path: Optional[str] = None, rules: Optional[Dict[str, Rule]] = None,
+                 clock: Callable[[], float] = time.time) -> None:
+        """
+        Inicializar limitador.
+
+        Args:
+            path (str, optional): Banco SQLite compartilhado (padrão: memória do processo)
+            rules (dict, optional): Regra por tipo de chave (padrão: DEFAULT_RULES)
+            clock (callable): Relógio em segundos, comum a todos os processos
+        """
+        self.path = path
+        self.rules = dict(DEFAULT_RULES if rules is None else rules)
+        self.clock = clock
+        self._reset_process_state()
+
+    def _reset_process_state(self) -> None:
+        """Descartar conexão, rejeições e lock herdados (início ou fork)"""
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._blocked: Dict[str, float] = {}
+        self._attempts = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """Abrir (uma vez por processo) o banco dos baldes e criar a tabela"""
+        if self._conn is None:
+            if self.path and self.path != ':memory:':
+                parent = os.path.dirname(os.path.abspath(self.path))
+                os.makedirs(parent, exist_ok=True)
+            conn = sqlite3.connect(self.path or ':memory:', timeout=BUSY_TIMEOUT,
+                                   isolation_level=None, check_same_thread=False)
+            if self.path and self.path != ':memory:':
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    full_at REAL NOT NULL
+                ) WITHOUT ROWID
+            ''')
+            self._conn = conn
+        return self._conn
+
+    def _keys(self, keys: Dict[str, Optional[str]]) -> Dict[str, str]:
+        """Nomes dos baldes (``tipo:valor``) das chaves preenchidas"""
+        unknown = set(keys) - set(self.rules)
+        if unknown:
+            raise ValueError(f"Sem regra para: {', '.join(sorted(unknown))}")
+        return {kind: f"{kind}:{value}" for kind, value in keys.items() if value}
+
+    def acquire(self, **keys: Optional[str]) -> float:
+        """
+        Consumir uma ficha de cada balde (ex.: ``acquire(ip=..., user=...)``).
+
+        Chaves vazias ou None são ignoradas. Nada é consumido se algum
+        balde estiver vazio.
+
+        Returns:
+            float: 0 se a tentativa foi aceita; senão, segundos até a próxima ficha
+        """
+        if os.getpid() != self._pid:
+            self._reset_process_state()  # Conexão e rejeições herdadas no fork
+        names = self._keys(keys)
+        if not names:
+            return 0.0
+
+        with self._lock:
+            now = self.clock()
+            blocked = {kind: self._blocked.get(name, 0.0) - now for kind, name in names.items()}
+            scope = max(blocked, key=blocked.get)
+            if blocked[scope] > 0:
+                THROTTLED.inc(scope)
+                return blocked[scope]
+
+            try:
+                waits = self._consume(names, now)
+            except sqlite3.Error as e:
+                logging.error(f"Erro no limitador de login: {e}")
+                return 0.0
+
+            if waits:
+                for kind, wait in waits.items():
+                    self._remember(names[kind], now + wait)
+                scope = max(waits, key=waits.get)
+                THROTTLED.inc(scope)
+                return waits[scope]
+            return 0.0
+
+    def _consume(self, names: Dict[str, str], now: float) -> Dict[str, float]:
+        """Ler e atualizar os baldes numa transação; devolve as esperas se rejeitado"""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            placeholders = ','.join('?' * len(names))
+            stored = {key: (tokens, updated) for key, tokens, updated in conn.execute(
+                f'SELECT key, tokens, updated FROM buckets WHERE key IN ({placeholders})',
+                tuple(names.values()))}
+
+            balances, waits = {}, {}
+            for kind, name in names.items():
+                rule = self.rules[kind]
+                tokens, updated = stored.get(name, (rule.capacity, now))
+                tokens = min(rule.capacity, tokens + max(0.0, now - updated) * rule.rate)
+                if tokens < 1:
+                    waits[kind] = (1 - tokens) / rule.rate
+                balances[name] = (tokens - 1, (rule.capacity - tokens + 1) / rule.rate)
+
+            if waits:
+                conn.execute('ROLLBACK')
+                return waits
+
+            conn.executemany('''
+                INSERT OR REPLACE INTO buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)
+            ''', [(name, tokens, now, now + refill) for name, (tokens, refill) in balances.items()])
+
+            self._attempts += 1
+            if self._attempts % PRUNE_EVERY == 0:
+                conn.execute('DELETE FROM buckets WHERE full_at <= ?', (now,))
+            conn.execute('COMMIT')
+            return {}
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+
+    def _remember(self, name: str, until: float) -> None:
+        """Lembrar no processo que a chave está bloqueada até ``until``"""
+        if len(self._blocked) >= MAX_LOCAL_BLOCKS:
+            now = self.clock()
+            self._blocked = {key: value for key, value in self._blocked.items() if value > now}
+            if len(self._blocked) >= MAX_LOCAL_BLOCKS:
+                self._blocked.clear()
+        self._blocked[name] = until
+
+    def reset(self, **keys: Optional[str]) -> None:
+        """Devolver os baldes ao saldo cheio (ex.: usuário após login bem-sucedido)"""
+        if os.getpid() != self._pid:
+            self._reset_process_state()
+        names = list(self._keys(keys).values())
+        if not names:
+            return
+        with self._lock:
+            for name in names:
+                self._blocked.pop(name, None)
+            try:
+                self._connection().execute(
+                    f"DELETE FROM buckets WHERE key IN ({','.join('?' * len(names))})", names)
+            except sqlite3.Error as e:
+                logging.error(f"Erro no limitador de login: {e}")
+
+    def close(self) -> None:
+        """Fechar a conexão com o banco"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class NoLoginThrottle:
+    """Limitador que aceita todas as tentativas (benchmarks, ou quando o
+    chamador já limita antes de chegar ao AuthenticationSystem)"""
+
+    def acquire(self, **keys: Optional[str]) -> float:
+        """Sempre aceita"""
+        return 0.0
+
+    def reset(self, **keys: Optional[str]) -> None:
+        """Nada a devolver"""
+
+    def close(self) -> None:
+        """Nada a fechar"""
@@ -0,0 +1,33 @@
+// Sistema FONTES v3.0 - Dashboard
+
+function openService(serviceId, serviceName, icon) {
+    document.getElementById('modalTitle').innerHTML = icon + ' ' + serviceName;
+    document.getElementById('modalBody').innerHTML = `
+        <div class="text-center">
+            <div style="font-size: 64px; margin-bottom: 20px;">${icon}</div>
+            <h4>Funcionalidade em Desenvolvimento</h4>
+            <p>Este serviço será implementado em breve.</p>
+            <p><strong>Serviço:</strong> ${serviceName}</p>
+            <div class="mt-4">
+                <small class="text-muted">
+                    💬 Para mais informações, entre em contato:<br>
+                    📧 suporte@fontes.inss.gov.br<br>
+                    📞 (11) 99999-9999
+                </small>
+            </div>
+        </div>
+    `;
+    new bootstrap.Modal(document.getElementById('serviceModal')).show();
+}
+
+function openMeuINSS() {
+    window.open('https://meu.inss.gov.br/', '_blank');
+}
+
+function showProfile() {
+    alert('⚙️ Configurações do perfil\n\nFuncionalidade em desenvolvimento');
+}
+
+function showSupport() {
+    alert('🆘 Central de Suporte\n\n📞 (11) 99999-9999\n📧 suporte@fontes.inss.gov.br\n💬 Chat online em breve');
+}
@@ -0,0 +1,34 @@
+// Sistema FONTES v3.0 - Página de Login
+
+document.getElementById('loginForm').addEventListener('submit', async (e) => {
+    e.preventDefault();
+
+    const username = document.getElementById('username').value;
+    const password = document.getElementById('password').value;
+    const alertDiv = document.getElementById('alert');
+
+    try {
+        const response = await fetch('/login', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({username, password})
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            alertDiv.className = 'alert alert-success';
+            alertDiv.textContent = data.message;
+            alertDiv.classList.remove('d-none');
+            setTimeout(() => window.location.href = '/dashboard', 1500);
+        } else {
+            alertDiv.className = 'alert alert-danger';
+            alertDiv.textContent = data.message;
+            alertDiv.classList.remove('d-none');
+        }
+    } catch (error) {
+        alertDiv.className = 'alert alert-danger';
+        alertDiv.textContent = 'Erro de conexão';
+        alertDiv.classList.remove('d-none');
+    }
+});
@@ -0,0 +1,250 @@
+"""
+Sistema FONTES v3.0 - Pipeline de Arquivos Estáticos
+Minificação, nomes com hash do conteúdo, versões .gz pré-comprimidas e o
+manifesto usado pelos templates e pelo servidor
+"""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+
+from flask import request, send_from_directory, url_for
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+BUILD_DIR = 'dist'
+MANIFEST_FILE = 'manifest.json'
+ASSETS = ('css/style.css', 'js/main.js', 'css/login.css', 'js/login.js',
+          'css/dashboard.css', 'js/dashboard.js')
+HASH_LENGTH = 10
+GZIP_LEVEL = 9
+
+# Arquivos com hash nunca mudam de conteúdo; os demais revalidam em um dia
+IMMUTABLE_POLICY = 'public, max-age=31536000, immutable'
+STATIC_POLICY = 'public, max-age=86400'
+
+_WORD = re.compile(r'[\w$\u0080-\uffff]')
+
+
+def _split_strings(source, quotes):
+    """Separar o código (já sem comentários) dos literais de string"""
+    parts, code = [], []
+    i, n = 0, len(source)
+    while i < n:
+        if source[i] in quotes:
+            quote = source[i]
+            j = i + 1
+            while j < n and source[j] != quote:
+                j += 2 if source[j] == '\\' else 1
+            parts.append((False, ''.join(code)))
+            parts.append((True, source[i:j + 1]))
+            code = []
+            i = j + 1
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            code.append(' ')
+            i = n if end < 0 else end + 2
+        else:
+            code.append(source[i])
+            i += 1
+    parts.append((False, ''.join(code)))
+    return parts
+
+
+def minify_css(source):
+    """Remover comentários e espaços sem mexer em strings"""
+    result = []
+    for is_string, part in _split_strings(source, '"\''):
+        if not is_string:
+            part = re.sub(r'\s+', ' ', part)
+            part = re.sub(r'\s*([{};,>])\s*', r'\1', part)
+            part = re.sub(r':\s+', ':', part)
+        result.append(part)
+    return re.sub(r';}', '}', ''.join(result)).strip()
+
+
+def minify_js(source):
+    """Remover comentários, indentação e linhas vazias
+
+    As quebras de linha do código são mantidas para não depender da inserção
+    automática de ponto e vírgula; strings, templates e expressões regulares
+    passam intactos.
+    """
+    out = []
+    last = ''          # último caractere significativo do código
+    pending_space = False
+    i, n = 0, len(source)
+
+    def emit(text):
+        nonlocal last, pending_space
+        if pending_space and out and out[-1] != '\n':
+            prev, nxt = out[-1][-1], text[0]
+            if (_WORD.match(prev) and _WORD.match(nxt)) or (prev in '+-' and nxt in '+-'):
+                out.append(' ')
+        pending_space = False
+        out.append(text)
+        last = text[-1]
+
+    while i < n:
+        c = source[i]
+        if c in '"\'`':
+            j = i + 1
+            while j < n and source[j] != c:
+                j += 2 if source[j] == '\\' else 1
+            emit(source[i:j + 1])
+            i = j + 1
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end < 0 else end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            pending_space = True
+        elif c == '/' and (not last or last in '(,=:[!&|?{};+-*%<>~^'):
+            j, in_class = i + 1, False
+            while j < n and source[j] != '\n':
+                if source[j] == '\\':
+                    j += 1
+                elif source[j] == '[':
+                    in_class = True
+                elif source[j] == ']':
+                    in_class = False
+                elif source[j] == '/' and not in_class:
+                    break
+                j += 1
+            j += 1
+            while j < n and source[j].isalpha():
+                j += 1
+            emit(source[i:j])
+            i = j
+        elif c == '\n':
+            if out and out[-1] != '\n':
+                out.append('\n')
+            pending_space = False
+            i += 1
+        elif c.isspace():
+            pending_space = True
+            i += 1
+        else:
+            emit(c)
+            i += 1
+    return ''.join(out).strip() + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def _write_atomic(path, data):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def _remove_stale(directory, stem, ext, keep):
+    """Apagar builds anteriores do mesmo arquivo"""
+    pattern = re.compile(rf'^{re.escape(stem)}\.[0-9a-f]{{{HASH_LENGTH}}}{re.escape(ext)}(\.gz)?$')
+    for name in os.listdir(directory):
+        if pattern.match(name) and not name.startswith(keep):
+            os.remove(os.path.join(directory, name))
+
+
+def build_assets(static_dir=STATIC_DIR, assets=ASSETS):
+    """Minificar os arquivos, gravar as versões com hash e .gz e o manifesto"""
+    manifest = {}
+    report = []
+    for name in assets:
+        stem, ext = os.path.splitext(name)
+        with open(os.path.join(static_dir, name), 'rb') as f:
+            original = f.read()
+        minified = MINIFIERS[ext](original.decode('utf-8')).encode('utf-8')
+        digest = hashlib.sha256(minified).hexdigest()[:HASH_LENGTH]
+        hashed = f"{BUILD_DIR}/{stem}.{digest}{ext}"
+
+        target = os.path.join(static_dir, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        compressed = gzip.compress(minified, compresslevel=GZIP_LEVEL, mtime=0)
+        _write_atomic(target, minified)
+        _write_atomic(target + '.gz', compressed)
+        _remove_stale(os.path.dirname(target), os.path.basename(stem), ext, os.path.basename(hashed))
+
+        manifest[name] = hashed
+        report.append({
+            'asset': name,
+            'file': hashed,
+            'original_bytes': len(original),
+            'minified_bytes': len(minified),
+            'gzip_bytes': len(compressed),
+        })
+
+    manifest_path = os.path.join(static_dir, BUILD_DIR, MANIFEST_FILE)
+    _write_atomic(manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return report
+
+
+class AssetManifest:
+    """Resolve nomes lógicos para os arquivos com hash e serve os .gz"""
+
+    def __init__(self, app=None, static_dir=STATIC_DIR):
+        self.static_dir = static_dir
+        self.assets = self._load()
+        self.immutable = set(self.assets.values())
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Registrar asset_url nos templates e a entrega dos .gz"""
+        app.jinja_env.globals['asset_url'] = self.url
+        app.before_request(self.serve_precompressed)
+        app.extensions['asset_manifest'] = self
+
+    def _load(self):
+        path = os.path.join(self.static_dir, BUILD_DIR, MANIFEST_FILE)
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.error(f"Erro ao ler manifesto de estáticos: {e}")
+            return {}
+
+    def resolve(self, name):
+        """Nome do arquivo servido para um nome lógico (ex.: css/style.css)"""
+        return self.assets.get(name, name)
+
+    def url(self, name):
+        """URL do arquivo com hash, ou do original se não houver build"""
+        return url_for('static', filename=self.resolve(name))
+
+    def cache_policy(self):
+        """Cache-Control da requisição atual de arquivo estático"""
+        filename = (request.view_args or {}).get('filename')
+        return IMMUTABLE_POLICY if filename in self.immutable else STATIC_POLICY
+
+    def serve_precompressed(self):
+        """Entregar o .gz gerado no build quando o cliente aceita gzip"""
+        if request.endpoint != 'static' or not request.accept_encodings['gzip']:
+            return None
+        filename = (request.view_args or {}).get('filename')
+        if filename not in self.immutable:
+            return None
+        if not os.path.isfile(os.path.join(self.static_dir, filename + '.gz')):
+            return None
+
+        response = send_from_directory(
+            self.static_dir, filename + '.gz',
+            mimetype=mimetypes.guess_type(filename)[0],
+            download_name=os.path.basename(filename),
+        )
+        response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+if __name__ == '__main__':
+    for item in build_assets():
+        print(f"{item['asset']} -> {item['file']} "
+              f"({item['original_bytes']} -> {item['minified_bytes']} bytes, gzip {item['gzip_bytes']})")
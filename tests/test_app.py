@@ -8,17 +8,26 @@ import sys
 import os
 from unittest.mock import patch, MagicMock
 import json
+import tempfile
 
 # Adiciona o diretório raiz ao path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FONTES_WEB_DB', os.path.join(tempfile.mkdtemp(), 'users.db'))
 
 try:
+    import app as app_module
     from app import app, USERS
+    from utils.rate_limit import LoginThrottle, Rule
 except ImportError as e:
     print(f"Erro ao importar módulos: {e}")
     print("Certifique-se de que o arquivo app.py está no diretório correto")
     sys.exit(1)
 
+
+def setUpModule():
+    """Banco web sincronizado com USERS, como na inicialização do gunicorn"""
+    app_module.seed_web_users()
+
 def validate_user(username, password):
     """Função auxiliar para validar usuário"""
     return username in USERS and USERS[username]['password'] == password
@@ -59,6 +68,25 @@ class TestFONTESSystem(unittest.TestCase):
         self.assertIn(b'FONTES', response.data)
         self.assertIn(b'ENTRAR NO SISTEMA', response.data)
     
+    def test_login_page_prerendered(self):
+        """A página de login é renderizada uma vez e servida como bytes prontos"""
+        with patch('app.render_template', wraps=app_module.render_template) as render:
+            first = self.client.get('/login').data
+            second = self.client.get('/login').data
+        self.assertEqual(first, second)
+        self.assertLessEqual(render.call_count, 1)
+        cached = [template.name for template in self.app.jinja_env.cache.values()]
+        self.assertIn('app/login.html', cached)
+
+    def test_dashboard_shows_user_name(self):
+        """O dashboard vem do template compilado com o nome do usuário"""
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 'admin'
+            sess['user_name'] = 'Administrador do Sistema'
+
+        response = self.client.get('/dashboard')
+        self.assertIn('Administrador do Sistema'.encode(), response.data)
+
     def test_login_valid_credentials(self):
         """Teste de login com credenciais válidas"""
         response = self.client.post('/login', 
@@ -75,7 +103,38 @@ class TestFONTESSystem(unittest.TestCase):
             content_type='application/json')
         
         self.assertEqual(response.status_code, 401)
-    
+
+    def test_login_throttled(self):
+        """Tentativas acima do limite recebem 429 com Retry-After"""
+        throttle = LoginThrottle(rules={'ip': Rule(100, 60), 'user': Rule(2, 60)})
+        payload = json.dumps({'username': 'demo', 'password': 'errada'})
+        with patch('app.login_throttle', throttle):
+            codes = [self.client.post('/login', data=payload, content_type='application/json').status_code
+                     for _ in range(2)]
+            response = self.client.post('/login', data=payload, content_type='application/json')
+
+        self.assertEqual(codes, [401, 401])
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers['Retry-After'], '30')
+        self.assertFalse(response.get_json()['success'])
+
+    def test_seed_syncs_web_users(self):
+        """A sincronização aplica senhas alteradas em USERS e desativa contas removidas"""
+        db_path = os.path.join(tempfile.mkdtemp(), 'users.db')
+        app_module.seed_web_users(db_path)
+        users = dict(USERS, demo=dict(USERS['demo'], password='trocada'))
+        users.pop('usuario')
+        with patch.dict('app.USERS', users, clear=True):
+            app_module.seed_web_users(db_path)
+
+        auth = app_module.open_web_auth(db_path)
+        try:
+            self.assertFalse(auth.login('demo', 'demo123')[0])
+            self.assertTrue(auth.login('demo', 'trocada')[0])
+            self.assertEqual(auth.login('usuario', '123456')[1], "Conta desativada")
+        finally:
+            auth.close()
+
     def test_login_empty_fields(self):
         """Teste de login com campos vazios"""
         response = self.client.post('/login',
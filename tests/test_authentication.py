@@ -0,0 +1,1039 @@
+"""
+Sistema FONTES v3.0 - Testes do Sistema de Autenticação
+Módulo de testes para o AuthenticationSystem e seus componentes
+"""
+
+import unittest
+from unittest import mock
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import time
+import base64
+import json
+import sqlite3
+import subprocess
+
+# Adiciona o diretório src ao path
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, SRC_DIR)
+
+from auth.authentication import AuthenticationSystem
+from auth.connection_manager import ConnectionManager
+from auth.audit_writer import AuditLogWriter
+from auth.sql_profiler import LatencyHistogram
+from auth.log_schema import (pack_ip, unpack_ip, to_epoch, migrate_access_logs,
+                             ACTION_LOGIN_SUCCESS, ACTION_LOGIN_FAILED)
+from auth.password_hashing import (PasswordHasher, HashingBusyError, BUSY_MESSAGE, pbkdf2_sha256,
+                                   decode_password_hash, calibrate_iterations, MIN_PBKDF2_ITERATIONS)
+
+
+class AuthTestCase(unittest.TestCase):
+    """Classe base com banco de dados temporário"""
+
+    def setUp(self):
+        """Criar banco de dados isolado para cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'users.db')
+        self.auth = AuthenticationSystem(self.db_path)
+
+    def tearDown(self):
+        """Fechar conexões e remover arquivos temporários"""
+        self.auth.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class TestConnectionManager(AuthTestCase):
+    """Testes do gerenciador de conexões"""
+
+    def test_same_connection_per_thread(self):
+        """A mesma thread deve reutilizar a conexão"""
+        self.assertIs(self.auth.db.connect(), self.auth.db.connect())
+
+    def test_distinct_connection_per_thread(self):
+        """Threads diferentes devem receber conexões diferentes"""
+        main_conn = self.auth.db.connect()
+        other = []
+        thread = threading.Thread(target=lambda: other.append(self.auth.db.connect()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(main_conn, other[0])
+
+    def test_connections_of_finished_threads_are_closed(self):
+        """Conexões de threads encerradas não devem se acumular"""
+        for _ in range(5):
+            thread = threading.Thread(target=self.auth.db.connect)
+            thread.start()
+            thread.join()
+        self.auth.db.connect()
+        self.assertLessEqual(len(self.auth.db._connections), 3)
+
+    def test_wal_and_pragmas(self):
+        """Conexões devem usar WAL e os PRAGMAs configurados"""
+        manager = ConnectionManager(self.db_path, pragmas={'busy_timeout': 1234})
+        conn = manager.connect()
+        self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        self.assertEqual(conn.execute('PRAGMA busy_timeout').fetchone()[0], 1234)
+        self.assertEqual(conn.execute('PRAGMA synchronous').fetchone()[0], 1)  # NORMAL
+        manager.close_all()
+
+    def test_fork_discards_inherited_connections(self):
+        """Após um fork, conexões herdadas não devem ser reutilizadas"""
+        conn = self.auth.db.connect()
+        self.auth.db._pid = -1  # Simula processo filho
+        self.assertIsNot(self.auth.db.connect(), conn)
+        conn.close()
+
+
+class TestAuditLogWriter(AuthTestCase):
+    """Testes do gravador assíncrono de auditoria"""
+
+    def test_events_written_in_batches(self):
+        """Eventos devem ser gravados em lote e visíveis após flush"""
+        for i in range(50):
+            self.auth._log_access(None, f'user{i}', 'LOGIN_FAILED', '10.0.0.1', False, 'teste')
+        self.assertTrue(self.auth.audit_writer.flush())
+
+        stats = self.auth.audit_writer.stats()
+        self.assertEqual(stats['written'], 50)
+        self.assertLess(stats['batches'], 50)
+        self.assertEqual(len(self.auth.get_access_logs(100)), 50)
+
+    def test_close_flushes_pending_events(self):
+        """Encerrar o sistema deve gravar eventos pendentes"""
+        self.auth._log_access(None, 'maria', 'LOGOUT', None, True, 'teste')
+        self.auth.close()
+
+        auth = AuthenticationSystem(self.db_path)
+        self.assertEqual(auth.get_access_logs(10)[0]['username'], 'maria')
+        auth.close()
+
+    def test_drop_policy_counts_dropped_events(self):
+        """Fila cheia com política 'drop' deve descartar e contabilizar"""
+        writer = AuditLogWriter(self.auth.db, 'SELECT ?', max_queue_size=1, overflow_policy='drop')
+        writer._thread = threading.current_thread()  # Impede o consumo da fila
+        writer._queue.put_nowait((1,))
+        self.assertFalse(writer.submit((2,)))
+        self.assertEqual(writer.stats()['dropped'], 1)
+
+
+class TestPasswordHasher(AuthTestCase):
+    """Testes do serviço de hash de senhas"""
+
+    def test_pool_matches_inline_result(self):
+        """Derivação no pool deve ser idêntica à derivação direta"""
+        hasher = PasswordHasher('thread', max_workers=2)
+        self.assertEqual(hasher.derive('senha', b'salt', 1000), pbkdf2_sha256('senha', b'salt', 1000))
+        hasher.shutdown()
+
+    def test_saturated_pool_raises_busy(self):
+        """Pool saturado deve rejeitar o pedido após o timeout"""
+        hasher = PasswordHasher('inline', max_workers=1, max_pending=0, queue_timeout=0.01)
+        hasher._slots.acquire()  # Ocupa a única vaga
+        with self.assertRaises(HashingBusyError):
+            hasher.derive('senha', b'salt', 1000)
+        self.assertEqual(hasher.stats()['rejected'], 1)
+
+    def test_failed_derivation_not_counted_as_completed(self):
+        """Derivação com erro conta como falha, não como concluída"""
+        hasher = PasswordHasher('inline', max_workers=1)
+        with self.assertRaises(ValueError):
+            hasher.derive('senha', b'salt', 0)
+        stats = hasher.stats()
+        self.assertEqual((stats['completed'], stats['failed'], stats['in_flight']), (0, 1, 0))
+        self.assertEqual(hasher.derive('senha', b'salt', 1000), pbkdf2_sha256('senha', b'salt', 1000))
+        self.assertEqual(hasher.stats()['completed'], 1)
+
+    def test_authenticate_reports_busy(self):
+        """Login com pool saturado deve retornar mensagem de ocupado"""
+        self.auth.hasher = PasswordHasher('inline', max_workers=1, max_pending=0, queue_timeout=0.01)
+        self.auth.hasher._slots.acquire()
+        success, message, user = self.auth.authenticate('admin', 'admin123')
+        self.assertFalse(success)
+        self.assertEqual(message, BUSY_MESSAGE)
+
+
+class TestKdfParameters(AuthTestCase):
+    """Testes do formato de hash e da atualização transparente do custo"""
+
+    def _stored_hash(self, username):
+        """Ler o hash armazenado de um usuário"""
+        return self.auth.db.connect().execute(
+            'SELECT password_hash FROM users WHERE username = ?', (username,)).fetchone()[0]
+
+    def _set_stored_hash(self, username, password_hash):
+        """Substituir o hash armazenado de um usuário"""
+        with self.auth.db.connect() as conn:
+            conn.execute('UPDATE users SET password_hash = ? WHERE username = ?', (password_hash, username))
+
+    def test_hash_records_algorithm_and_cost(self):
+        """Novos hashes devem registrar algoritmo e iterações"""
+        stored = decode_password_hash(self.auth._hash_password('segredo'))
+        self.assertEqual(stored.algorithm, 'pbkdf2_sha256')
+        self.assertEqual(stored.iterations, self.auth.kdf_iterations)
+        self.assertFalse(stored.legacy)
+
+    def test_legacy_formats_are_upgraded_on_login(self):
+        """Hashes nos formatos antigos devem ser aceitos e refeitos no login"""
+        salt = os.urandom(32)
+        digest = pbkdf2_sha256('admin123', salt, 100000)
+        for legacy in (f"{salt.hex()}:{digest.hex()}", base64.b64encode(salt + digest).decode()):
+            self._set_stored_hash('admin', legacy)
+            self.assertTrue(self.auth.authenticate('admin', 'admin123')[0])
+            self.assertTrue(self._stored_hash('admin').startswith('pbkdf2_sha256$'))
+
+    def test_cost_change_rehashes_on_login(self):
+        """Mudança do custo do KDF deve refazer o hash no próximo login"""
+        self.auth.kdf_iterations = 60000
+        self.assertTrue(self.auth.authenticate('admin', 'admin123')[0])
+        self.assertEqual(decode_password_hash(self._stored_hash('admin')).iterations, 60000)
+        self.assertTrue(self.auth.authenticate('admin', 'admin123')[0])
+
+    def test_calibration_respects_minimum(self):
+        """Calibração deve respeitar o número mínimo de iterações"""
+        self.assertGreaterEqual(calibrate_iterations(target_ms=1, rounds=1), MIN_PBKDF2_ITERATIONS)
+
+
+class TestSessionCache(AuthTestCase):
+    """Testes do cache de sessões validadas"""
+
+    def setUp(self):
+        """Criar usuário com sessão ativa"""
+        super().setUp()
+        self.auth.create_user('joao', 'senha123', 'João Souza')
+        self.auth.authenticate('joao', 'senha123')
+        self.token = self.auth.session_token
+        self.user_id = self.auth.current_user['id']
+
+    def test_validation_served_from_cache(self):
+        """Validações repetidas não devem consultar o banco"""
+        self.auth.session_cache.clear()
+        for _ in range(5):
+            self.assertTrue(self.auth.validate_session(self.token))
+        stats = self.auth.session_cache.stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 4)
+
+    def test_logout_invalidates(self):
+        """Logout deve remover a sessão do cache"""
+        self.auth.logout()
+        self.assertFalse(self.auth.validate_session(self.token))
+
+    def test_user_changes_invalidate(self):
+        """Desativar ou remover o usuário deve invalidar suas sessões"""
+        self.auth.update_user_status(self.user_id, False)
+        self.assertFalse(self.auth.validate_session(self.token))
+
+        self.auth.update_user_status(self.user_id, True)
+        self.auth.authenticate('joao', 'senha123')
+        token = self.auth.session_token
+        self.auth.delete_user(self.user_id)
+        self.assertFalse(self.auth.validate_session(token))
+
+    def test_update_user_refreshes_cached_data(self):
+        """Alterar dados do usuário não deve deixar dados antigos no cache"""
+        self.auth.update_user(self.user_id, 'joao', 'João Atualizado')
+        self.assertTrue(self.auth.validate_session(self.token))
+        self.assertEqual(self.auth.current_user['full_name'], 'João Atualizado')
+
+    def test_lru_eviction(self):
+        """Cache deve respeitar o tamanho máximo"""
+        self.auth.session_cache.max_entries = 1
+        self.auth.authenticate('admin', 'admin123')
+        stats = self.auth.session_cache.stats()
+        self.assertEqual(stats['size'], 1)
+        self.assertEqual(stats['evictions'], 1)
+
+
+class TestSessionReaper(AuthTestCase):
+    """Testes da limpeza da tabela de sessões"""
+
+    def _insert_sessions(self, count, expires_at, is_active=1):
+        """Inserir sessões artificiais"""
+        with self.auth.db.connect() as conn:
+            conn.executemany(
+                'INSERT INTO sessions (user_id, session_token, expires_at, is_active) VALUES (1, ?, ?, ?)',
+                [(f'{expires_at}-{is_active}-{i}', expires_at, is_active) for i in range(count)])
+
+    def test_reap_removes_expired_and_inactive(self):
+        """Sessões expiradas e encerradas devem ser removidas em lotes"""
+        self._insert_sessions(25, to_epoch('2000-01-01 00:00:00'))
+        self._insert_sessions(7, to_epoch('2999-01-01 00:00:00'), is_active=0)
+        self.auth.authenticate('admin', 'admin123')
+
+        result = self.auth.reap_sessions(batch_size=10)
+        self.assertEqual(result['expired_deleted'], 25)
+        self.assertEqual(result['inactive_deleted'], 7)
+        self.assertIn('elapsed_ms', result)
+
+        remaining = self.auth.db.connect().execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+        self.assertEqual(remaining, 1)
+        self.assertTrue(self.auth.validate_session(self.auth.session_token))
+
+    def test_reap_reclaims_free_pages(self):
+        """Novos bancos usam auto_vacuum incremental e devolvem páginas livres"""
+        conn = self.auth.db.connect()
+        self.assertEqual(conn.execute('PRAGMA auto_vacuum').fetchone()[0], 2)
+        self._insert_sessions(2000, to_epoch('2000-01-01 00:00:00'))
+        result = self.auth.reap_sessions()
+        self.assertGreater(result['pages_reclaimed'], 0)
+
+
+class TestDatabaseMaintenance(AuthTestCase):
+    """Testes das tarefas agendadas de manutenção do banco"""
+
+    def test_run_records_duration_and_reclaimed_space(self):
+        """Cada tarefa deve registrar status, duração e tamanho antes/depois"""
+        with self.auth.db.connect() as conn:
+            conn.executemany('INSERT INTO sessions (user_id, session_token, expires_at) VALUES (1, ?, 0)',
+                             [(f'token-{i:05d}' * 10,) for i in range(3000)])
+        with self.auth.db.connect() as conn:
+            conn.execute('DELETE FROM sessions')
+
+        maintenance = self.auth.maintenance
+        result = maintenance.run(maintenance.due_tasks())
+        self.assertEqual(result['ran'], {'optimize': 'ok', 'vacuum': 'ok', 'analyze': 'ok',
+                                         'integrity_check': 'ok'})
+
+        runs = {run['task']: run for run in maintenance.history()}
+        self.assertGreater(runs['vacuum']['bytes_reclaimed'], 0)
+        self.assertGreater(runs['analyze']['details']['indexes'], 0)
+        self.assertGreaterEqual(runs['optimize']['elapsed_ms'], 0)
+        self.assertEqual(maintenance.status()['free_pages'], 0)
+        self.assertEqual(maintenance.due_tasks(), [])
+
+    def test_scheduler_respects_window(self):
+        """Fora da janela nada é executado, a menos que forçado"""
+        maintenance = self.auth.maintenance
+        hour = time.localtime().tm_hour
+        maintenance.settings.update(window_start=(hour + 1) % 24, window_end=(hour + 2) % 24)
+        self.assertEqual(maintenance.run_due(), {'ran': {}, 'reason': 'outside_window'})
+        self.assertIn('optimize', maintenance.run_due(force=True)['ran'])
+
+    def test_budget_interrupts_long_tasks(self):
+        """Tarefas que estouram o orçamento ficam como interrompidas e são repetidas"""
+        maintenance = self.auth.maintenance
+        clock = iter([0.0, 0.0])
+        with mock.patch('auth.maintenance.time.monotonic', lambda: next(clock, 1000.0)), \
+                mock.patch('auth.maintenance.PROGRESS_STEPS', 1):
+            result = maintenance.run(['integrity_check'])
+        self.assertEqual(result['ran'], {'integrity_check': 'interrupted'})
+        self.assertIn('integrity_check', maintenance.due_tasks(now=time.time() + 3601))
+
+    def test_auto_backup_setting(self):
+        """O backup automático só roda quando ligado e mantém os mais recentes"""
+        maintenance = self.auth.maintenance
+        self.assertNotIn('backup', maintenance.due_tasks())
+
+        maintenance.update_settings(auto_backup=True, backup_keep=1)
+        with open(os.path.join(self.temp_dir, 'maintenance.json'), encoding='utf-8') as f:
+            self.assertTrue(json.load(f)['auto_backup'])
+
+        os.makedirs(os.path.join(self.temp_dir, 'backups'))
+        old_backup = os.path.join(self.temp_dir, 'backups', 'users_20000101_000000.db')
+        open(old_backup, 'wb').close()
+        self.assertEqual(maintenance.run(['backup'])['ran'], {'backup': 'ok'})
+
+        backups = os.listdir(os.path.join(self.temp_dir, 'backups'))
+        self.assertEqual(len(backups), 1)
+        backup = sqlite3.connect(os.path.join(self.temp_dir, 'backups', backups[0]))
+        try:
+            self.assertEqual(backup.execute("SELECT username FROM users").fetchall(), [('admin',)])
+        finally:
+            backup.close()
+
+    def test_full_vacuum_converts_legacy_database(self):
+        """Bancos sem auto_vacuum passam para INCREMENTAL com um VACUUM completo"""
+        legacy_path = os.path.join(self.temp_dir, 'legacy', 'users.db')
+        os.makedirs(os.path.dirname(legacy_path))
+        conn = sqlite3.connect(legacy_path)
+        conn.execute('CREATE TABLE notes (body TEXT)')
+        conn.close()
+
+        auth = AuthenticationSystem(legacy_path)
+        try:
+            self.assertEqual(auth.maintenance.status()['auto_vacuum'], 'NONE')
+            self.assertEqual(auth.maintenance.run(['vacuum'])['ran'], {'vacuum': 'ok'})
+            self.assertEqual(auth.maintenance.status()['auto_vacuum'], 'INCREMENTAL')
+        finally:
+            auth.close()
+
+
+class TestLogArchive(AuthTestCase):
+    """Testes da retenção e do arquivamento mensal de logs"""
+
+    def setUp(self):
+        """Inserir eventos antigos e recentes"""
+        super().setUp()
+        rows = [(None, 'antigo', ACTION_LOGIN_FAILED, None, 0, 'teste', to_epoch(f'2024-0{month}-15 10:00:0{i}'))
+                for month in (1, 2) for i in range(3)]
+        rows.append((None, 'recente', ACTION_LOGIN_FAILED, None, 0, 'teste', to_epoch('2999-01-01 00:00:00')))
+        with self.auth.db.connect() as conn:
+            conn.executemany('''
+                INSERT INTO access_logs (user_id, username, action_id, ip, success, details, ts)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+
+    def test_old_rows_moved_to_monthly_archives(self):
+        """Eventos antigos devem ir para um arquivo por mês"""
+        result = self.auth.archive_access_logs(retention_days=30)
+        self.assertEqual(result['rows_archived'], 6)
+        self.assertEqual(self.auth.log_archive.months(), ['2024-02', '2024-01'])
+        self.assertEqual(len(self.auth.get_access_logs(100)), 1)
+
+    def test_archiving_is_idempotent(self):
+        """Executar o arquivamento novamente não deve mover nada"""
+        self.auth.archive_access_logs(retention_days=30)
+        self.assertEqual(self.auth.archive_access_logs(retention_days=30)['rows_archived'], 0)
+
+    def test_disabled_retention_archives_nothing(self):
+        """Sem retenção configurada o arquivamento não faz nada"""
+        self.auth.log_retention_days = None
+        self.assertEqual(self.auth.archive_access_logs()['rows_archived'], 0)
+        self.assertEqual(self.auth.archive_access_logs(retention_days=0)['rows_archived'], 0)
+        self.assertEqual(len(self.auth.get_access_logs(100)), 7)
+
+    def test_queries_can_span_archives(self):
+        """Consultas com include_archived devem incluir os arquivos em ordem"""
+        self.auth.archive_access_logs(retention_days=30)
+        logs = self.auth.get_all_logs(limit=5, include_archived=True)
+        self.assertEqual(len(logs), 5)
+        self.assertEqual(logs[0]['username'], 'recente')
+        timestamps = [log['timestamp'] for log in logs]
+        self.assertEqual(timestamps, sorted(timestamps, reverse=True))
+
+
+class TestLogPagination(AuthTestCase):
+    """Testes da consulta de logs com filtros e cursor"""
+
+    def setUp(self):
+        """Inserir eventos com o mesmo segundo para exercitar o desempate por id"""
+        super().setUp()
+        rows = [(None, f'user{i % 3}', ACTION_LOGIN_FAILED if i % 2 else ACTION_LOGIN_SUCCESS, None,
+                 i % 2 == 0, 'teste', to_epoch(f'2025-01-01 10:00:{i // 4:02d}')) for i in range(40)]
+        with self.auth.db.connect() as conn:
+            conn.executemany('''
+                INSERT INTO access_logs (user_id, username, action_id, ip, success, details, ts)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+
+    def _all_pages(self, **filters):
+        """Percorrer todas as páginas de uma consulta"""
+        logs, cursor = [], None
+        while True:
+            page = self.auth.query_access_logs(cursor=cursor, page_size=7, **filters)
+            logs.extend(page['logs'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                return logs
+
+    def test_pages_cover_all_rows_once(self):
+        """Páginas devem cobrir todos os eventos, sem repetição, em ordem"""
+        logs = self._all_pages()
+        self.assertEqual(len(logs), 40)
+        self.assertEqual(len({log['id'] for log in logs}), 40)
+        keys = [(log['timestamp'], log['id']) for log in logs]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+
+    def test_filters(self):
+        """Filtros de ação, sucesso, usuário e período"""
+        self.assertEqual(len(self._all_pages(action='LOGIN_FAILED')), 20)
+        self.assertEqual(len(self._all_pages(success=True)), 20)
+        self.assertTrue(all(log['username'] == 'user1' for log in self._all_pages(username='user1')))
+        logs = self._all_pages(start='2025-01-01 10:00:02', end='2025-01-01 10:00:04')
+        self.assertEqual(len(logs), 8)
+
+
+class TestUserLogs(AuthTestCase):
+    """Testes dos logs por usuário"""
+
+    def test_logs_follow_user_id_across_renames(self):
+        """Eventos anteriores à troca de nome continuam no histórico"""
+        self.auth.create_user('joao', 'senha123', 'João Souza')
+        user_id = next(u['id'] for u in self.auth.get_users() if u['username'] == 'joao')
+        self.auth.authenticate('joao', 'senha123')
+        self.auth.update_user(user_id, 'joao.souza', 'João Souza', None)
+        self.auth.authenticate('joao.souza', 'errada')
+
+        actions = [log['action'] for log in self.auth.get_user_logs(user_id, flush_pending=True)]
+        self.assertIn('LOGIN_SUCCESS', actions)
+        self.assertIn('LOGIN_FAILED', actions)
+
+        summary = self.auth.get_user_log_summary(user_id)
+        self.assertEqual(summary['successful_logins'], 1)
+        self.assertEqual(summary['failed_logins'], 1)
+        self.assertEqual(summary['total_events'], len(actions))
+
+    def test_queries_use_user_index(self):
+        """Listagem e resumo devem buscar pelo índice (user_id, ts)"""
+        conn = self.auth.db.connect()
+        for sql in ("SELECT details FROM access_logs WHERE user_id = ? ORDER BY ts DESC LIMIT 10",
+                    "SELECT COUNT(*), SUM(action_id = 4), MAX(ts) FROM access_logs WHERE user_id = ?"):
+            plan = ' '.join(row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, (1,)))
+            self.assertIn('idx_logs_user_ts', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+
+class TestBulkUserImport(AuthTestCase):
+    """Testes da importação de usuários em lote"""
+
+    def _write(self, name, content):
+        """Gravar arquivo de importação no diretório temporário"""
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_csv_import_with_row_errors(self):
+        """Linhas válidas são criadas e as inválidas entram no relatório"""
+        path = self._write('users.csv',
+                           'username,password,full_name,email,role\n'
+                           'ana,senha123,Ana Lima,ana@fontes.com,user\n'
+                           'bruno,senha123,Bruno Costa,,admin\n'
+                           'admin,senha123,Outro Admin,,admin\n'
+                           'ana,senha456,Ana Repetida,,user\n'
+                           'carla,,Carla Dias,,user\n'
+                           'davi,senha123,Davi Reis,,root\n')
+        report = self.auth.create_users_bulk(path, chunk_size=2)
+
+        self.assertEqual(report['created'], 2)
+        self.assertEqual(report['failed'], 4)
+        self.assertEqual(sorted(e['line'] for e in report['errors']), [4, 5, 6, 7])
+        users = {u['username']: u for u in self.auth.get_users()}
+        self.assertEqual(users['bruno']['role'], 'admin')
+        self.assertTrue(self.auth.authenticate('ana', 'senha123')[0])
+
+    def test_jsonl_import(self):
+        """JSONL com linha malformada"""
+        path = self._write('users.jsonl',
+                           '{"username": "eva", "password": "senha123", "full_name": "Eva Rocha"}\n'
+                           '{"username": "fabio", \n'
+                           '\n'
+                           '{"username": "gil", "password": "senha123", "full_name": "Gil Melo"}\n')
+        progress = []
+        report = self.auth.create_users_bulk(path, progress=progress.append)
+
+        self.assertEqual(report['created'], 2)
+        self.assertEqual(report['errors'][0]['line'], 2)
+        self.assertEqual(len(progress), 1)
+
+    def test_unsupported_file_reported(self):
+        """Arquivo em formato desconhecido gera erro no relatório"""
+        report = self.auth.create_users_bulk(self._write('users.txt', 'x'))
+        self.assertEqual(report['created'], 0)
+        self.assertIsNone(report['errors'][0]['line'])
+
+
+class TestStatistics(AuthTestCase):
+    """Testes das estatísticas mantidas por triggers"""
+
+    def test_user_counters_follow_writes(self):
+        """Criar, desativar, promover e remover usuários atualiza os contadores"""
+        self.auth.create_user('lia', 'senha123', 'Lia Prado')
+        self.auth.create_user('rui', 'senha123', 'Rui Alves', role='admin')
+        user_id = next(u['id'] for u in self.auth.get_users() if u['username'] == 'lia')
+        self.auth.update_user_status(user_id, False)
+        self.auth.update_user(user_id, 'lia', 'Lia Prado', None, 'admin')
+
+        stats = self.auth.get_statistics()
+        self.assertEqual((stats['total_users'], stats['active_users'], stats['admin_users']), (3, 2, 3))
+
+        self.auth.delete_user(user_id)
+        stats = self.auth.get_statistics()
+        self.assertEqual((stats['total_users'], stats['active_users'], stats['admin_users']), (2, 2, 2))
+
+    def test_reads_do_not_wait_for_audit_queue(self):
+        """Leituras não forçam a gravação da fila de auditoria sem flush_pending"""
+        with mock.patch.object(self.auth.audit_writer, 'flush') as flush:
+            self.auth.get_statistics()
+            self.auth.get_access_logs()
+            self.auth.query_access_logs()
+            flush.assert_not_called()
+            self.auth.get_statistics(flush_pending=True)
+            flush.assert_called_once()
+
+    def test_login_windows(self):
+        """Logins contados por janela de tempo"""
+        self.auth.authenticate('admin', 'admin123')
+        self.auth.authenticate('admin', 'errada')
+        with self.auth.db.connect() as conn:
+            conn.execute("INSERT INTO access_logs (username, action_id, ts) "
+                         "VALUES ('admin', ?, CAST(strftime('%s', 'now', '-3 days') AS INTEGER))", (ACTION_LOGIN_SUCCESS,))
+
+        stats = self.auth.get_statistics(flush_pending=True)
+        self.assertEqual(stats['logins_24h'], 1)
+        self.assertEqual(stats['failed_logins_24h'], 1)
+        self.assertEqual(stats['logins_7d'], 2)
+        self.assertEqual(stats['logins_30d'], 2)
+
+    def test_existing_database_is_seeded(self):
+        """Contadores criados sobre um banco existente partem dos dados atuais"""
+        self.auth.create_user('lia', 'senha123', 'Lia Prado')
+        self.auth.authenticate('lia', 'senha123')
+        self.auth.audit_writer.flush()
+        with self.auth.db.connect() as conn:
+            conn.execute('DROP TABLE stats_counters')
+            conn.execute('DROP TABLE login_counts_hourly')
+        self.auth.close()
+
+        self.auth = AuthenticationSystem(self.db_path)
+        stats = self.auth.get_statistics()
+        self.assertEqual(stats['total_users'], 2)
+        self.assertEqual(stats['logins_24h'], 1)
+
+
+class TestLogSchema(AuthTestCase):
+    """Testes do schema compacto dos logs e da migração de bancos antigos"""
+
+    LEGACY_SCHEMA = '''
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL, full_name TEXT NOT NULL, email TEXT,
+            role TEXT DEFAULT 'user', is_active BOOLEAN DEFAULT 1,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP, last_login DATETIME,
+            login_attempts INTEGER DEFAULT 0, locked_until DATETIME
+        );
+        CREATE TABLE sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, session_token TEXT UNIQUE NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP, expires_at DATETIME NOT NULL,
+            is_active BOOLEAN DEFAULT 1, ip_address TEXT, user_agent TEXT
+        );
+        CREATE TABLE access_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, username TEXT,
+            action TEXT NOT NULL, ip_address TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            success BOOLEAN DEFAULT 1, details TEXT
+        );
+        CREATE INDEX idx_logs_timestamp ON access_logs(timestamp);
+        CREATE INDEX idx_logs_action_ts ON access_logs(action, timestamp);
+    '''
+
+    def _create_legacy_database(self, path):
+        """Criar banco no formato de texto usado antes do schema compacto"""
+        conn = sqlite3.connect(path)
+        conn.executescript(self.LEGACY_SCHEMA)
+        conn.execute("INSERT INTO users (username, password_hash, full_name) VALUES ('ana', 'x', 'Ana')")
+        conn.execute("INSERT INTO sessions (user_id, session_token, expires_at) VALUES (1, 'tok', '2999-01-01T00:00:00')")
+        conn.executemany('''
+            INSERT INTO access_logs (user_id, username, action, ip_address, success, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(1, 'ana', 'LOGIN_SUCCESS', '192.168.0.10', 1, '2025-03-01 12:00:00'),
+              (1, 'ana', 'LOGIN_FAILED', '2001:db8::1', 0, '2025-03-01 12:30:00'),
+              (None, 'sistema', 'CUSTOM_EVENT', 'system', 1, '2025-03-02 08:00:00')])
+        conn.commit()
+        conn.close()
+
+    def test_ip_packing(self):
+        """Endereços viram 4/16 bytes; rótulos continuam texto"""
+        self.assertEqual(len(pack_ip('10.0.0.1')), 4)
+        self.assertEqual(len(pack_ip('::1')), 16)
+        self.assertEqual(pack_ip('system'), 'system')
+        for value in ('10.0.0.1', '2001:db8::1', 'system', None):
+            self.assertEqual(unpack_ip(pack_ip(value)), value)
+
+    def test_new_events_use_compact_columns(self):
+        """Eventos gravados com data inteira, id de ação e IP compactado"""
+        self.auth.authenticate('admin', 'admin123', '10.1.2.3')
+        self.auth.audit_writer.flush()
+        ts, action_id, ip = self.auth.db.connect().execute(
+            'SELECT ts, action_id, ip FROM access_logs ORDER BY id DESC LIMIT 1').fetchone()
+        self.assertIsInstance(ts, int)
+        self.assertEqual(action_id, ACTION_LOGIN_SUCCESS)
+        self.assertEqual(ip, bytes([10, 1, 2, 3]))
+        self.assertEqual(self.auth.get_access_logs(1)[0]['ip_address'], '10.1.2.3')
+
+    def test_legacy_database_is_migrated(self):
+        """Banco antigo é convertido na abertura, preservando ids e conteúdo"""
+        legacy_path = os.path.join(self.temp_dir, 'legacy.db')
+        self._create_legacy_database(legacy_path)
+
+        auth = AuthenticationSystem(legacy_path)
+        try:
+            conn = auth.db.connect()
+            self.assertEqual(conn.execute('PRAGMA user_version').fetchone()[0], 1)
+            self.assertIsNone(conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'access_logs_legacy'").fetchone())
+
+            logs = auth.get_all_logs()
+            self.assertEqual([(log['id'], log['action'], log['ip_address'], log['timestamp']) for log in logs],
+                             [(3, 'CUSTOM_EVENT', 'system', '2025-03-02 08:00:00'),
+                              (2, 'LOGIN_FAILED', '2001:db8::1', '2025-03-01 12:30:00'),
+                              (1, 'LOGIN_SUCCESS', '192.168.0.10', '2025-03-01 12:00:00')])
+            self.assertEqual(len(auth.query_access_logs(start='2025-03-01 12:15:00')['logs']), 2)
+            self.assertIsInstance(conn.execute('SELECT expires_at FROM sessions').fetchone()[0], int)
+            self.assertTrue(auth.validate_session('tok'))
+
+            # Novos eventos continuam a numeração e alimentam os contadores
+            auth.authenticate('admin', 'admin123')
+            auth.audit_writer.flush()
+            self.assertEqual(conn.execute('SELECT MAX(id) FROM access_logs').fetchone()[0], 4)
+            self.assertEqual(conn.execute('SELECT SUM(success) FROM login_counts_hourly').fetchone()[0], 2)
+        finally:
+            auth.close()
+
+    def test_invalid_timestamps_are_kept(self):
+        """Eventos com data nula ou inválida são migrados com a data vizinha"""
+        legacy_path = os.path.join(self.temp_dir, 'legacy.db')
+        self._create_legacy_database(legacy_path)
+        conn = sqlite3.connect(legacy_path)
+        conn.executemany('INSERT INTO access_logs (username, action, timestamp, details) VALUES (?, ?, ?, ?)',
+                         [('ana', 'LOGOUT', None, None), ('ana', 'LOGOUT', 'ontem', 'manual')])
+        conn.execute("UPDATE access_logs SET timestamp = NULL WHERE id = 4")
+        conn.commit()
+
+        result = migrate_access_logs(conn)
+        self.assertEqual((result['rows_migrated'], result['rows_repaired']), (5, 2))
+        rows = conn.execute('SELECT id, ts, details FROM access_logs WHERE id > 3 ORDER BY id').fetchall()
+        self.assertEqual(rows, [(4, to_epoch('2025-03-02 08:00:00'), '[data original: nula]'),
+                                (5, to_epoch('2025-03-02 08:00:00'), 'manual [data original: ontem]')])
+        conn.close()
+
+    def test_migration_keeps_legacy_table_if_rows_are_lost(self):
+        """A tabela antiga não é removida se algum evento deixou de ser copiado"""
+        legacy_path = os.path.join(self.temp_dir, 'legacy.db')
+        self._create_legacy_database(legacy_path)
+        conn = sqlite3.connect(legacy_path)
+        # Sem data alguma, o NOT NULL de ts faria o INSERT OR IGNORE descartar os eventos
+        with mock.patch('auth.log_schema.LEGACY_TS_SQL', 'NULL, NULL'):
+            with self.assertRaises(sqlite3.IntegrityError):
+                migrate_access_logs(conn)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM access_logs_legacy').fetchone()[0], 3)
+        conn.close()
+
+    def test_interrupted_migration_resumes(self):
+        """Uma cópia interrompida continua de onde parou na próxima abertura"""
+        legacy_path = os.path.join(self.temp_dir, 'legacy.db')
+        self._create_legacy_database(legacy_path)
+        with mock.patch('auth.log_schema.pack_ip', side_effect=RuntimeError):
+            with self.assertRaises(sqlite3.OperationalError):
+                AuthenticationSystem(legacy_path)
+        conn = sqlite3.connect(legacy_path)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM access_logs_legacy').fetchone()[0], 3)
+        conn.close()
+
+        auth = AuthenticationSystem(legacy_path)
+        try:
+            self.assertEqual(len(auth.get_all_logs()), 3)
+        finally:
+            auth.close()
+
+
+class TestSqlProfiler(AuthTestCase):
+    """Testes da instrumentação SQL"""
+
+    def test_disabled_by_default(self):
+        """Sem ativação explícita nada é coletado"""
+        self.auth.authenticate('admin', 'admin123')
+        self.assertIsNone(self.auth.profiler)
+        self.assertIsNone(self.auth.sql_profile_report())
+
+    def test_operations_and_statements_are_recorded(self):
+        """Operações, statements, triggers e planos aparecem no relatório"""
+        self.auth.enable_sql_profiling()
+        self.auth.authenticate('admin', 'admin123')
+        self.auth.validate_session(self.auth.session_token)
+        self.auth.get_all_logs(flush_pending=True)
+
+        report = json.loads(self.auth.sql_profiler.to_json())
+        operations = {item['name']: item for item in report['operations']}
+        self.assertEqual(set(operations), {'authenticate', 'validate_session', 'get_all_logs'})
+        self.assertGreater(operations['authenticate']['statements'], 0)
+        self.assertLessEqual(operations['authenticate']['db_ms'], operations['authenticate']['total_ms'])
+
+        # O INSERT em lote dos logs dispara os triggers de estatísticas e versões
+        log_insert = next(item for item in report['statements'] if item['sql'].startswith('INSERT INTO access_logs'))
+        self.assertGreater(log_insert['sqlite_statements'], log_insert['count'])
+
+        plans = [item['plan'] for item in report['slowest'] if item['sql'].startswith('SELECT')]
+        self.assertTrue(plans and all(plans))
+
+    def test_slowest_sample_keeps_no_parameters(self):
+        """As execuções lentas guardam só o SQL: nada de senhas, tokens ou nomes"""
+        self.auth.enable_sql_profiling()
+        self.auth.authenticate('admin', 'admin123')
+        self.auth.validate_session(self.auth.session_token)
+
+        samples = repr(self.auth.sql_profiler._slowest)
+        self.assertNotIn(self.auth.session_token, samples)
+        self.assertNotIn("'admin'", samples)
+        self.assertNotIn('pbkdf2', samples.lower())
+        self.assertTrue(self.auth.sql_profiler.explain('SELECT id FROM users WHERE username = ?'))
+
+    def test_disable_stops_collection(self):
+        """Depois de desligada, a instrumentação não registra novas execuções"""
+        self.auth.enable_sql_profiling()
+        self.auth.get_users()
+        self.auth.disable_sql_profiling()
+        self.auth.get_users()
+
+        report = self.auth.sql_profile_report(explain=False)
+        self.assertEqual([item['count'] for item in report['operations']], [1])
+
+    def test_histogram_percentiles(self):
+        """Percentis estimados pelo limite da faixa"""
+        histogram = LatencyHistogram()
+        for value in [0.2] * 90 + [30.0] * 10:
+            histogram.add(value)
+        self.assertEqual(histogram.percentile(0.5), 0.25)
+        self.assertEqual(histogram.percentile(0.95), 30.0)
+        self.assertEqual(histogram.to_dict()['count'], 100)
+
+
+class TestChangeTracker(AuthTestCase):
+    """Testes da detecção de alterações"""
+
+    def test_first_check_reports_all_tables(self):
+        """Sem token anterior, todas as tabelas são consideradas alteradas"""
+        changed, token = self.auth.changed_tables()
+        self.assertEqual(changed, {'users', 'sessions', 'access_logs'})
+
+    def test_no_writes_no_changes(self):
+        """Sem escritas, o token é devolvido sem alterações"""
+        _, token = self.auth.changed_tables()
+        changed, new_token = self.auth.changed_tables(token)
+        self.assertEqual(changed, set())
+        self.assertIs(new_token, token)
+
+    def test_writes_from_same_and_other_threads(self):
+        """Escritas da própria conexão e de outras threads são detectadas por tabela"""
+        _, token = self.auth.changed_tables()
+        self.auth.create_user('lia', 'senha123', 'Lia Prado')
+        changed, token = self.auth.changed_tables(token)
+        self.assertEqual(changed, {'users'})
+
+        thread = threading.Thread(target=self.auth.authenticate, args=('admin', 'admin123'))
+        thread.start()
+        thread.join()
+        self.auth.audit_writer.flush()
+        changed, token = self.auth.changed_tables(token)
+        self.assertEqual(changed, {'users', 'sessions', 'access_logs'})
+
+
+class TestAuthContext(AuthTestCase):
+    """Testes do contexto de autenticação por chamada"""
+
+    def test_concurrent_logins_do_not_share_state(self):
+        """Logins simultâneos recebem cada um o seu contexto"""
+        names = [f'user{i}' for i in range(8)]
+        for name in names:
+            self.auth.create_user(name, 'senha123', name.title())
+
+        contexts = {}
+
+        def login(name):
+            success, message, context = self.auth.login(name, 'senha123')
+            contexts[name] = context
+            # A validação de outra sessão não pode afetar este contexto
+            self.auth.resolve_session(context.session_token)
+
+        threads = [threading.Thread(target=login, args=(name,)) for name in names]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual({name: ctx.username for name, ctx in contexts.items()}, {n: n for n in names})
+        self.assertEqual(len({ctx.session_token for ctx in contexts.values()}), len(names))
+        self.assertIsNone(self.auth.context)
+        self.assertIsNone(self.auth.current_user)
+
+    def test_context_is_immutable(self):
+        """Contexto não pode ser alterado"""
+        _, _, context = self.auth.login('admin', 'admin123')
+        self.assertTrue(context.is_admin)
+        with self.assertRaises(AttributeError):
+            context.role = 'user'
+
+    def test_end_session(self):
+        """Sessão encerrada deixa de ser resolvida"""
+        _, _, context = self.auth.login('admin', 'admin123')
+        self.assertEqual(self.auth.resolve_session(context.session_token), context)
+        self.auth.end_session(context)
+        self.assertIsNone(self.auth.resolve_session(context.session_token))
+
+    def test_desktop_session_wrappers(self):
+        """authenticate/logout mantêm a sessão atual da interface desktop"""
+        success, message, user = self.auth.authenticate('admin', 'admin123')
+        self.assertEqual(self.auth.current_user, user)
+        self.assertIsNotNone(self.auth.session_token)
+        self.auth.logout()
+        self.assertIsNone(self.auth.current_user)
+        self.assertIsNone(self.auth.session_token)
+
+
+class TestSignedTokens(AuthTestCase):
+    """Testes dos tokens de sessão assinados"""
+
+    def setUp(self):
+        """Sistema com tokens assinados habilitados"""
+        super().setUp()
+        self.auth.close()
+        self.auth = AuthenticationSystem(self.db_path, signed_tokens=True)
+
+    def test_resolved_without_database(self):
+        """Token assinado é validado sem consultar o banco"""
+        _, _, context = self.auth.login('admin', 'admin123')
+        self.assertTrue(context.session_token.startswith('v1.'))
+        with mock.patch.object(self.auth.db, 'connect', side_effect=AssertionError("consulta ao banco")):
+            resolved = self.auth.resolve_session(context.session_token)
+        self.assertEqual(resolved, context)
+
+    def test_tampered_token_rejected(self):
+        """Token alterado não é aceito"""
+        _, _, context = self.auth.login('admin', 'admin123')
+        body, _, signature = context.session_token.rpartition('.')
+        forged = body[:-2] + ('AA' if body[-2:] != 'AA' else 'BB') + '.' + signature
+        self.assertIsNone(self.auth.resolve_session(forged))
+
+    def test_logout_revokes_in_all_instances(self):
+        """Logout revoga o token localmente e, após sincronizar, em outro processo"""
+        _, _, context = self.auth.login('admin', 'admin123')
+        other = AuthenticationSystem(self.db_path, signed_tokens=True)
+        try:
+            self.assertIsNotNone(other.resolve_session(context.session_token))
+            self.auth.end_session(context)
+            self.assertIsNone(self.auth.resolve_session(context.session_token))
+            other.sync_revocations()
+            self.assertIsNone(other.resolve_session(context.session_token))
+        finally:
+            other.close()
+
+    def test_deactivation_and_role_change_revoke(self):
+        """Desativar o usuário ou mudar sua função revoga os tokens"""
+        self.auth.create_user('lia', 'senha123', 'Lia Prado')
+        user_id = next(u['id'] for u in self.auth.get_users() if u['username'] == 'lia')
+
+        _, _, context = self.auth.login('lia', 'senha123')
+        self.auth.update_user(user_id, 'lia', 'Lia Prado', None, 'admin')
+        self.assertIsNone(self.auth.resolve_session(context.session_token))
+
+        _, _, context = self.auth.login('lia', 'senha123')
+        self.assertTrue(context.is_admin)
+        self.auth.update_user_status(user_id, False)
+        self.assertIsNone(self.auth.resolve_session(context.session_token))
+
+    def test_rename_and_password_change_revoke(self):
+        """Renomear o usuário ou trocar a senha revoga os tokens"""
+        self.auth.create_user('lia', 'senha123', 'Lia Prado')
+        user_id = next(u['id'] for u in self.auth.get_users() if u['username'] == 'lia')
+
+        _, _, context = self.auth.login('lia', 'senha123')
+        _, _, unchanged = self.auth.login('admin', 'admin123')
+        self.auth.update_user(user_id, 'lia.prado', 'Lia Prado', None, 'user')
+        self.assertIsNone(self.auth.resolve_session(context.session_token))
+        self.assertIsNotNone(self.auth.resolve_session(unchanged.session_token))
+
+        _, _, context = self.auth.login('lia.prado', 'senha123')
+        self.assertEqual(context.username, 'lia.prado')
+        self.auth.change_password(user_id, 'nova123')
+        self.assertIsNone(self.auth.resolve_session(context.session_token))
+        self.assertTrue(self.auth.login('lia.prado', 'nova123')[0])
+
+    def test_reaper_keeps_revoked_tokens_until_expiry(self):
+        """Sessões assinadas encerradas continuam na tabela até expirarem"""
+        _, _, context = self.auth.login('admin', 'admin123')
+        self.auth.end_session(context)
+        self.assertEqual(self.auth.reap_sessions()['inactive_deleted'], 0)
+        self.auth.sync_revocations()
+        self.assertIsNone(self.auth.resolve_session(context.session_token))
+
+
+class TestAuthentication(AuthTestCase):
+    """Testes do fluxo de autenticação"""
+
+    def test_default_admin_login(self):
+        """Login com administrador padrão"""
+        success, message, user = self.auth.authenticate('admin', 'admin123')
+        self.assertTrue(success)
+        self.assertEqual(user['role'], 'admin')
+        self.assertTrue(self.auth.validate_session(self.auth.session_token))
+
+    def test_invalid_password(self):
+        """Login com senha incorreta"""
+        success, message, user = self.auth.authenticate('admin', 'errada')
+        self.assertFalse(success)
+        self.assertIsNone(user)
+
+    def test_failed_attempts_counted(self):
+        """Tentativas com senha incorreta são contadas no banco e no log"""
+        for returning in (True, False):
+            with mock.patch('auth.authentication.SQLITE_HAS_RETURNING', returning):
+                self.auth.authenticate('admin', 'errada')
+        logs = self.auth.get_access_logs(flush_pending=True)
+        self.assertEqual([log['details'] for log in logs if log['action'] == 'LOGIN_FAILED'][:2],
+                         ['Senha incorreta - Tentativa 2', 'Senha incorreta - Tentativa 1'])
+
+    def test_login_rejected_if_deactivated_during_verification(self):
+        """Conta desativada durante a verificação da senha não recebe sessão"""
+        admin_id = self.auth.get_users()[0]['id']
+        verify = self.auth._verify_password
+
+        def verify_and_deactivate(stored, provided):
+            with self.auth.db.connect() as conn:
+                conn.execute('UPDATE users SET is_active = 0 WHERE id = ?', (admin_id,))
+            return verify(stored, provided)
+
+        with mock.patch.object(self.auth, '_verify_password', verify_and_deactivate):
+            success, message, user = self.auth.authenticate('admin', 'admin123')
+        self.assertFalse(success)
+        count = self.auth.db.connect().execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+        self.assertEqual(count, 0)
+
+    def test_update_user(self):
+        """Atualizar dados de um usuário"""
+        self.auth.create_user('maria', 'senha123', 'Maria Silva')
+        user_id = next(u['id'] for u in self.auth.get_users() if u['username'] == 'maria')
+        success, message = self.auth.update_user(user_id, 'maria.silva', 'Maria Silva', 'maria@fontes.com')
+        self.assertTrue(success)
+        self.assertIn('maria.silva', [u['username'] for u in self.auth.get_users()])
+
+    def test_upsert_user(self):
+        """upsert cria, mantém sessões se nada mudou e troca senha/perfil quando mudam"""
+        self.assertTrue(self.auth.upsert_user('maria', 'senha123', 'Maria Silva')[0])
+        context = self.auth.login('maria', 'senha123')[2]
+
+        self.assertEqual(self.auth.upsert_user('maria', 'senha123', 'Maria Silva'),
+                         (True, "Usuário já atualizado"))
+        self.assertIsNotNone(self.auth.resolve_session(context.session_token))
+
+        self.assertTrue(self.auth.upsert_user('maria', 'nova456', 'Maria S.', role='admin')[0])
+        self.assertIsNone(self.auth.resolve_session(context.session_token))
+        self.assertFalse(self.auth.login('maria', 'senha123')[0])
+        self.assertEqual(self.auth.login('maria', 'nova456')[2].role, 'admin')
+
+
+
+class TestModuleImport(unittest.TestCase):
+    """Importar o módulo não deve ter efeitos colaterais"""
+
+    def test_import_does_not_open_global_database(self):
+        """A instância global só é criada no primeiro acesso a auth_system"""
+        work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, work_dir, ignore_errors=True)
+        script = ("import sys; sys.path.insert(0, sys.argv[1]);"
+                  "import auth.authentication as a;"
+                  "print(a._auth_system is None, 'customtkinter' in sys.modules)")
+        output = subprocess.run([sys.executable, '-c', script, SRC_DIR], cwd=work_dir,
+                                check=True, capture_output=True, text=True).stdout
+        self.assertEqual(output.split(), ['True', 'False'])
+        self.assertEqual(os.listdir(work_dir), [])
+
+    def test_global_instance_signed_tokens_opt_in(self):
+        """A instância global só usa tokens assinados com FONTES_SIGNED_TOKENS=1"""
+        script = ("import sys; sys.path.insert(0, sys.argv[1]);"
+                  "from auth.authentication import auth_system;"
+                  "print(auth_system.signer is not None); auth_system.close()")
+        for value, expected in (('', 'False'), ('1', 'True')):
+            work_dir = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, work_dir, ignore_errors=True)
+            env = dict(os.environ, FONTES_SIGNED_TOKENS=value)
+            output = subprocess.run([sys.executable, '-c', script, SRC_DIR], cwd=work_dir, env=env,
+                                    check=True, capture_output=True, text=True).stdout
+            self.assertEqual(output.split(), [expected])
+            secret = os.path.join(work_dir, 'database', 'session_secret.key')
+            self.assertEqual(os.path.exists(secret), expected == 'True')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+"""
+Sistema FONTES v3.0 - Testes das Métricas
+Formato de exposição, agregação entre processos e instrumentação da
+autenticação
+"""
+
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# Adiciona o diretório src ao path
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, SRC_DIR)
+
+from auth.authentication import AuthenticationSystem
+from utils.metrics import REGISTRY, MetricsRegistry, clear_metrics_dir
+
+
+def _sample(text, line_prefix):
+    """Valor da primeira linha da exposição que começa com o prefixo"""
+    for line in text.splitlines():
+        if line.startswith(line_prefix + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+class TestExposition(unittest.TestCase):
+    """Formato texto do Prometheus"""
+
+    def test_counter_gauge_and_histogram(self):
+        """Contadores, gauges e histogramas cumulativos com rótulos escapados"""
+        registry = MetricsRegistry()
+        requests = registry.counter('reqs_total', 'Requisições', ('route',))
+        requests.inc('/a')
+        requests.inc('/a', amount=2)
+        requests.inc('/b"\n')
+        registry.gauge('busy', 'Ocupados').set(3)
+        latency = registry.histogram('latency_seconds', 'Latência', buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            latency.observe(value)
+
+        text = registry.render()
+        self.assertIn('# TYPE reqs_total counter', text)
+        self.assertEqual(_sample(text, 'reqs_total{route="/a"}'), 3)
+        self.assertIn('reqs_total{route="/b\\"\\n"} 1', text)
+        self.assertEqual(_sample(text, 'busy'), 3)
+        self.assertEqual(_sample(text, 'latency_seconds_bucket{le="0.1"}'), 1)
+        self.assertEqual(_sample(text, 'latency_seconds_bucket{le="1.0"}'), 2)
+        self.assertEqual(_sample(text, 'latency_seconds_bucket{le="+Inf"}'), 3)
+        self.assertEqual(_sample(text, 'latency_seconds_count'), 3)
+        self.assertAlmostEqual(_sample(text, 'latency_seconds_sum'), 5.55)
+
+    def test_registration_conflicts(self):
+        """Mesma métrica devolve o mesmo objeto; definição diferente é erro"""
+        registry = MetricsRegistry()
+        counter = registry.counter('x_total', 'X', ('a',))
+        self.assertIs(registry.counter('x_total', 'X', ('a',)), counter)
+        with self.assertRaises(ValueError):
+            registry.gauge('x_total', 'X', ('a',))
+        with self.assertRaises(ValueError):
+            counter.inc()
+
+
+class TestMultiprocess(unittest.TestCase):
+    """Agregação pelo diretório compartilhado"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_counters_sum_across_processes(self):
+        """Contadores de outros processos (mesmo encerrados) entram na soma"""
+        script = ("import sys; sys.path.insert(0, sys.argv[1]);"
+                  "from utils.metrics import MetricsRegistry;"
+                  "r = MetricsRegistry(sys.argv[2]);"
+                  "r.counter('jobs_total', 'Tarefas').inc(amount=2);"
+                  "r.gauge('busy', 'Ocupados').set(5)")
+        for _ in range(2):
+            subprocess.run([sys.executable, '-c', script, SRC_DIR, self.directory], check=True)
+
+        registry = MetricsRegistry(self.directory)
+        self.addCleanup(registry.close)
+        registry.counter('jobs_total', 'Tarefas').inc()
+        registry.gauge('busy', 'Ocupados').set(1)
+        text = registry.render()
+        self.assertEqual(_sample(text, 'jobs_total'), 5)
+        self.assertEqual(_sample(text, 'busy'), 1)  # gauges de processos encerrados saem
+
+    def test_gauges_of_live_processes(self):
+        """Gauges de processos vivos são somados"""
+        snapshot = {'pid': os.getppid(), 'metrics': {'busy': {
+            'type': 'gauge', 'help': 'Ocupados', 'labelnames': [], 'samples': [[[], 2]]}}}
+        with open(os.path.join(self.directory, f'metrics_{os.getppid()}.json'), 'w') as f:
+            json.dump(snapshot, f)
+
+        registry = MetricsRegistry(self.directory)
+        self.addCleanup(registry.close)
+        registry.gauge('busy', 'Ocupados').set(1)
+        self.assertEqual(_sample(registry.render(), 'busy'), 3)
+
+        clear_metrics_dir(self.directory)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "requer fork")
+    def test_forked_child_does_not_repeat_parent_values(self):
+        """Valores herdados no fork ficam só no retrato do processo pai"""
+        registry = MetricsRegistry(self.directory)
+        self.addCleanup(registry.close)
+        registry.counter('jobs_total', 'Tarefas').inc(amount=10)
+
+        global _forked_registry
+        _forked_registry = registry
+        child = multiprocessing.get_context('fork').Process(target=_increment_forked)
+        child.start()
+        child.join()
+        self.assertEqual(child.exitcode, 0)
+        self.assertEqual(_sample(registry.render(), 'jobs_total'), 11)
+
+
+_forked_registry = None
+
+
+def _increment_forked():
+    _forked_registry.counter('jobs_total', 'Tarefas').inc()
+    _forked_registry.close()
+
+
+class TestAuthInstrumentation(unittest.TestCase):
+    """Métricas alimentadas pelo sistema de autenticação"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.auth = AuthenticationSystem(os.path.join(self.temp_dir, 'users.db'), kdf_iterations=1000,
+                                         session_reaper_interval=None, log_retention_days=None,
+                                         maintenance_interval=None)
+
+    def tearDown(self):
+        self.auth.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_login_feeds_metrics(self):
+        """PBKDF2, consultas SQLite, operações e cache de sessões aparecem na exposição"""
+        before = REGISTRY.render()
+        success, _, context = self.auth.login('admin', 'admin123')
+        self.assertTrue(success)
+        self.auth.resolve_session(context.session_token)
+        after = REGISTRY.render()
+
+        def grew(prefix):
+            return (_sample(after, prefix) or 0) > (_sample(before, prefix) or 0)
+
+        self.assertTrue(grew('fontes_pbkdf2_seconds_count{executor="thread"}'))
+        self.assertTrue(grew('fontes_sqlite_query_seconds_count{statement="select"}'))
+        self.assertTrue(grew('fontes_auth_operation_seconds_count{operation="login"}'))
+        self.assertTrue(grew('fontes_session_cache_lookups_total{result="hit"}'))
+
+
+if __name__ == '__main__':
+    unittest.main()
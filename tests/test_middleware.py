@@ -0,0 +1,144 @@
+"""
+Sistema FONTES v3.0 - Testes do Middleware HTTP
+Compressão, ETag, respostas 304 e Cache-Control por rota
+"""
+
+import gzip
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Adiciona o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FONTES_WEB_DB', os.path.join(tempfile.mkdtemp(), 'users.db'))
+
+from flask import Response
+
+import app as app_module
+from app import app
+from utils.rate_limit import LoginThrottle
+
+
+def setUpModule():
+    """Banco web sincronizado com USERS, como na inicialização do gunicorn"""
+    app_module.seed_web_users()
+
+
+class TestResponseOptimizer(unittest.TestCase):
+    """Testes do pós-processamento das respostas da aplicação"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.optimizer = app.extensions['response_optimizer']
+
+    def test_page_is_compressed_and_revalidated(self):
+        """Página comprimida com gzip e 304 quando o ETag confere"""
+        plain = self.client.get('/login')
+        response = self.client.get('/login', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(gzip.decompress(response.data), plain.data)
+        self.assertNotEqual(response.headers['ETag'], plain.headers['ETag'])
+
+        revalidated = self.client.get('/login', headers={
+            'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.data, b'')
+
+    def test_compressed_body_is_reused(self):
+        """O mesmo corpo é comprimido uma única vez; o arquivo não é relido"""
+        headers = {'Accept-Encoding': 'gzip'}
+        self.client.get('/static/css/style.css', headers=headers)
+        before = self.optimizer.stats()
+        with patch.object(Response, 'get_data', autospec=True, side_effect=Response.get_data) as get_data:
+            response = self.client.get('/static/css/style.css', headers=headers)
+            self.assertFalse(get_data.called)
+        after = self.optimizer.stats()
+
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Accept-Ranges', response.headers)
+        self.assertEqual(after['compressed'], before['compressed'])
+        self.assertEqual(after['cache_hits'], before['cache_hits'] + 1)
+
+    def test_private_bodies_are_not_cached(self):
+        """Páginas privadas são comprimidas mas não guardadas"""
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 'admin'
+            sess['user_name'] = 'Administrador do Sistema'
+        before = self.optimizer.stats()
+        response = self.client.get('/dashboard', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(response.headers['Cache-Control'], 'private, no-cache')
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(self.optimizer.stats()['cached_entries'], before['cached_entries'])
+
+    def test_cache_policies_and_small_bodies(self):
+        """Políticas por rota; corpos pequenos ganham só o ETag"""
+        health = self.client.get('/health', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(health.headers['Cache-Control'], 'no-store')
+        self.assertNotIn('Content-Encoding', health.headers)
+        self.assertIn('ETag', health.headers)
+
+        # Sem compressão o arquivo segue direto, sem ser carregado em memória
+        with patch.object(Response, 'get_data', autospec=True, side_effect=Response.get_data) as get_data:
+            static = self.client.get('/static/js/main.js')
+            self.assertFalse(get_data.called)
+        self.assertEqual(static.headers['Cache-Control'], 'public, max-age=86400')
+
+    def test_metrics_endpoint(self):
+        """/metrics expõe contagem, latência e requisições em andamento por rota"""
+        self.client.get('/login')
+        self.client.get('/pagina-inexistente')
+        response = self.client.get('/metrics')
+        text = response.get_data(as_text=True)
+
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        self.assertEqual(response.headers['Cache-Control'], 'no-store')
+        self.assertIn('fontes_http_requests_total{route="/login",method="GET",status="200"}', text)
+        self.assertIn('fontes_http_requests_total{route="unmatched",method="GET",status="404"}', text)
+        self.assertIn('fontes_http_request_duration_seconds_bucket{route="/login",method="GET",'
+                      'status="200",le="+Inf"}', text)
+        self.assertIn('fontes_http_requests_in_flight 1', text)  # a própria requisição
+
+    def test_metrics_access_control(self):
+        """/metrics só responde a requisições locais ou com o token configurado"""
+        remote = {'REMOTE_ADDR': '203.0.113.7'}
+        self.assertEqual(self.client.get('/metrics', environ_base=remote).status_code, 403)
+
+        with patch.dict(os.environ, {'FONTES_METRICS_TOKEN': 'segredo'}):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            wrong = self.client.get('/metrics', environ_base=remote, headers={'Authorization': 'Bearer outro'})
+            self.assertEqual(wrong.status_code, 403)
+            allowed = self.client.get('/metrics', environ_base=remote,
+                                      headers={'Authorization': 'Bearer segredo'})
+            self.assertEqual(allowed.status_code, 200)
+
+    def test_metrics_include_web_login(self):
+        """O login web passa pelo AuthenticationSystem: PBKDF2, SQLite e cache de sessões"""
+        with patch('app.login_throttle', LoginThrottle()):
+            login = self.client.post('/login', data=json.dumps({'username': 'demo', 'password': 'demo123'}),
+                                     content_type='application/json')
+            self.assertEqual(login.status_code, 200)
+            self.client.get('/logout')
+        text = self.client.get('/metrics').get_data(as_text=True)
+
+        self.assertIn('fontes_pbkdf2_seconds_count{executor="thread"}', text)
+        self.assertIn('fontes_sqlite_query_seconds_count{statement="select"}', text)
+        self.assertIn('fontes_auth_operation_seconds_count{operation="login"}', text)
+        self.assertIn('fontes_session_cache_lookups_total{result="hit"}', text)
+
+    def test_encoding_negotiation(self):
+        """Sem suporte do cliente ou com q=0 a resposta segue sem compressão"""
+        for accept in ('identity', 'gzip;q=0', ''):
+            with self.subTest(accept=accept):
+                response = self.client.get('/login', headers={'Accept-Encoding': accept})
+                self.assertNotIn('Content-Encoding', response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,254 @@
+"""
+Sistema FONTES v3.0 - Testes dos Planos de Consulta
+Verifica, com EXPLAIN QUERY PLAN, que as consultas do sistema de
+autenticação usam índices num banco com volume realista
+
+Todas as operações do AuthenticationSystem são executadas com a
+instrumentação SQL ligada; cada statement capturado tem o plano
+verificado (com NULL nos parâmetros: os valores não alteram o plano). Varreduras completas de tabela e
+ordenações em B-tree temporária falham o teste, exceto nas tabelas
+pequenas por construção e nos casos listados em ALLOWED_SCANS.
+"""
+
+import ast
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+# Adiciona o diretório src ao path
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, SRC_DIR)
+
+from auth.authentication import AuthenticationSystem
+from auth.sql_profiler import SqlProfiler, normalize_sql
+
+# Volume do banco semeado
+SEED_USERS = 2000
+SEED_SESSIONS = 5000
+SEED_LOGS = 50000
+SEED_LOG_DAYS = 400
+
+# Tabelas com poucas linhas por construção (contadores e catálogos)
+SMALL_TABLES = {'stats_counters', 'table_versions', 'log_actions', 'sqlite_master', 'maintenance_runs'}
+
+# Statements em que a varredura é esperada (trecho do SQL -> motivo)
+ALLOWED_SCANS = {
+    "SELECT 'total_users', COUNT(*) FROM users": "contagem inicial dos contadores, só na criação",
+    "SELECT ts / 3600,": "contagem inicial de login_counts_hourly, só na criação",
+    "UPDATE sessions SET expires_at = CAST(": "conversão única das datas de bancos antigos",
+}
+
+# Statements que o workload não executa (trecho do SQL -> motivo)
+NOT_EXERCISED = {
+    "UPDATE sessions SET expires_at = CAST(": "migração de bancos antigos, coberta em test_authentication",
+}
+
+SQL_START = re.compile(r'(SELECT|INSERT|UPDATE|DELETE|WITH|REPLACE)\b', re.IGNORECASE)
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?!\w)(?! USING)')
+
+
+class PlanRecorder(SqlProfiler):
+    """Instrumentação que guarda cada statement executado"""
+
+    def __init__(self, db_path):
+        super().__init__(db_path)
+        self.statements = set()
+
+    def _record(self, sql, elapsed_ms, scratch):
+        key = normalize_sql(sql)
+        if SQL_START.match(key):
+            self.statements.add(key)
+        super()._record(sql, elapsed_ms, scratch)
+
+
+def sql_literals(path):
+    """Statements escritos como texto fixo (não f-strings) num módulo"""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    formatted = {id(value) for node in ast.walk(tree) if isinstance(node, ast.JoinedStr)
+                 for value in node.values}
+    literals = set()
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Constant) and isinstance(node.value, str)
+                and id(node) not in formatted):
+            text = normalize_sql(node.value)
+            if (SQL_START.match(text) and 'sqlite_master' not in text
+                    and (' FROM ' in text or ' INTO ' in text or text.startswith('UPDATE'))):
+                literals.add(text)
+    return literals
+
+
+class TestQueryPlans(unittest.TestCase):
+    """Planos de consulta de todos os statements do sistema de autenticação"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Semear o banco e executar todas as operações com a instrumentação ligada"""
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.db_path = os.path.join(cls.temp_dir, 'users.db')
+        cls.recorder = PlanRecorder(cls.db_path)
+
+        # A criação do schema e do administrador padrão também é verificada
+        with mock.patch('auth.authentication.SqlProfiler', lambda db_path: cls.recorder):
+            auth = AuthenticationSystem(cls.db_path, kdf_iterations=1000, session_reaper_interval=None,
+                                        log_retention_days=None, profile_sql=True)
+        auth.close()
+        cls._seed(sqlite3.connect(cls.db_path))
+
+        cls.auth = AuthenticationSystem(cls.db_path, kdf_iterations=1000, session_reaper_interval=None,
+                                        log_retention_days=None)
+        cls.auth.db.profiler = cls.recorder
+        cls.signed = AuthenticationSystem(cls.db_path, kdf_iterations=1000, session_reaper_interval=None,
+                                          log_retention_days=None, signed_tokens=True)
+        cls.signed.db.profiler = cls.recorder
+        cls._run_workload()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.auth.close()
+        cls.signed.close()
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
+    @classmethod
+    def _seed(cls, conn):
+        """Usuários, sessões e logs em volume realista"""
+        now = int(time.time())
+        with conn:
+            conn.executemany('''
+                INSERT INTO users (username, password_hash, full_name, email, role, is_active, created_at)
+                VALUES (?, 'x', ?, ?, ?, ?, datetime('now', ?))
+            ''', [(f'user{i}', f'Usuário {i}', f'user{i}@fontes.local', 'admin' if i % 100 == 0 else 'user',
+                   int(i % 20 != 0), f'-{i} hours') for i in range(SEED_USERS)])
+            conn.executemany('''
+                INSERT INTO sessions (user_id, session_token, expires_at, is_active)
+                VALUES (?, ?, ?, ?)
+            ''', [(2 + i % SEED_USERS, f'seed-{i}', now + (i % 60 - 20) * 86400, int(i % 7 != 0))
+                  for i in range(SEED_SESSIONS)])
+            conn.executemany('''
+                INSERT INTO access_logs (ts, action_id, success, user_id, username, ip, details)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(now - (SEED_LOGS - i) * SEED_LOG_DAYS * 86400 // SEED_LOGS, 1 + i % 4, int(i % 4 != 1),
+                   2 + i % SEED_USERS, f'user{i % SEED_USERS}', bytes([10, 0, i % 256, i % 200]), 'seed')
+                  for i in range(SEED_LOGS)])
+        conn.close()
+
+    @classmethod
+    def _run_workload(cls):
+        """Chamar cada operação que acessa o banco"""
+        auth, signed = cls.auth, cls.signed
+        import_path = os.path.join(cls.temp_dir, 'import.csv')
+        with open(import_path, 'w', encoding='utf-8') as f:
+            f.write('username,password,full_name,email,role\n'
+                    'novo1,senha123,Novo Um,,user\nuser5,senha123,Duplicado,,user\n')
+
+        auth.create_user('maria', 'senha123', 'Maria Lima')
+        auth.create_user('maria', 'senha123', 'Maria Lima')
+        auth.create_users_bulk(import_path)
+        users = {user['username']: user['id'] for user in auth.get_users()}
+        maria = users['maria']
+
+        auth.authenticate('maria', 'errada', '10.0.0.1')
+        auth.authenticate('ninguem', 'errada')
+        auth.authenticate('user20', 'x')  # conta inativa
+        auth.authenticate('maria', 'senha123', '10.0.0.1')
+        auth.validate_session(auth.session_token)
+        auth.session_cache.clear()
+        auth.resolve_session(auth.session_token)
+        auth.resolve_session('seed-0')
+        auth.logout()
+
+        signed.authenticate('maria', 'senha123')
+        signed.logout()
+        signed.sync_revocations()
+
+        auth.update_user(maria, 'maria.lima', 'Maria Lima', 'maria@fontes.local', 'admin')
+        auth.update_user(maria, 'user7', 'Maria Lima', None, 'admin')
+        auth.update_user_status(maria, False)
+        auth.update_user_status(maria, True)
+        auth.change_password(maria, 'nova123')
+        auth.upsert_user('user7', 'nova123', 'Maria Lima', role='admin')
+        auth.delete_user(users['user3'])
+
+        auth.get_statistics()
+        auth.changed_tables()
+        auth.get_user_logs(users['user10'])
+        auth.get_user_log_summary(users['user10'])
+        auth.get_all_logs(100)
+        auth.get_access_logs(100)
+        page = auth.query_access_logs(page_size=50)
+        auth.query_access_logs(cursor=page['next_cursor'], page_size=50)
+        auth.query_access_logs(action='LOGIN_FAILED', page_size=50)
+        auth.query_access_logs(success=False, page_size=50)
+        auth.query_access_logs(username='user10', page_size=50)
+        auth.query_access_logs(start='2025-01-01 00:00:00', end='2025-02-01 00:00:00', page_size=50)
+
+        auth.reap_sessions()
+        auth.archive_access_logs(retention_days=300)
+        auth.audit_writer.flush()
+
+        auth.maintenance.settings.update(window_start=0, window_end=0)
+        auth.maintenance.run_due()
+        auth.maintenance.status()
+        auth.maintenance.history()
+
+    def _plan(self, conn, sql):
+        return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, (None,) * sql.count('?'))]
+
+    def _explain_connection(self):
+        """Conexão com o mesmo ambiente do arquivamento (tabela temporária e arquivo anexado)"""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('CREATE TEMP TABLE archive_batch (id INTEGER PRIMARY KEY)')
+        months = self.auth.log_archive.months()
+        self.assertTrue(months, "o arquivamento deveria ter criado arquivos mensais")
+        conn.execute('ATTACH DATABASE ? AS archive', (str(self.auth.log_archive.path_for(months[0])),))
+        return conn
+
+    def test_statements_use_indexes(self):
+        """Nenhum statement faz varredura completa ou ordenação temporária"""
+        conn = self._explain_connection()
+        try:
+            self.assertGreater(len(self.recorder.statements), 40)
+            for sql in sorted(self.recorder.statements):
+                if any(fragment in sql for fragment in ALLOWED_SCANS):
+                    continue
+                with self.subTest(sql=sql):
+                    plan = self._plan(conn, sql)
+                    scans = [row for row in plan
+                             if FULL_SCAN.match(row) and FULL_SCAN.match(row).group(1) not in SMALL_TABLES]
+                    self.assertEqual(scans, [], f"varredura completa: {plan}")
+                    self.assertFalse([row for row in plan if 'TEMP B-TREE' in row],
+                                     f"ordenação temporária: {plan}")
+        finally:
+            conn.close()
+
+    def test_every_literal_statement_is_exercised(self):
+        """Todo SQL fixo de authentication.py roda no workload (e portanto é verificado)"""
+        executed = list(self.recorder.statements)
+        path = os.path.join(SRC_DIR, 'auth', 'authentication.py')
+        # Prefixo: _update_user_returning acrescenta RETURNING ao statement
+        missing = [sql for sql in sorted(sql_literals(path))
+                   if not any(statement.startswith(sql) for statement in executed)
+                   and not any(fragment in sql for fragment in NOT_EXERCISED)]
+        self.assertEqual(missing, [], "acrescente ao workload as operações que executam estes statements")
+
+    def test_seeded_volume(self):
+        """O banco tem o volume usado na verificação"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            counts = [conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                      for table in ('users', 'sessions', 'access_logs')]
+        finally:
+            conn.close()
+        self.assertGreaterEqual(counts[0], SEED_USERS)
+        self.assertGreaterEqual(counts[1], SEED_SESSIONS // 2)
+        self.assertGreaterEqual(counts[2], SEED_LOGS // 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
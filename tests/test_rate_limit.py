@@ -0,0 +1,176 @@
+"""
+Sistema FONTES v3.0 - Testes do Limitador de Login
+Token bucket por IP e usuário, compartilhamento entre processos e
+integração com o AuthenticationSystem
+"""
+
+import importlib.util
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# Adiciona o diretório src ao path
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_DIR, 'src')
+sys.path.insert(0, SRC_DIR)
+
+from auth.authentication import AuthenticationSystem
+from utils.rate_limit import LoginThrottle, NoLoginThrottle, Rule, retry_after_header
+
+
+class FakeClock:
+    """Relógio controlado pelo teste"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLoginThrottle(unittest.TestCase):
+    """Saldos, reposição e rejeições"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.throttle = LoginThrottle(rules={'ip': Rule(3, 30), 'user': Rule(2, 60)}, clock=self.clock)
+        self.addCleanup(self.throttle.close)
+
+    def test_burst_then_refill(self):
+        """A capacidade é consumida em rajada e reposta com o tempo"""
+        self.assertEqual([self.throttle.acquire(ip='10.0.0.1') for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(self.throttle.acquire(ip='10.0.0.1'), 10.0)
+
+        self.clock.now += 10
+        self.assertEqual(self.throttle.acquire(ip='10.0.0.1'), 0)
+        self.assertGreater(self.throttle.acquire(ip='10.0.0.1'), 0)
+        self.assertEqual(self.throttle.acquire(ip='10.0.0.2'), 0)
+
+    def test_most_restrictive_key_wins(self):
+        """Rejeitada por um balde, a tentativa não consome o outro"""
+        self.throttle.acquire(ip='10.0.0.1', user='admin')
+        self.throttle.acquire(ip='10.0.0.1', user='admin')
+        self.assertAlmostEqual(self.throttle.acquire(ip='10.0.0.1', user='admin'), 30.0)
+
+        # O IP ainda tem uma ficha: a rejeição pelo usuário não a gastou
+        self.assertEqual(self.throttle.acquire(ip='10.0.0.1', user='maria'), 0)
+        self.assertGreater(self.throttle.acquire(ip='10.0.0.1'), 0)
+
+    def test_reset_and_empty_keys(self):
+        """reset devolve o saldo; chaves vazias não são limitadas"""
+        self.throttle.acquire(user='admin')
+        self.throttle.acquire(user='admin')
+        self.assertGreater(self.throttle.acquire(user='admin'), 0)
+        self.throttle.reset(user='admin')
+        self.assertEqual(self.throttle.acquire(user='admin'), 0)
+
+        self.assertEqual(self.throttle.acquire(ip=None, user=''), 0)
+        with self.assertRaises(ValueError):
+            self.throttle.acquire(email='x@y')
+
+    def test_retry_after_header(self):
+        """Segundos inteiros arredondados para cima, no mínimo 1"""
+        self.assertEqual(retry_after_header(0.2), '1')
+        self.assertEqual(retry_after_header(29.01), '30')
+
+
+class TestSharedStore(unittest.TestCase):
+    """Baldes no arquivo SQLite, vistos por todos os processos"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'throttle.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_attempts_of_other_processes_count(self):
+        """Tentativas de outro processo consomem o mesmo balde"""
+        script = ("import sys; sys.path.insert(0, sys.argv[1]);"
+                  "from utils.rate_limit import LoginThrottle, Rule;"
+                  "t = LoginThrottle(sys.argv[2], rules={'user': Rule(3, 3600)});"
+                  "print(t.acquire(user='admin'), t.acquire(user='admin'))")
+        output = subprocess.run([sys.executable, '-c', script, SRC_DIR, self.path],
+                                check=True, capture_output=True, text=True).stdout
+        self.assertEqual(output.split(), ['0.0', '0.0'])
+
+        throttle = LoginThrottle(self.path, rules={'user': Rule(3, 3600)})
+        self.addCleanup(throttle.close)
+        self.assertEqual(throttle.acquire(user='admin'), 0)
+        self.assertGreater(throttle.acquire(user='admin'), 0)
+
+
+class TestAuthenticationThrottle(unittest.TestCase):
+    """Integração com o login"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.throttle = LoginThrottle(rules={'ip': Rule(100, 60), 'user': Rule(3, 300)})
+        self.auth = AuthenticationSystem(os.path.join(self.temp_dir, 'users.db'), kdf_iterations=1000,
+                                         session_reaper_interval=None, log_retention_days=None,
+                                         maintenance_interval=None, throttle=self.throttle)
+
+    def tearDown(self):
+        self.auth.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_throttled_login_skips_password_check(self):
+        """Acima do limite o login é recusado sem calcular o PBKDF2"""
+        for _ in range(3):
+            self.assertFalse(self.auth.login('admin', 'errada', '10.0.0.1')[0])
+
+        verified = []
+        original = self.auth._verify_password
+        self.auth._verify_password = lambda *args: verified.append(args) or original(*args)
+        success, message, context = self.auth.login('admin', 'admin123', '10.0.0.1')
+        self.assertFalse(success)
+        self.assertIn('Muitas tentativas', message)
+        self.assertIsNone(context)
+        self.assertEqual(verified, [])
+
+    def test_success_resets_user_bucket(self):
+        """Login bem-sucedido devolve o saldo do usuário"""
+        self.auth.login('admin', 'errada')
+        self.auth.login('admin', 'errada')
+        self.assertTrue(self.auth.login('admin', 'admin123')[0])
+        for _ in range(3):
+            self.assertEqual(self.auth.login('admin', 'errada')[1], "Usuário ou senha incorretos")
+
+
+class TestBenchmark(unittest.TestCase):
+    """O benchmark de autenticação mede logins de verdade, sem limitador"""
+
+    def setUp(self):
+        spec = importlib.util.spec_from_file_location(
+            'benchmark_auth', os.path.join(PROJECT_DIR, 'scripts', 'benchmark_auth.py'))
+        self.benchmark = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.benchmark)
+        self.temp_dir = tempfile.mkdtemp()
+        self.auth = self.benchmark.create_auth(os.path.join(self.temp_dir, 'bench.db'), 1)
+        self.auth.create_user('bench', 'senha123', 'Usuário Benchmark')
+
+    def tearDown(self):
+        self.auth.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_success_path_verifies_password(self):
+        """Acima dos limites padrão, todo login válido passa pelo PBKDF2 e é aceito"""
+        self.assertIsInstance(self.auth.throttle, NoLoginThrottle)
+        verified = []
+        original = self.auth._verify_password
+        self.auth._verify_password = lambda *args: verified.append(args) or original(*args)
+
+        total = 40  # acima das 30 tentativas por minuto do IP
+        _, succeeded = self.benchmark.run_logins(self.auth, 'bench', 'senha123', total, 2)
+        self.assertEqual(succeeded, total)
+        self.assertEqual(len(verified), total)
+
+        _, succeeded = self.benchmark.run_logins(self.auth, 'bench', 'errada', 10, 1)
+        self.assertEqual(succeeded, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
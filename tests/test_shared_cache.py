@@ -0,0 +1,278 @@
+"""
+Sistema FONTES v3.0 - Testes do Cache Compartilhado
+Cliente RESP, reserva local e compartilhamento de sessões, contadores e
+estatísticas entre instâncias, contra um servidor local que imita o Redis
+"""
+
+import os
+import shutil
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+# Adiciona o diretório src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from auth.authentication import AuthenticationSystem
+from auth.shared_cache import LocalCache, RedisCache, SharedCache, create_shared_cache
+
+
+class StandInRedis(socketserver.ThreadingTCPServer):
+    """Servidor mínimo do protocolo Redis com os comandos usados pelo sistema"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.data = {}  # chave -> (valor, expiração em monotonic ou None)
+        self.commands = []
+        self.clients = set()
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self):
+        return f"redis://127.0.0.1:{self.server_address[1]}/0"
+
+    def stop(self):
+        """Parar de aceitar conexões e derrubar as abertas"""
+        self.shutdown()
+        self.server_close()
+        for client in list(self.clients):
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def run(self, args):
+        """Executar um comando e devolver a resposta já codificada"""
+        name = args[0].decode().upper()
+        self.commands.append(name)
+        with self.lock:
+            handler = getattr(self, f'cmd_{name.lower()}', None)
+            if handler is None:
+                return b'-ERR unknown command\r\n'
+            return handler(*args[1:])
+
+    def _live(self, key):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and time.monotonic() >= entry[1]:
+            del self.data[key]
+            return None
+        return entry
+
+    @staticmethod
+    def _bulk(value):
+        return b'$-1\r\n' if value is None else b'$%d\r\n%s\r\n' % (len(value), value)
+
+    def cmd_ping(self):
+        return b'+PONG\r\n'
+
+    def cmd_auth(self, password):
+        return b'+OK\r\n' if password == b'segredo' else b'-WRONGPASS invalid password\r\n'
+
+    def cmd_select(self, db):
+        return b'+OK\r\n'
+
+    def cmd_get(self, key):
+        entry = self._live(key)
+        return self._bulk(entry[0] if entry else None)
+
+    def cmd_set(self, key, value, *options):
+        options = [option.upper() for option in options]
+        if b'NX' in options and self._live(key) is not None:
+            return b'$-1\r\n'
+        expires = None
+        if b'PX' in options:
+            expires = time.monotonic() + int(options[options.index(b'PX') + 1]) / 1000
+        self.data[key] = (value, expires)
+        return b'+OK\r\n'
+
+    def cmd_del(self, *keys):
+        return b':%d\r\n' % sum(self.data.pop(key, None) is not None for key in keys)
+
+    def cmd_incr(self, key):
+        entry = self._live(key)
+        value = int(entry[0]) + 1 if entry else 1
+        self.data[key] = (str(value).encode(), entry[1] if entry else None)
+        return b':%d\r\n' % value
+
+    def cmd_sadd(self, key, *members):
+        entry = self._live(key)
+        values = entry[0] if entry else set()
+        values.update(members)
+        self.data[key] = (values, entry[1] if entry else None)
+        return b':%d\r\n' % len(members)
+
+    def cmd_smembers(self, key):
+        entry = self._live(key)
+        members = sorted(entry[0]) if entry else []
+        return b'*%d\r\n' % len(members) + b''.join(self._bulk(member) for member in members)
+
+    def cmd_pexpire(self, key, ms):
+        entry = self._live(key)
+        if entry is None:
+            return b':0\r\n'
+        self.data[key] = (entry[0], time.monotonic() + int(ms) / 1000)
+        return b':1\r\n'
+
+
+class StandInHandler(socketserver.StreamRequestHandler):
+    """Lê arrays RESP e responde pelo servidor"""
+
+    def handle(self):
+        self.server.clients.add(self.connection)
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:-2])):
+                length = int(self.rfile.readline()[1:-2])
+                args.append(self.rfile.read(length + 2)[:-2])
+            self.wfile.write(self.server.run(args))
+
+
+class SharedCacheTestCase(unittest.TestCase):
+    """Servidor local e diretório temporário por teste"""
+
+    def setUp(self):
+        self.server = StandInRedis()
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'users.db')
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _auth(self, **kwargs):
+        auth = AuthenticationSystem(self.db_path, kdf_iterations=1000, session_reaper_interval=None,
+                                    log_retention_days=None, maintenance_interval=None,
+                                    cache_url=self.server.url, **kwargs)
+        self.addCleanup(auth.close)
+        return auth
+
+
+class TestSharedCacheClient(SharedCacheTestCase):
+    """Testes do cliente RESP e da reserva local"""
+
+    def test_values_counters_and_sets(self):
+        """Operações básicas devem funcionar no servidor e no cache local"""
+        for cache in (create_shared_cache(self.server.url), SharedCache(LocalCache())):
+            with self.subTest(backend=cache.stats()['backend']):
+                cache.set('a', {'x': [1, 'dois']}, 10)
+                self.assertEqual(cache.get('a'), {'x': [1, 'dois']})
+                self.assertIsNone(cache.get('ausente'))
+                self.assertEqual([cache.incr('contador', 10) for _ in range(3)], [1, 2, 3])
+                cache.add_to_set('conjunto', 'm1', 10)
+                cache.add_to_set('conjunto', 'm2', 10)
+                self.assertEqual(cache.pop_set('conjunto'), ['m1', 'm2'])
+                self.assertEqual(cache.pop_set('conjunto'), [])
+                cache.delete('a')
+                self.assertIsNone(cache.get('a'))
+                cache.set('curto', 1, 0.05)
+                time.sleep(0.1)
+                self.assertIsNone(cache.get('curto'))
+                cache.close()
+
+    def test_counter_ttl_starts_at_first_increment(self):
+        """O contador expira a partir do primeiro incremento, sem renovação"""
+        cache = create_shared_cache(self.server.url)
+        cache.incr('janela', 0.1)
+        time.sleep(0.06)
+        self.assertEqual(cache.incr('janela', 0.1), 2)
+        time.sleep(0.06)
+        self.assertEqual(cache.incr('janela', 0.1), 1)
+        cache.close()
+
+    def test_url_with_password_and_db(self):
+        """AUTH e SELECT são enviados ao abrir a conexão"""
+        port = self.server.server_address[1]
+        client = RedisCache.from_url(f"redis://:segredo@127.0.0.1:{port}/2")
+        self.assertEqual((client.password, client.db), ('segredo', 2))
+        self.assertTrue(client.ping())
+        self.assertEqual(self.server.commands[:3], ['AUTH', 'SELECT', 'PING'])
+        client.close()
+
+    def test_fallback_when_server_is_down(self):
+        """Com o servidor fora, as operações continuam no cache local"""
+        cache = create_shared_cache(self.server.url)
+        cache.set('a', 1, 10)
+        self.server.stop()
+
+        cache.set('b', 2, 10)
+        self.assertEqual(cache.get('b'), 2)
+        stats = cache.stats()
+        self.assertFalse(stats['available'])
+        self.assertEqual(stats['errors'], 1)
+        self.assertGreaterEqual(stats['fallback_ops'], 2)
+        self.server = StandInRedis()  # tearDown
+
+    def test_unreachable_server_at_startup(self):
+        """Servidor inacessível desde o início não impede o login"""
+        self.server.stop()
+        auth = self._auth()
+        self.assertTrue(auth.authenticate('admin', 'admin123')[0])
+        self.assertTrue(auth.validate_session(auth.session_token))
+        self.assertFalse(auth.cache.stats()['available'])
+        self.server = StandInRedis()  # tearDown
+
+
+class TestSharedState(SharedCacheTestCase):
+    """Estado compartilhado entre duas instâncias (dois workers)"""
+
+    def test_session_validated_by_one_worker_serves_another(self):
+        """Uma sessão validada num worker é encontrada no outro sem consultar o banco"""
+        first, second = self._auth(), self._auth()
+        success, _, context = first.login('admin', 'admin123')
+        self.assertTrue(success)
+
+        with second.db.connect() as conn:
+            conn.execute('DELETE FROM sessions')  # só o cache pode responder
+        self.assertIsNotNone(second.resolve_session(context.session_token))
+        self.assertEqual(second.session_cache.stats()['shared_hits'], 1)
+        self.assertFalse(any(context.session_token in str(key) for key in self.server.data))
+
+    def test_invalidation_reaches_other_workers(self):
+        """Logout e desativação num worker invalidam a sessão para os demais"""
+        first, second = self._auth(), self._auth()
+        first.create_user('lia', 'senha123', 'Lia Prado')
+        user_id = next(user['id'] for user in first.get_users() if user['username'] == 'lia')
+        _, _, lia = first.login('lia', 'senha123')
+        _, _, admin = first.login('admin', 'admin123')
+
+        first.update_user_status(user_id, False)
+        first.end_session(admin)
+        self.assertIsNone(second.resolve_session(lia.session_token))
+        self.assertIsNone(second.resolve_session(admin.session_token))
+
+    def test_login_failures_are_counted_across_workers(self):
+        """Falhas de login somam entre os workers e o sucesso zera o usuário"""
+        first, second = self._auth(), self._auth()
+        first.authenticate('admin', 'errada', '10.0.0.1')
+        second.authenticate('admin', 'errada', '10.0.0.1')
+        second.authenticate('ninguem', 'errada', '10.0.0.1')
+        self.assertEqual(first.recent_login_failures('admin', '10.0.0.1'), {'username': 2, 'ip': 3})
+
+        first.authenticate('admin', 'admin123', '10.0.0.1')
+        self.assertEqual(second.recent_login_failures('admin', '10.0.0.1'), {'username': 0, 'ip': 3})
+
+    def test_statistics_snapshot_is_shared_and_follows_writes(self):
+        """O cálculo das estatísticas é reutilizado até users/access_logs mudarem"""
+        first, second = self._auth(), self._auth()
+        stats = first.get_statistics()
+        self.assertEqual(second.get_statistics(), stats)
+        self.assertEqual(self.server.commands.count('SET'), 1)
+
+        second.create_user('lia', 'senha123', 'Lia Prado')
+        self.assertEqual(first.get_statistics()['total_users'], stats['total_users'] + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
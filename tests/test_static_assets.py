@@ -0,0 +1,178 @@
+"""
+Sistema FONTES v3.0 - Testes do Pipeline de Estáticos
+Minificação, nomes com hash, .gz pré-comprimidos e cabeçalhos imutáveis
+"""
+
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from flask import Flask, render_template_string
+
+# Adiciona o diretório raiz ao path
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from middleware import ResponseOptimizer
+from static_assets import (ASSETS, IMMUTABLE_POLICY, STATIC_POLICY, AssetManifest,
+                           build_assets, minify_css, minify_js)
+
+
+class TestMinifiers(unittest.TestCase):
+    """Testes dos minificadores"""
+
+    def test_css(self):
+        """Comentários e espaços saem; strings e espaços significativos ficam"""
+        source = """/* topo */
+.a > .b ,  .c {
+    content: "  /* x */  ";
+    margin: 0 auto;   /* fim */
+}
+@media (max-width: 768px) { .a { color: red !important; } }
+"""
+        self.assertEqual(
+            minify_css(source),
+            '.a>.b,.c{content:"  /* x */  ";margin:0 auto}'
+            '@media (max-width:768px){.a{color:red !important}}')
+
+    def test_js(self):
+        """Strings, templates e regex intactos; quebras de linha preservadas"""
+        source = """// comentário
+function soma(a, b) {
+    /* bloco */
+    const url = 'http://x//y';
+    const html = `
+        <b>${a}</b>`;
+    return a + +b + /\\/\\//.source.length;
+}
+let i = 0
+i++
+"""
+        self.assertEqual(minify_js(source), """function soma(a,b){
+const url='http://x//y';
+const html=`
+        <b>${a}</b>`;
+return a+ +b+/\\/\\//.source.length;
+}
+let i=0
+i++
+""")
+
+
+class TestAssetPipeline(unittest.TestCase):
+    """Build em diretório temporário e entrega pelo Flask"""
+
+    def setUp(self):
+        self.static_dir = tempfile.mkdtemp()
+        shutil.copytree(os.path.join(ROOT_DIR, 'static', 'css'), os.path.join(self.static_dir, 'css'))
+        shutil.copytree(os.path.join(ROOT_DIR, 'static', 'js'), os.path.join(self.static_dir, 'js'))
+        self.report = build_assets(self.static_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.static_dir, ignore_errors=True)
+
+    def _app(self):
+        app = Flask(__name__, static_folder=self.static_dir, static_url_path='/static')
+        assets = AssetManifest(app, static_dir=self.static_dir)
+        ResponseOptimizer(app, policies={'static': assets.cache_policy})
+        app.add_url_rule('/', 'index', lambda: render_template_string(
+            "<link href=\"{{ asset_url('css/style.css') }}\">"
+            "<script src=\"{{ asset_url('js/main.js') }}\"></script>"))
+        return app
+
+    def test_build_outputs(self):
+        """Arquivos com hash, .gz equivalente e manifesto"""
+        with open(os.path.join(self.static_dir, 'dist', 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.assertEqual(sorted(manifest), sorted(ASSETS))
+
+        for item in self.report:
+            path = os.path.join(self.static_dir, item['file'])
+            self.assertEqual(manifest[item['asset']], item['file'])
+            self.assertRegex(item['file'], r'^dist/(css|js)/\w+\.[0-9a-f]{10}\.(css|js)$')
+            self.assertLess(item['minified_bytes'], item['original_bytes'])
+            with open(path, 'rb') as plain, open(path + '.gz', 'rb') as packed:
+                self.assertEqual(gzip.decompress(packed.read()), plain.read())
+
+    def test_rebuild_replaces_stale_files(self):
+        """Mudou o conteúdo, muda o nome; o build anterior é removido"""
+        with open(os.path.join(self.static_dir, 'css', 'style.css'), 'a', encoding='utf-8') as f:
+            f.write('.novo { color: blue; }\n')
+        old = self.report[0]['file']
+        new = build_assets(self.static_dir)[0]['file']
+
+        self.assertNotEqual(old, new)
+        css_dir = os.path.join(self.static_dir, 'dist', 'css')
+        builds = [name for name in os.listdir(css_dir) if name.startswith('style.')]
+        self.assertEqual(sorted(builds), sorted([os.path.basename(new), os.path.basename(new) + '.gz']))
+
+    def test_templates_and_headers(self):
+        """Templates apontam para o hash; o servidor manda .gz imutável"""
+        app = self._app()
+        client = app.test_client()
+        css = app.extensions['asset_manifest'].resolve('css/style.css')
+
+        page = client.get('/').get_data(as_text=True)
+        self.assertIn(f'/static/{css}', page)
+
+        response = client.get(f'/static/{css}', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Cache-Control'], IMMUTABLE_POLICY)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.mimetype, 'text/css')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        with open(os.path.join(self.static_dir, css), 'rb') as f:
+            self.assertEqual(gzip.decompress(response.data), f.read())
+
+        original = client.get('/static/css/style.css')
+        self.assertEqual(original.headers['Cache-Control'], STATIC_POLICY)
+
+    def test_without_build_falls_back_to_originals(self):
+        """Sem manifesto, asset_url devolve o arquivo original"""
+        shutil.rmtree(os.path.join(self.static_dir, 'dist'))
+        page = self._app().test_client().get('/').get_data(as_text=True)
+        self.assertIn('/static/css/style.css', page)
+        self.assertIn('/static/js/main.js', page)
+
+
+
+class TestServedPages(unittest.TestCase):
+    """As páginas servidas pelo app apontam para os arquivos com hash"""
+
+    def setUp(self):
+        os.environ.setdefault('FONTES_WEB_DB', os.path.join(tempfile.mkdtemp(), 'users.db'))
+        import app as app_module
+        self.app_module = app_module
+        self.static_dir = tempfile.mkdtemp()
+        shutil.copytree(os.path.join(ROOT_DIR, 'static', 'css'), os.path.join(self.static_dir, 'css'))
+        shutil.copytree(os.path.join(ROOT_DIR, 'static', 'js'), os.path.join(self.static_dir, 'js'))
+        build_assets(self.static_dir)
+        self.built = AssetManifest(static_dir=self.static_dir).assets
+
+    def tearDown(self):
+        shutil.rmtree(self.static_dir, ignore_errors=True)
+
+    def test_pages_link_hashed_assets(self):
+        """/login e /dashboard carregam CSS e JS pelos nomes com hash, sem estilos ou scripts inline"""
+        app_module = self.app_module
+        client = app_module.app.test_client()
+        with patch.object(app_module.assets, 'assets', self.built), \
+                patch.object(app_module, '_login_page', None):
+            login = client.get('/login').get_data(as_text=True)
+            with client.session_transaction() as sess:
+                sess['user_id'] = 'demo'
+            dashboard = client.get('/dashboard').get_data(as_text=True)
+
+        for page, name in ((login, 'login'), (dashboard, 'dashboard')):
+            self.assertIn(f"/static/{self.built[f'css/{name}.css']}", page)
+            self.assertIn(f"/static/{self.built[f'js/{name}.js']}", page)
+            self.assertNotIn('<style>', page)
+            self.assertNotIn('<script>', page)
+
+
+if __name__ == '__main__':
+    unittest.main()